@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -73,6 +75,14 @@ class AuthenticationTests(APITestCase):
         self.assertIn('access', response.data['data'])
         self.assertIn('refresh', response.data['data'])
 
+    @patch('account.views.merge_anonymous_cart')
+    def test_token_obtain_merges_anonymous_cart(self, mock_merge):
+        url = reverse('auth:jwt-create')
+        data = {'email': self.user.email, 'password': 'S@mpleP@ss123'}
+        self.client.post(url, data)
+        mock_merge.assert_called_once()
+        self.assertEqual(str(mock_merge.call_args.args[1]), str(self.user.pk))
+
     def test_token_refresh(self):
         refresh = RefreshToken.for_user(self.user)
         url = reverse('auth:jwt-refresh')
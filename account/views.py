@@ -12,7 +12,8 @@ from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 from rest_framework_simplejwt.views import (
     TokenBlacklistView,
     TokenObtainPairView as BaseTokenObtainPairView,
@@ -20,6 +21,7 @@ from rest_framework_simplejwt.views import (
     TokenVerifyView as BaseTokenVerifyView,
 )
 
+from cart.storage import merge_anonymous_cart
 from sms.models import OTPCode
 from sms.providers import SmsIrProvider
 
@@ -279,6 +281,9 @@ class TokenObtainPairView(BaseTokenObtainPairView):
     def post(self, request, *args, **kwargs):
         try:
             response = super().post(request, *args, **kwargs)
+            # carry over the cart filled before logging in
+            access_token = AccessToken(response.data['access'])
+            merge_anonymous_cart(request, access_token[jwt_settings.USER_ID_CLAIM])
             return Response({
                 "message": "Token successfully obtained",
                 "data": response.data
@@ -439,6 +444,9 @@ class VerifyOTP(APIView):
             user.is_active = True
             user.save()
 
+        # carry over the cart filled before logging in
+        merge_anonymous_cart(request, user.pk)
+
         refresh = RefreshToken.for_user(user)
         return Response({
             'refresh': str(refresh),
@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ecommerce_api.utils.http_client import HttpClient
+from payment.gateways import http_client as zibal_client
+
+User = get_user_model()
+
+
+class ProviderStatusViewTest(APITestCase):
+    def setUp(self):
+        self.url = reverse('api-v1:provider-status')
+        self.admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.user = User.objects.create_user(username='user', email='user@example.com', password='password')
+
+    def test_lists_every_provider(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        providers = {provider['provider']: provider for provider in response.json()['data']}
+        self.assertTrue({'zibal', 'postex', 'sms_ir'} <= set(providers))
+        self.assertEqual(providers['zibal']['circuit'], 'closed')
+        self.assertEqual(providers['zibal']['in_flight'], 0)
+
+    def test_other_clients_do_not_replace_providers(self):
+        HttpClient('zibal', 'https://example.com', timeout=5)
+        self.assertIs(HttpClient.clients['zibal'], zibal_client)
+        self.assertNotIn('test', HttpClient.clients)
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
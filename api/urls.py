@@ -1,5 +1,7 @@
 from django.urls import path, include
 
+from .views import ProviderStatusAPIView
+
 app_name = 'api-v1'
 
 urlpatterns = [
@@ -8,4 +10,5 @@ urlpatterns = [
     path('', include('cart.urls')),
     path('', include('coupons.urls')),
     path('chat/', include('chat.urls')),
+    path('providers/status/', ProviderStatusAPIView.as_view(), name='provider-status'),
 ]
@@ -0,0 +1,23 @@
+from drf_spectacular.utils import extend_schema, OpenApiResponse
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
+
+from ecommerce_api.core.api_standard_response import ApiResponse
+from ecommerce_api.utils.http_client import HttpClient
+
+
+class ProviderStatusAPIView(APIView):
+    """
+    Report the circuit state and calls in flight of every external provider.
+    """
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        summary="Get external provider status",
+        tags=["Providers"],
+        responses={200: OpenApiResponse(description="Circuit state and calls in flight per provider.")},
+    )
+    def get(self, request, *args, **kwargs):
+        providers = [client.get_status() for client in HttpClient.clients.values()]
+        return ApiResponse.success(data=providers, status_code=status.HTTP_200_OK)
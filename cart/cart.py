@@ -1,31 +1,32 @@
 from decimal import Decimal
 
-from django.conf import settings
+from django.utils.functional import cached_property
 
 from coupons.models import Coupon
 from shop.models import Product
+from .pricing import calculate_pricing
+from .storage import get_cart_storage
 
 
 class Cart:
     def __init__(self, request):
         """
-        Initialize the cart object by associating it with the current session.
+        Initialize the cart object by loading it from the configured cart storage.
 
         Args:
             request: The HTTP request object, which contains the session data.
 
         Attributes:
             session: The current session object.
-            cart: A dictionary representing the cart stored in the session.
+            storage: The cart storage backend, see ``settings.CART_STORAGE_BACKEND``.
+            cart: A dictionary representing the cart lines.
         """
         self.session = request.session
-        cart = self.session.get(settings.CART_SESSION_ID)
-        if not cart:
-            # save an empty cart in the session
-            cart = self.session[settings.CART_SESSION_ID] = {}
-        self.cart = cart
+        self.storage = get_cart_storage(request)
+        self.cart = self.storage.load()
         # store current applied coupon
         self.coupon_id = self.session.get('coupon_id')
+        self._pricing = self._product_ids = None
 
     def add(self, product, quantity=1, override_quantity=False):
         """
@@ -37,17 +38,26 @@ class Cart:
             override_quantity: If True, replace the current quantity with the given quantity.
                                If False, increment the current quantity by the given amount.
         """
-        product_id = str(product.product_id)
-        if product_id not in self.cart:
-            self.cart[product_id] = {
-                'quantity': 0,
-                'price': str(product.price)
-            }
-        if override_quantity:
-            self.cart[product_id]['quantity'] = quantity
-        else:
-            self.cart[product_id]['quantity'] += quantity
-        self.save()
+        self.storage.add(
+            str(product.product_id),
+            quantity,
+            str(product.price),
+            override_quantity=override_quantity,
+        )
+        self._pricing = self._product_ids = None
+
+    def add_many(self, items):
+        """
+        Add several products to the cart with a single storage write.
+
+        Args:
+            items: ``(product, quantity, override_quantity)`` tuples, applied in order.
+        """
+        self.storage.add_many([
+            (str(product.product_id), quantity, str(product.price), override_quantity)
+            for product, quantity, override_quantity in items
+        ])
+        self._pricing = self._product_ids = None
 
     def remove(self, product):
         """
@@ -56,10 +66,8 @@ class Cart:
         Args:
             product: The product object to remove from the cart.
         """
-        product_id = str(product.product_id)
-        if product_id in self.cart:
-            del self.cart[product_id]
-            self.save()
+        self.storage.remove(str(product.product_id))
+        self._pricing = self._product_ids = None
 
     def __iter__(self):
         """
@@ -67,16 +75,36 @@ class Cart:
         from the database. Each item includes the product details, price, quantity,
         and total price.
         """
-        product_ids = self.cart.keys()
-        # get the product objects and add them to the cart
-        products = Product.objects.filter(product_id__in=product_ids)
-        cart = self.cart.copy()
+        return self.get_items()
+
+    def get_items(self, fields=None):
+        """
+        Build the cart items with their products loaded in one query. The stored cart
+        lines are left untouched, and lines whose product no longer exists are skipped.
+
+        Args:
+            fields: Optional product fields to load, for callers that only render a
+                    few of them. All fields are loaded by default.
+
+        Yields:
+            dict: The ``product``, ``price``, ``quantity`` and ``total_price`` of a line.
+        """
+        products = Product.objects.filter(product_id__in=self.cart.keys())
+        if fields is not None:
+            products = products.only(*fields)
+        found = set()
         for product in products:
-            cart[str(product.product_id)]['product'] = product
-        for item in cart.values():
-            item['price'] = Decimal(item['price'])
-            item['total_price'] = item['price'] * item['quantity']
-            yield item
+            found.add(str(product.product_id))
+            line = self.cart[str(product.product_id)]
+            price = Decimal(line['price'])
+            yield {
+                'product': product,
+                'price': price,
+                'quantity': line['quantity'],
+                'total_price': price * line['quantity'],
+            }
+        # spare get_pricing its own query for the products that still exist
+        self._product_ids = found
 
     def __len__(self):
         """
@@ -87,6 +115,42 @@ class Cart:
         """
         return sum(item['quantity'] for item in self.cart.values())
 
+    def get_product_ids(self):
+        """
+        Return the ids of the cart's products that still exist, querying them at most
+        once, or not at all after ``get_items``.
+        """
+        if self._product_ids is None:
+            self._product_ids = {
+                str(product_id) for product_id in
+                Product.objects.filter(product_id__in=self.cart.keys()).values_list('product_id', flat=True)
+            }
+        return self._product_ids
+
+    def get_pricing(self, coupon=None):
+        """
+        Price the cart in a single pass. Like ``get_items``, lines whose product no
+        longer exists are left out. The result for the applied coupon is computed
+        once and reused until the cart changes.
+
+        Args:
+            coupon (Coupon, optional): A coupon to price the cart with instead of the
+                                       applied one, e.g. while validating it.
+
+        Returns:
+            CartPricing: The subtotal, discount, tax and shipping estimate of the cart.
+        """
+        product_ids = self.get_product_ids()
+        lines = (
+            (line['price'], line['quantity'])
+            for product_id, line in self.cart.items() if product_id in product_ids
+        )
+        if coupon is not None:
+            return calculate_pricing(lines, coupon)
+        if self._pricing is None:
+            self._pricing = calculate_pricing(lines, self.coupon)
+        return self._pricing
+
     def get_total_price(self):
         """
         Calculate the total price of all items in the cart.
@@ -94,40 +158,34 @@ class Cart:
         Returns:
             Decimal: The total price of all items in the cart.
         """
-        return sum(
-            Decimal(item['price']) * item['quantity']
-            for item in self.cart.values()
-        )
+        return self.get_pricing().subtotal
 
     def save(self):
         """
-        Mark the session as modified to ensure the cart data is saved.
+        Kept for compatibility: the cart storage persists every change as it is made.
         """
-        self.session.modified = True
 
     def clear(self):
         """
-        Clear all items from the cart by removing it from the session.
+        Clear all items from the cart.
         """
-        del self.session[settings.CART_SESSION_ID]
+        self.storage.clear()
+        self.cart = self.storage.load()
+        self._pricing = self._product_ids = None
+        self.__dict__.pop('coupon', None)
         del self.coupon_id
-        self.save()
 
-    @property
+    @cached_property
     def coupon(self):
         """
-        Retrieve the currently applied coupon.
+        Retrieve the currently applied coupon, querying it at most once.
 
         Returns:
-            Coupon: The applied coupon object if it exists and is valid.
+            Coupon: The applied coupon object if it exists and is active.
             None: If no coupon is applied or the coupon does not exist.
         """
         if self.coupon_id:
-            try:
-                return Coupon.objects.get(id=self.coupon_id)
-
-            except Coupon.DoesNotExist:
-                pass
+            return Coupon.objects.filter(id=self.coupon_id, active=True).first()
         return None
 
     def get_discount(self, coupon=None):
@@ -141,12 +199,7 @@ class Cart:
         Returns:
             Decimal: The discount amount to be subtracted from the total price.
         """
-        applied_coupon = coupon if coupon is not None else self.coupon
-        if applied_coupon:
-            return (
-                applied_coupon.discount / Decimal(100)
-            ) * self.get_total_price()
-        return Decimal(0)
+        return self.get_pricing(coupon).discount
 
     def get_total_price_after_discount(self):
         """
@@ -155,4 +208,4 @@ class Cart:
         Returns:
             Decimal: The total price after the discount is applied.
         """
-        return self.get_total_price() - self.get_discount()
+        return self.get_pricing().total_after_discount
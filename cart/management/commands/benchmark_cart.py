@@ -0,0 +1,150 @@
+import timeit
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.base import SessionBase
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.db.models.signals import m2m_changed, post_save
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework import serializers
+from rest_framework.test import APIRequestFactory
+
+from cart.cart import Cart
+from cart.serializers import CartSerializer
+from cart.views import CartViewSet
+from ecommerce_api.core.renderers import ApiResponseRenderer
+from shop import signals as shop_signals
+from shop.custom_taggit import CustomTaggedItem
+from shop.models import Category, Product
+from shop.serializers import ProductSerializer
+
+# The rollback undoes the sample rows but not what is written to Redis along the way.
+# The cache is swapped for a local one, which also covers the rating aggregates and
+# throttle counters stored while reading, and the receivers writing to Redis when the
+# rows are created are disconnected for the whole run.
+SCRATCH_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+REDIS_RECEIVERS = [
+    (post_save, shop_signals.update_autocomplete_index, Product),
+    (post_save, shop_signals.invalidate_related_products, Product),
+    (post_save, shop_signals.invalidate_product_cache, Product),
+    (post_save, shop_signals.invalidate_category_cache, Category),
+    (m2m_changed, shop_signals.update_search_indexes_on_tags_change, CustomTaggedItem),
+]
+
+
+class FullProductCartSerializer(CartSerializer):
+    """
+    The previous cart representation, nesting the full ProductSerializer per line.
+    """
+
+    class CartItemSerializer(serializers.Serializer):
+        product = ProductSerializer()
+        quantity = serializers.IntegerField(min_value=1)
+        total_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+    items = CartItemSerializer(many=True)
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def muted_receivers(receivers):
+    for signal, receiver, sender in receivers:
+        signal.disconnect(receiver, sender=sender)
+    try:
+        yield
+    finally:
+        for signal, receiver, sender in receivers:
+            signal.connect(receiver, sender=sender)
+
+
+class Command(BaseCommand):
+    help = 'Compare cart GET latency with full and compact product representations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=50, help='Products in the cart')
+        parser.add_argument('--number', type=int, default=20, help='Requests per measurement')
+
+    def handle(self, *args, **options):
+        # The sample products only exist for the duration of the benchmark and leave
+        # nothing behind in the autocomplete index or the cache tags
+        try:
+            with (
+                muted_receivers(REDIS_RECEIVERS),
+                transaction.atomic(),
+                override_settings(
+                    CACHES=SCRATCH_CACHES, CART_STORAGE_BACKEND='cart.storage.SessionCartStorage'
+                ),
+            ):
+                self.run(options['items'], options['number'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, size, number):
+        user, _ = get_user_model().objects.get_or_create(
+            username='cart_benchmark', defaults={'email': 'cart_benchmark@example.com'}
+        )
+        category = Category.objects.create(name='Cart Benchmark')
+        products = [
+            Product.objects.create(
+                name=f'Cart Benchmark Product {i}',
+                description='A sample product description. ' * 8,
+                price=10 + i,
+                stock=100,
+                category=category,
+                user=user,
+            )
+            for i in range(size)
+        ]
+        for product in products:
+            product.tags.add('benchmark', 'cart')
+
+        factory = APIRequestFactory()
+        session = SessionBase()
+        request = factory.get('/api/v1/cart/')
+        request.session = session
+        cart = Cart(request)
+        cart.add_many((product, 1, False) for product in products)
+
+        renderer = ApiResponseRenderer()
+
+        def before():
+            # The previous code path: full product rows and the full ProductSerializer
+            request = factory.get('/api/v1/cart/')
+            request.session = session
+            cart = Cart(request)
+            cart_data = {
+                'items': [
+                    {'product': item['product'], 'quantity': item['quantity'], 'total_price': item['total_price']}
+                    for item in cart
+                ],
+                'pricing': cart.get_pricing(),
+            }
+            data = FullProductCartSerializer(cart_data, context={'request': request}).data
+            return renderer.render(data)
+
+        view = CartViewSet.as_view({'get': 'list'})
+
+        def after():
+            request = factory.get('/api/v1/cart/')
+            request.session = session
+            return view(request).render()
+
+        results = {}
+        for name, get_cart in {'before': before, 'after': after}.items():
+            # the query log is capped, clear what the previous measurement left in it
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                get_cart()
+            best = min(timeit.repeat(get_cart, number=number, repeat=3))
+            results[name] = best / number * 1000
+            self.stdout.write(
+                f'{name:<8} {results[name]:>8.2f} ms per {size}-item cart GET, {len(queries)} queries'
+            )
+
+        speedup = results['before'] / results['after']
+        self.stdout.write(self.style.SUCCESS(f'The compact cart representation is {speedup:.1f}x faster'))
@@ -0,0 +1,58 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Optional
+
+from coupons.models import Coupon
+
+TAX_RATE = Decimal('0.09')
+# Flat shipping charged per order until shipping is quoted by the provider.
+SHIPPING_ESTIMATE = Decimal('15.00')
+
+
+@dataclass(frozen=True)
+class CartPricing:
+    """
+    The price breakdown of a cart, computed once by ``calculate_pricing``.
+    """
+    subtotal: Decimal
+    discount: Decimal
+    tax: Decimal
+    shipping: Decimal
+    coupon: Optional[Coupon] = None
+
+    @property
+    def total_after_discount(self):
+        return self.subtotal - self.discount
+
+    @property
+    def total(self):
+        return self.subtotal - self.discount + self.shipping + self.tax
+
+
+def calculate_pricing(lines, coupon=None):
+    """
+    Price a set of cart lines in a single pass.
+
+    Tax is charged on the subtotal before discount, and shipping only when there is
+    something to ship.
+
+    Args:
+        lines: ``(unit_price, quantity)`` pairs.
+        coupon (Coupon, optional): The coupon to apply.
+
+    Returns:
+        CartPricing: The price breakdown.
+    """
+    subtotal = Decimal(0)
+    quantity_total = 0
+    for price, quantity in lines:
+        subtotal += Decimal(price) * quantity
+        quantity_total += quantity
+    discount = subtotal * (coupon.discount / Decimal(100)) if coupon else Decimal(0)
+    return CartPricing(
+        subtotal=subtotal,
+        discount=discount,
+        tax=subtotal * TAX_RATE,
+        shipping=SHIPPING_ESTIMATE if quantity_total else Decimal(0),
+        coupon=coupon,
+    )
@@ -1,14 +1,23 @@
-import decimal
-
 from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
-from shop.serializers import ProductSerializer
+from shop.models import Product
+
+
+class CartProductSerializer(serializers.ModelSerializer):
+    """
+    The few product fields a cart line needs, see ``CartSerializer``.
+    """
+
+    class Meta:
+        model = Product
+        fields = ['product_id', 'name', 'slug', 'price', 'stock', 'thumbnail']
+        read_only_fields = fields
 
 
 class CartSerializer(serializers.Serializer):
     class CartItemSerializer(serializers.Serializer):
-        product = ProductSerializer()
+        product = CartProductSerializer()
         quantity = serializers.IntegerField(min_value=1)  # Ensure quantity is at least 1
         total_price = serializers.DecimalField(max_digits=10, decimal_places=2)
 
@@ -21,34 +30,35 @@ class CartSerializer(serializers.Serializer):
         """
         Get the coupon code and discount applied to the cart.
         """
-        request = self.context.get('request')
-        coupon_id = request.session.get('coupon_id')
-        if not coupon_id:
-            return None
-
-        from coupons.models import Coupon
-        try:
-            coupon = Coupon.objects.get(id=coupon_id, active=True)
-            return {"code": coupon.code, "discount": coupon.discount}
-        except Coupon.DoesNotExist:
+        coupon = obj['pricing'].coupon
+        if coupon is None:
             return None
+        return {"code": coupon.code, "discount": coupon.discount}
 
     @extend_schema_field(serializers.DictField(child=serializers.DecimalField(max_digits=10, decimal_places=2)))
     def get_total_price(self, obj):
         """
-        Calculate the final total price with and without the discount.
+        Get the final total price with and without the discount, and the estimated tax,
+        shipping and total payable, from the cart's pricing snapshot.
         """
-        total_price = obj.get('total_price', 0)
-        coupon_data = self.get_coupon(obj)
-        if coupon_data:
-            discount = total_price * (decimal.Decimal(coupon_data['discount']) / decimal.Decimal(100))
-            return {
-                "without_discount": total_price,
-                "with_discount": total_price - discount
-            }
-        return {"without_discount": total_price, "with_discount": total_price}
+        pricing = obj['pricing']
+        return {
+            "without_discount": pricing.subtotal,
+            "with_discount": pricing.total_after_discount,
+            "estimated_tax": pricing.tax,
+            "estimated_shipping": pricing.shipping,
+            "estimated_total": pricing.total,
+        }
 
 
 class AddToCartSerializer(serializers.Serializer):
     quantity = serializers.IntegerField(min_value=1, default=1)
     override = serializers.BooleanField(default=False)
+
+
+class BulkCartOperationSerializer(AddToCartSerializer):
+    product_id = serializers.UUIDField()
+
+
+class BulkCartSerializer(serializers.Serializer):
+    operations = BulkCartOperationSerializer(many=True, allow_empty=False, max_length=100)
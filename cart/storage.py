@@ -0,0 +1,249 @@
+from logging import getLogger
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from redis.exceptions import RedisError
+
+from ecommerce_api.utils.redis_client import redis_client
+
+logger = getLogger(__name__)
+
+# Fold an anonymous cart into a user's cart and drop it, in one atomic step.
+# Quantities of lines in both carts are added up; the user's cart keeps its prices.
+# KEYS: anonymous cart hash, user cart hash
+# ARGV: TTL in seconds
+MERGE_SCRIPT = """
+local fields = redis.call('HGETALL', KEYS[1])
+local merged = 0
+for i = 1, #fields, 2 do
+    if string.sub(fields[i], 1, 9) == 'quantity:' then
+        redis.call('HINCRBY', KEYS[2], fields[i], fields[i + 1])
+        merged = merged + 1
+    else
+        redis.call('HSETNX', KEYS[2], fields[i], fields[i + 1])
+    end
+end
+if #fields > 0 then
+    redis.call('DEL', KEYS[1])
+    redis.call('EXPIRE', KEYS[2], ARGV[1])
+end
+return merged
+"""
+
+
+def get_cart_storage(request):
+    """
+    Instantiate the cart storage backend configured in ``CART_STORAGE_BACKEND``.
+    """
+    return import_string(settings.CART_STORAGE_BACKEND)(request)
+
+
+def merge_anonymous_cart(request, user_id):
+    """
+    Merge the cart of the request's session into the cart of the given user. Called
+    on login, so a failure is logged rather than raised.
+
+    Returns:
+        int: The number of merged cart lines.
+    """
+    try:
+        return get_cart_storage(request).merge_into_user(user_id)
+    except RedisError as e:
+        logger.error("Error merging cart into user %s: %s", user_id, e)
+        return 0
+
+
+class BaseCartStorage:
+    """
+    Where a cart's lines are kept. Lines map a product id to a dict with the
+    ``quantity`` and the ``price`` (as a string) at the time it was first added.
+
+    ``load`` reads the lines once; later changes keep the loaded dict in sync.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.lines = None
+
+    def load(self):
+        """
+        Return all cart lines.
+
+        Returns:
+            dict: Product id to ``{'quantity': int, 'price': str}``.
+        """
+        if self.lines is None:
+            self.lines = self.read()
+        return self.lines
+
+    def read(self):
+        raise NotImplementedError
+
+    def add(self, product_id, quantity, price, override_quantity=False):
+        raise NotImplementedError
+
+    def add_many(self, lines):
+        """
+        Apply several ``add`` calls in one write.
+
+        Args:
+            lines: ``(product_id, quantity, price, override_quantity)`` tuples,
+                   applied in order.
+        """
+        for product_id, quantity, price, override_quantity in lines:
+            self.add(product_id, quantity, price, override_quantity=override_quantity)
+
+    def remove(self, product_id):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def merge_into_user(self, user_id):
+        """
+        Move the anonymous cart of this request's session into the user's cart.
+
+        Returns:
+            int: The number of merged cart lines.
+        """
+        raise NotImplementedError
+
+
+class SessionCartStorage(BaseCartStorage):
+    """
+    Keep the cart as a dict in the session. Every change rewrites the session.
+    """
+
+    def __init__(self, request):
+        super().__init__(request)
+        self.session = request.session
+
+    def read(self):
+        cart = self.session.get(settings.CART_SESSION_ID)
+        if not cart:
+            # save an empty cart in the session
+            cart = self.session[settings.CART_SESSION_ID] = {}
+        return cart
+
+    def add(self, product_id, quantity, price, override_quantity=False):
+        cart = self.load()
+        line = cart.setdefault(product_id, {'quantity': 0, 'price': price})
+        if override_quantity:
+            line['quantity'] = quantity
+        else:
+            line['quantity'] += quantity
+        self.session.modified = True
+
+    def add_many(self, lines):
+        cart = self.load()
+        for product_id, quantity, price, override_quantity in lines:
+            line = cart.setdefault(product_id, {'quantity': 0, 'price': price})
+            line['quantity'] = quantity if override_quantity else line['quantity'] + quantity
+        self.session.modified = True
+
+    def remove(self, product_id):
+        cart = self.load()
+        if product_id in cart:
+            del cart[product_id]
+            self.session.modified = True
+
+    def clear(self):
+        self.session.pop(settings.CART_SESSION_ID, None)
+        self.session.modified = True
+        self.lines = {}
+
+    def merge_into_user(self, user_id):
+        # The session cart follows the session through login, there is nothing to move.
+        return 0
+
+
+class RedisCartStorage(BaseCartStorage):
+    """
+    Keep the cart as one Redis hash with a ``quantity:<id>`` and a ``price:<id>``
+    field per line. Changes are single-field writes (HINCRBY, HSET, HDEL) that also
+    refresh the hash's TTL, and the session itself is never modified.
+
+    Authenticated users have one persistent cart across sessions and devices;
+    anonymous carts are keyed by session and merged into it on login.
+    """
+
+    def __init__(self, request, client=None):
+        super().__init__(request)
+        self.client = client or redis_client
+
+    def get_user_cart_key(self, user_id):
+        return f'cart:user:{user_id}'
+
+    def get_session_cart_key(self, create=True):
+        session = self.request.session
+        if not session.session_key:
+            if not create:
+                return None
+            session.create()
+        return f'cart:session:{session.session_key}'
+
+    def get_cart_key(self):
+        user = getattr(self.request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return self.get_user_cart_key(user.pk)
+        return self.get_session_cart_key()
+
+    def read(self):
+        cart = {}
+        for field, value in self.client.hgetall(self.get_cart_key()).items():
+            name, product_id = field.decode().split(':', 1)
+            line = cart.setdefault(product_id, {'quantity': 0, 'price': '0'})
+            line[name] = int(value) if name == 'quantity' else value.decode()
+        return cart
+
+    def add(self, product_id, quantity, price, override_quantity=False):
+        key = self.get_cart_key()
+        pipe = self.client.pipeline()
+        # keep the price the product had when it was first added, like the session cart
+        pipe.hsetnx(key, f'price:{product_id}', price)
+        if override_quantity:
+            pipe.hset(key, f'quantity:{product_id}', quantity)
+        else:
+            pipe.hincrby(key, f'quantity:{product_id}', quantity)
+        pipe.expire(key, settings.CART_TTL)
+        _, new_quantity, _ = pipe.execute()
+
+        if self.lines is not None:
+            line = self.lines.setdefault(product_id, {'quantity': 0, 'price': price})
+            line['quantity'] = quantity if override_quantity else int(new_quantity)
+
+    def add_many(self, lines):
+        key = self.get_cart_key()
+        pipe = self.client.pipeline()
+        for product_id, quantity, price, override_quantity in lines:
+            pipe.hsetnx(key, f'price:{product_id}', price)
+            if override_quantity:
+                pipe.hset(key, f'quantity:{product_id}', quantity)
+            else:
+                pipe.hincrby(key, f'quantity:{product_id}', quantity)
+        pipe.expire(key, settings.CART_TTL)
+        # one (HSETNX, HSET/HINCRBY) pair of results per line, then the EXPIRE
+        results = pipe.execute()[1:-1:2]
+
+        if self.lines is not None:
+            for (product_id, quantity, price, override_quantity), new_quantity in zip(lines, results):
+                line = self.lines.setdefault(product_id, {'quantity': 0, 'price': price})
+                line['quantity'] = quantity if override_quantity else int(new_quantity)
+
+    def remove(self, product_id):
+        self.client.hdel(self.get_cart_key(), f'quantity:{product_id}', f'price:{product_id}')
+        if self.lines is not None:
+            self.lines.pop(product_id, None)
+
+    def clear(self):
+        self.client.delete(self.get_cart_key())
+        self.lines = {}
+
+    def merge_into_user(self, user_id):
+        session_key = self.get_session_cart_key(create=False)
+        if session_key is None:
+            return 0
+        merge = self.client.register_script(MERGE_SCRIPT)
+        merged = merge(keys=[session_key, self.get_user_cart_key(user_id)], args=[settings.CART_TTL])
+        self.lines = None
+        return int(merged)
@@ -1,9 +1,21 @@
 import unittest
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 
+from cart.cart import Cart
+from cart.pricing import calculate_pricing, SHIPPING_ESTIMATE
+from cart.storage import RedisCartStorage
+from coupons.models import Coupon
 from shop.models import Product, Category
 
 User = get_user_model()
@@ -62,3 +74,221 @@ class CartTests(APITestCase):
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertNotIn('cart', self.client.session)
+
+
+class RedisCartStorageTest(SimpleTestCase):
+    def setUp(self):
+        self.client = MagicMock()
+        self.request = SimpleNamespace(session=MagicMock(session_key='abc'))
+        self.storage = RedisCartStorage(self.request, client=self.client)
+
+    def test_read_parses_hash_fields(self):
+        self.client.hgetall.return_value = {b'quantity:p1': b'2', b'price:p1': b'10.00'}
+        self.assertEqual(self.storage.load(), {'p1': {'quantity': 2, 'price': '10.00'}})
+        self.client.hgetall.assert_called_once_with('cart:session:abc')
+
+    def test_add_increments_one_field_and_refreshes_ttl(self):
+        pipe = self.client.pipeline.return_value
+        pipe.execute.return_value = [1, 3, True]
+        self.client.hgetall.return_value = {}
+        self.storage.load()
+
+        self.storage.add('p1', 3, '10.00')
+
+        pipe.hsetnx.assert_called_once_with('cart:session:abc', 'price:p1', '10.00')
+        pipe.hincrby.assert_called_once_with('cart:session:abc', 'quantity:p1', 3)
+        pipe.expire.assert_called_once_with('cart:session:abc', settings.CART_TTL)
+        self.assertEqual(self.storage.lines, {'p1': {'quantity': 3, 'price': '10.00'}})
+        self.request.session.__setitem__.assert_not_called()
+
+    def test_add_many_writes_all_lines_in_one_pipeline(self):
+        pipe = self.client.pipeline.return_value
+        pipe.execute.return_value = [1, 2, 1, 5, True]
+        self.client.hgetall.return_value = {}
+        self.storage.load()
+
+        self.storage.add_many([('p1', 2, '10.00', False), ('p2', 5, '3.50', True)])
+
+        self.client.pipeline.assert_called_once_with()
+        pipe.hincrby.assert_called_once_with('cart:session:abc', 'quantity:p1', 2)
+        pipe.hset.assert_called_once_with('cart:session:abc', 'quantity:p2', 5)
+        pipe.expire.assert_called_once_with('cart:session:abc', settings.CART_TTL)
+        pipe.execute.assert_called_once_with()
+        self.assertEqual(self.storage.lines, {
+            'p1': {'quantity': 2, 'price': '10.00'},
+            'p2': {'quantity': 5, 'price': '3.50'},
+        })
+
+    def test_remove_deletes_line_fields(self):
+        self.storage.remove('p1')
+        self.client.hdel.assert_called_once_with('cart:session:abc', 'quantity:p1', 'price:p1')
+
+    def test_authenticated_user_has_a_persistent_cart(self):
+        self.request.user = SimpleNamespace(is_authenticated=True, pk=7)
+        self.assertEqual(self.storage.get_cart_key(), 'cart:user:7')
+
+    def test_merge_moves_session_cart_into_user_cart(self):
+        merge = self.client.register_script.return_value
+        merge.return_value = 2
+        self.assertEqual(self.storage.merge_into_user(7), 2)
+        merge.assert_called_once_with(keys=['cart:session:abc', 'cart:user:7'], args=[settings.CART_TTL])
+
+    def test_merge_without_session_does_nothing(self):
+        self.request.session.session_key = None
+        self.assertEqual(self.storage.merge_into_user(7), 0)
+        self.client.register_script.assert_not_called()
+
+
+class CalculatePricingTest(SimpleTestCase):
+    def test_pricing_breakdown(self):
+        coupon = SimpleNamespace(discount=20)
+        pricing = calculate_pricing([('100.00', 2), (Decimal('5.50'), 1)], coupon)
+        self.assertEqual(pricing.subtotal, Decimal('205.50'))
+        self.assertEqual(pricing.discount, Decimal('41.10'))
+        self.assertEqual(pricing.tax, Decimal('18.4950'))
+        self.assertEqual(pricing.shipping, SHIPPING_ESTIMATE)
+        self.assertEqual(pricing.total, Decimal('205.50') - Decimal('41.10') + SHIPPING_ESTIMATE + Decimal('18.4950'))
+
+    def test_empty_cart_has_no_shipping(self):
+        pricing = calculate_pricing([])
+        self.assertEqual(pricing.total, Decimal(0))
+
+
+# The session is saved on every cart request, which needs a cache that keeps it.
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CartMergeViewTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpassword')
+        self.url = reverse('api-v1:cart-merge')
+
+    def test_merge_requires_authentication(self):
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @patch('cart.views.merge_anonymous_cart', return_value=3)
+    def test_merge_into_user_cart(self, mock_merge):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['merged_items'], 3)
+        self.assertEqual(mock_merge.call_args.args[1], self.user.pk)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CartBulkUpdateViewTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpassword')
+        self.category = Category.objects.create(name='Test Category')
+        self.products = [
+            Product.objects.create(
+                name=f'Test Product {i}',
+                category=self.category,
+                price=10.00,
+                stock=10,
+                user=self.user,
+            )
+            for i in range(3)
+        ]
+        self.url = reverse('api-v1:cart-bulk')
+
+    def test_bulk_update_applies_all_operations(self):
+        operations = [
+            {'product_id': str(product.product_id), 'quantity': 2} for product in self.products
+        ]
+        operations.append({'product_id': str(self.products[0].product_id), 'quantity': 5, 'override': True})
+
+        with self.assertNumQueries(1):
+            response = self.client.post(self.url, {'operations': operations}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated_items'], 4)
+        cart = self.client.session[settings.CART_SESSION_ID]
+        self.assertEqual(cart[str(self.products[0].product_id)]['quantity'], 5)
+        self.assertEqual(cart[str(self.products[1].product_id)]['quantity'], 2)
+
+    def test_bulk_update_rejects_unknown_products(self):
+        unknown = '00000000-0000-0000-0000-000000000000'
+        operations = [
+            {'product_id': str(self.products[0].product_id), 'quantity': 1},
+            {'product_id': unknown, 'quantity': 1},
+        ]
+        response = self.client.post(self.url, {'operations': operations}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn(settings.CART_SESSION_ID, self.client.session)
+
+    def test_bulk_update_requires_operations(self):
+        response = self.client.post(self.url, {'operations': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CartListViewTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpassword')
+        self.category = Category.objects.create(name='Test Category')
+        self.products = [
+            Product.objects.create(
+                name=f'Test Product {i}',
+                category=self.category,
+                price=10.00,
+                stock=10,
+                user=self.user,
+            )
+            for i in range(3)
+        ]
+        operations = [{'product_id': str(product.product_id), 'quantity': 2} for product in self.products]
+        self.client.post(reverse('api-v1:cart-bulk'), {'operations': operations}, format='json')
+
+    def test_cart_items_use_compact_product_representation(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api-v1:cart-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['items']), 3)
+        self.assertEqual(
+            set(response.data['items'][0]['product']),
+            {'product_id', 'name', 'slug', 'price', 'stock', 'thumbnail'}
+        )
+
+    def test_cart_pricing_fetches_coupon_once(self):
+        coupon = Coupon.objects.create(
+            code='SAVE10',
+            valid_from=timezone.now() - timedelta(days=1),
+            valid_to=timezone.now() + timedelta(days=1),
+            discount=10,
+        )
+        session = self.client.session
+        session['coupon_id'] = coupon.id
+        session.save()
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('api-v1:cart-list'))
+        self.assertEqual(response.data['coupon'], {'code': 'SAVE10', 'discount': 10})
+        total_price = response.data['total_price']
+        self.assertEqual(total_price['without_discount'], Decimal('60.00'))
+        self.assertEqual(total_price['with_discount'], Decimal('54.00'))
+
+        cart = Cart(SimpleNamespace(session=self.client.session))
+        # the cart's products and the coupon
+        with self.assertNumQueries(2):
+            cart.get_total_price()
+            cart.get_discount()
+            cart.get_total_price_after_discount()
+
+    def test_pricing_leaves_out_deleted_products(self):
+        self.products[0].delete()
+        response = self.client.get(reverse('api-v1:cart-list'))
+        items = response.data['items']
+        self.assertEqual(len(items), 2)
+        self.assertEqual(
+            response.data['total_price']['without_discount'],
+            sum(Decimal(item['total_price']) for item in items),
+        )
+
+    def test_iterating_leaves_stored_lines_untouched(self):
+        self.products[0].delete()
+        request = SimpleNamespace(session=self.client.session)
+        cart = Cart(request)
+        items = list(cart)
+        self.assertEqual(len(items), 2)
+        for line in cart.cart.values():
+            self.assertEqual(set(line), {'quantity', 'price'})
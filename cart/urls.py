@@ -4,6 +4,8 @@ from .views import CartViewSet
 urlpatterns = [
     path('cart/', CartViewSet.as_view({'get': 'list'}), name='cart-list'),
     path('cart/add/<uuid:product_id>/', CartViewSet.as_view({'post': 'add_to_cart'}), name='cart-add'),
+    path('cart/bulk/', CartViewSet.as_view({'post': 'bulk_update_cart'}), name='cart-bulk'),
     path('cart/remove/<uuid:product_id>/', CartViewSet.as_view({'delete': 'remove_from_cart'}), name='cart-remove'),
     path('cart/clear/', CartViewSet.as_view({'delete': 'clear_cart'}), name='cart-clear'),
+    path('cart/merge/', CartViewSet.as_view({'post': 'merge_cart'}), name='cart-merge'),
 ]
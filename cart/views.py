@@ -9,11 +9,13 @@ from drf_spectacular.utils import (
 )
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from shop.models import Product
 from .cart import Cart
-from .serializers import CartSerializer, AddToCartSerializer
+from .storage import merge_anonymous_cart
+from .serializers import CartSerializer, CartProductSerializer, AddToCartSerializer, BulkCartSerializer
 
 logger = getLogger(__name__)
 
@@ -63,6 +65,11 @@ class CartViewSet(viewsets.ViewSet):
         if getattr(self, 'swagger_fake_view', False):
             return None  # For schema generation
 
+    def get_permissions(self):
+        if self.action == 'merge_cart':
+            return [IsAuthenticated()]
+        return super().get_permissions()
+
     @extend_schema(
         operation_id="cart_get_details",
         description="Get the current cart contents with total price.",
@@ -92,11 +99,11 @@ class CartViewSet(viewsets.ViewSet):
                     'quantity': item['quantity'],
                     'total_price': item['total_price'],
                 }
-                for item in cart
+                for item in cart.get_items(fields=CartProductSerializer.Meta.fields)
             ],
-            'total_price': cart.get_total_price(),
+            'pricing': cart.get_pricing(),
         }
-        serializer = serializer = CartSerializer(cart_data, context={'request': request})
+        serializer = CartSerializer(cart_data, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'], url_path='add')
@@ -141,6 +148,54 @@ class CartViewSet(viewsets.ViewSet):
             logger.error(f"Invalid data provided in cart post: {serializer.errors}")
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    @extend_schema(
+        operation_id="cart_bulk_update",
+        description="Add or update several products in the cart at once. Operations are applied "
+                    "in order, and none is applied if any product does not exist.",
+        tags=["Cart"],
+        request=BulkCartSerializer,
+        responses={
+            200: OpenApiResponse(description="Products added/updated in cart."),
+            400: OpenApiResponse(description="Invalid operations or unknown products."),
+        },
+    )
+    def bulk_update_cart(self, request):
+        """
+        Apply a list of add/update operations to the cart, validating every product with
+        one query and writing the cart once.
+
+        Args:
+            request: The HTTP request object containing the operations.
+
+        Returns:
+            Response: A JSON response indicating success or failure.
+        """
+        serializer = BulkCartSerializer(data=request.data)
+        if not serializer.is_valid():
+            logger.error(f"Invalid data provided in cart bulk post: {serializer.errors}")
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        operations = serializer.validated_data['operations']
+        product_ids = {operation['product_id'] for operation in operations}
+        products = Product.objects.only('product_id', 'price').in_bulk(product_ids, field_name='product_id')
+        missing = product_ids - products.keys()
+        if missing:
+            return Response(
+                {'message': 'Products not found', 'product_ids': sorted(str(product_id) for product_id in missing)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        cart = Cart(request)
+        cart.add_many(
+            (products[operation['product_id']], operation['quantity'], operation['override'])
+            for operation in operations
+        )
+        return Response(
+            {'message': 'Products added/updated in cart', 'updated_items': len(operations)},
+            status=status.HTTP_200_OK
+        )
+
     @action(detail=True, methods=['delete'], url_path='remove')
     @extend_schema(
         operation_id="cart_remove_product",
@@ -196,3 +251,31 @@ class CartViewSet(viewsets.ViewSet):
         cart = Cart(request)
         cart.clear()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['post'], url_path='merge')
+    @extend_schema(
+        operation_id="cart_merge",
+        description="Merge the anonymous cart of the current session into the authenticated user's cart. "
+                    "Quantities of products in both carts are added up. Login does this automatically.",
+        tags=["Cart"],
+        request=None,
+        responses={
+            200: OpenApiResponse(description="Cart merged successfully."),
+            401: OpenApiResponse(description="Authentication required."),
+        },
+    )
+    def merge_cart(self, request):
+        """
+        Merge the session's anonymous cart into the user's cart in one atomic step.
+
+        Args:
+            request: The HTTP request object.
+
+        Returns:
+            Response: A JSON response with the number of merged cart lines.
+        """
+        merged = merge_anonymous_cart(request, request.user.pk)
+        return Response(
+            {'message': 'Cart merged', 'merged_items': merged},
+            status=status.HTTP_200_OK
+        )
@@ -30,6 +30,7 @@ logger = getLogger(__name__)
 )
 class ProductChatAPIView(PaginationMixin, APIView):
     permission_classes = [IsAuthenticated]
+    cursor_ordering = '-id'
 
     def get(self, request, product_id):
         try:
@@ -40,7 +41,7 @@ class ProductChatAPIView(PaginationMixin, APIView):
 
         try:
             messages = Message.objects.filter(product_id=product.product_id).select_related("sender", "recipient").order_by("-id")
-            paginator = self.pagination_class()
+            paginator = self.paginator
             paginated_messages = paginator.paginate_queryset(messages, request)
             messages_data = [
                 {
@@ -146,7 +146,8 @@ class CouponViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            if cart.get_total_price() < coupon.min_purchase_amount:
+            pricing = cart.get_pricing(coupon)
+            if pricing.subtotal < coupon.min_purchase_amount:
                 return Response(
                     {"detail": f"A minimum purchase of {coupon.min_purchase_amount} is required to use this coupon."},
                     status=status.HTTP_400_BAD_REQUEST
@@ -154,7 +155,11 @@ class CouponViewSet(viewsets.ModelViewSet):
 
             request.session['coupon_id'] = coupon.id
             return Response(
-                {"detail": "Coupon applied successfully.", "discount": coupon.discount},
+                {
+                    "detail": "Coupon applied successfully.",
+                    "discount": coupon.discount,
+                    "discount_amount": pricing.discount,
+                },
                 status=status.HTTP_200_OK
             )
         except Exception as e:
@@ -1,8 +1,32 @@
-from ..utils.pagination import CustomPageNumberPagination
+from ..utils.pagination import CustomCursorPagination, CustomPageNumberPagination
 
 
 class PaginationMixin:
     """
     Mixin to provide custom pagination for viewsets
+
+    Views opt in to keyset pagination by setting ``cursor_ordering``. Clients then
+    request it with ``?pagination=cursor`` and follow the ``next`` links, which cost
+    the same on every page since neither COUNT(*) nor OFFSET is run.
     """
     pagination_class = CustomPageNumberPagination
+    cursor_pagination_class = CustomCursorPagination
+    cursor_ordering = None
+
+    def use_cursor_pagination(self):
+        return bool(self.cursor_ordering) and self.request.query_params.get('pagination') == 'cursor'
+
+    @property
+    def paginator(self):
+        """
+        The paginator instance for this request, chosen by ``use_cursor_pagination``.
+        """
+        if not hasattr(self, '_paginator'):
+            if self.use_cursor_pagination():
+                self._paginator = self.cursor_pagination_class()
+                self._paginator.ordering = self.cursor_ordering
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
@@ -1,6 +1,14 @@
+import orjson
 from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
 
-from ecommerce_api.core.api_standard_response import ApiResponse
+# Types orjson does not handle natively (Decimal, lazy strings, querysets, ...) are
+# converted the same way DRF's own JSON encoder converts them.
+_fallback_encoder = JSONEncoder()
+
+
+def _default(obj):
+    return _fallback_encoder.default(obj)
 
 
 class ApiResponseRenderer(renderers.JSONRenderer):
@@ -14,6 +22,8 @@ class ApiResponseRenderer(renderers.JSONRenderer):
     - Automatically wraps successful responses in the `ApiResponse.success` format.
     - Automatically wraps error responses in the `ApiResponse.error` format.
     - Prevents double-wrapping of already formatted responses.
+    - Builds the envelope as a plain dict and encodes it with orjson, which handles
+      UUID and datetime natively and is several times faster than the stdlib encoder.
     """
 
     def render(self, data, accepted_media_type=None, renderer_context=None):
@@ -28,12 +38,22 @@ class ApiResponseRenderer(renderers.JSONRenderer):
         Returns:
             bytes: The rendered response in JSON format.
         """
+        renderer_context = renderer_context or {}
         # Extract the response object from the renderer context
-        response = renderer_context.get('response', None) if renderer_context else None
+        response = renderer_context.get('response', None)
+
+        option = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        if self.get_indent(accepted_media_type, renderer_context):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(self.get_envelope(data, response), default=_default, option=option)
 
+    def get_envelope(self, data, response=None):
+        """
+        Wrap ``data`` in the success or error structure of `ApiResponse`.
+        """
         # If data already has the expected keys, assume it's been wrapped
         if isinstance(data, dict) and "success" in data and "message" in data:
-            return super().render(data, accepted_media_type, renderer_context)
+            return data
 
         # Handle error responses (status codes >= 400)
         if response and response.status_code >= 400:
@@ -54,15 +74,10 @@ class ApiResponseRenderer(renderers.JSONRenderer):
                 message = 'An error occurred'
                 errors = {'detail': data}
 
-            return super().render(
-                ApiResponse.error(message=message, status_code=response.status_code, errors=errors).data,
-                accepted_media_type,
-                renderer_context,
-            )
+            envelope = {"success": False, "message": message}
+            if errors:
+                envelope["errors"] = errors
+            return envelope
 
         # Handle success responses (status codes < 400)
-        return super().render(
-            ApiResponse.success(data=data).data,
-            accepted_media_type,
-            renderer_context
-        )
+        return {"success": True, "message": "Success", "data": data}
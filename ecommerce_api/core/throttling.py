@@ -0,0 +1,50 @@
+from ecommerce_api.utils.redis_client import async_redis_client
+
+# Check and arm a cooldown in a single atomic step.
+# KEYS: cooldown key
+# ARGV: cooldown in milliseconds
+# Returns 0 when the call is allowed, otherwise the milliseconds left to wait.
+COOLDOWN_SCRIPT = """
+local remaining = redis.call('PTTL', KEYS[1])
+if remaining > 0 then
+    return remaining
+end
+redis.call('SET', KEYS[1], 1, 'PX', ARGV[1])
+return 0
+"""
+
+
+class AsyncCooldownThrottle:
+    """
+    Non-blocking per-client throttle for WebSocket consumers.
+
+    Allows one message per ``cooldown`` seconds and client. Each check is a single
+    Lua script call on the asyncio Redis client, so the event loop is never blocked
+    and concurrent messages cannot race between reading and writing the timestamp.
+    The key expires on its own, so nothing has to be cleaned up on disconnect.
+    """
+
+    def __init__(self, scope, cooldown=0.5, client=None):
+        self.scope = scope
+        self.cooldown_ms = max(1, int(cooldown * 1000))
+        self.client = client or async_redis_client
+        self._check = self.client.register_script(COOLDOWN_SCRIPT)
+
+    def get_cache_key(self, ident):
+        return f'throttle:{self.scope}:{ident}'
+
+    async def wait(self, ident):
+        """
+        Record a message for ``ident``.
+
+        Returns:
+            float: 0 if the message is allowed, otherwise the seconds to wait.
+        """
+        remaining = await self._check(keys=[self.get_cache_key(ident)], args=[self.cooldown_ms])
+        return int(remaining) / 1000
+
+    async def reset(self, ident):
+        """
+        Forget the cooldown for ``ident``.
+        """
+        await self.client.delete(self.get_cache_key(ident))
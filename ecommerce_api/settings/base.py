@@ -221,6 +221,12 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Paginated results the planner estimates above this many rows report an approximate
+# count instead of running COUNT(*); disable PAGINATION_APPROXIMATE_COUNT to always
+# count exactly
+PAGINATION_APPROXIMATE_COUNT = env.bool('PAGINATION_APPROXIMATE_COUNT', default=True)
+PAGINATION_APPROXIMATE_COUNT_THRESHOLD = env.int('PAGINATION_APPROXIMATE_COUNT_THRESHOLD', default=10000)
+
 #      ╭──────────────────────────────────────────────────────────╮
 #      │       Configuration for JWT Authentication Tokens        │
 #      ╰──────────────────────────────────────────────────────────╯
@@ -341,6 +347,16 @@ INTERNAL_IPS = [
 ]
 
 CART_SESSION_ID = 'cart'
+# Where carts are kept: cart.storage.RedisCartStorage (a Redis hash per cart) or
+# cart.storage.SessionCartStorage (a dict in the session)
+CART_STORAGE_BACKEND = env('CART_STORAGE_BACKEND', default='cart.storage.RedisCartStorage')
+# Seconds an untouched Redis cart is kept, matching the session cookie age
+CART_TTL = env.int('CART_TTL', default=1209600)
+
+# Stock is reserved in Redis from checkout until payment, see orders.inventory
+INVENTORY_RESERVATIONS_ENABLED = env.bool('INVENTORY_RESERVATIONS_ENABLED', default=True)
+# Seconds an unpaid order holds its stock before it is given back
+INVENTORY_RESERVATION_TTL = env.int('INVENTORY_RESERVATION_TTL', default=900)
 
 #      ╭──────────────────────────────────────────────────────────╮
 #      │                   Email Configuration                    │
@@ -352,6 +368,10 @@ vars().update(EMAIL_CONFIG)
 SITE_ID = 1
 
 ASGI_APPLICATION = 'ecommerce_api.asgi.application'
+# Serve the payment and shipping endpoints that wait on a provider with async views,
+# with pooled async connections to the providers. Only enable it when the site runs
+# under ASGI, where those views share one long-lived event loop
+ASYNC_PROVIDER_VIEWS = env.bool('ASYNC_PROVIDER_VIEWS', default=False)
 
 SMS_IR_OTP_TEMPLATE_ID = env('SMS_IR_OTP_TEMPLATE_ID', default=123456)
 
@@ -362,6 +382,21 @@ POSTEX_SENDER_POSTAL_CODE = env('POSTEX_SENDER_POSTAL_CODE', default='Your Compa
 POSTEX_FROM_CITY_CODE = env.int('POSTEX_FROM_CITY_CODE', default=1)
 POSTEX_SERVICE_TYPE = env('POSTEX_SERVICE_TYPE', default='standard')
 
+# Seconds to wait for each external provider's response, see ecommerce_api.utils.http_client
+ZIBAL_HTTP_TIMEOUT = env.float('ZIBAL_HTTP_TIMEOUT', default=10)
+POSTEX_HTTP_TIMEOUT = env.float('POSTEX_HTTP_TIMEOUT', default=15)
+SMS_IR_HTTP_TIMEOUT = env.float('SMS_IR_HTTP_TIMEOUT', default=5)
+# Retries of failed connections, and of gateway errors for idempotent calls
+PROVIDER_HTTP_RETRIES = env.int('PROVIDER_HTTP_RETRIES', default=2)
+# Calls to a provider fail fast for CIRCUIT_BREAKER_RECOVERY_TIMEOUT seconds after
+# CIRCUIT_BREAKER_FAILURE_THRESHOLD failures within CIRCUIT_BREAKER_FAILURE_WINDOW seconds
+CIRCUIT_BREAKERS_ENABLED = env.bool('CIRCUIT_BREAKERS_ENABLED', default=True)
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = env.int('CIRCUIT_BREAKER_FAILURE_THRESHOLD', default=5)
+CIRCUIT_BREAKER_FAILURE_WINDOW = env.int('CIRCUIT_BREAKER_FAILURE_WINDOW', default=60)
+CIRCUIT_BREAKER_RECOVERY_TIMEOUT = env.int('CIRCUIT_BREAKER_RECOVERY_TIMEOUT', default=30)
+# Calls in flight to each provider, across all workers
+PROVIDER_MAX_CONCURRENT_CALLS = env.int('PROVIDER_MAX_CONCURRENT_CALLS', default=20)
+
 AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
     'social_core.backends.google.GoogleOAuth2',
@@ -416,6 +451,9 @@ SITE_NAME = env('SITE_NAME')
 
 TAGGIT_CASE_INSENSITIVE = True
 
+# Text search configuration used to build and query Product.search_vector
+PRODUCT_SEARCH_CONFIG = env('PRODUCT_SEARCH_CONFIG', default='simple')
+
 # Celery Configuration using Redis
 CELERY_BROKER_URL = env('CELERY_BROKER_URL')
 CELERY_RESULT_BACKEND = env('CELERY_RESULT_BACKEND')
@@ -423,6 +461,24 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+CELERY_BEAT_SCHEDULE = {
+    'refresh-related-products': {
+        'task': 'shop.tasks.refresh_related_products',
+        'schedule': 60 * 60,  # hourly; stale products plus one page of the catalogue per run
+    },
+    'reconcile-product-ratings': {
+        'task': 'shop.tasks.reconcile_product_ratings',
+        'schedule': 60 * 60 * 24,
+    },
+    'release-expired-reservations': {
+        'task': 'orders.tasks.release_expired_stock_reservations',
+        'schedule': 60,
+    },
+    'reconcile-stock-reservations': {
+        'task': 'orders.tasks.reconcile_stock_reservations',
+        'schedule': 60 * 60,
+    },
+}
 
 SESSION_ENGINE = "django.contrib.sessions.backends.cache"
 SESSION_CACHE_ALIAS = "default"
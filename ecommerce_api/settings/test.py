@@ -21,3 +21,12 @@ CHANNEL_LAYERS = {
         'BACKEND': 'channels.layers.InMemoryChannelLayer',
     },
 }
+
+# Keep carts in the session so tests do not need Redis
+CART_STORAGE_BACKEND = 'cart.storage.SessionCartStorage'
+
+# Check stock against the database only, without Redis reservations
+INVENTORY_RESERVATIONS_ENABLED = False
+
+# Keep provider circuit breakers out of Redis
+CIRCUIT_BREAKERS_ENABLED = False
@@ -0,0 +1,71 @@
+import time
+
+from django.core.cache import cache
+
+# Each tag has a generation counter in the cache. Tagged entries store the
+# generations of their tags and are treated as a miss once any of them moved on, so
+# invalidating a tag is a single INCR no matter how many entries carry it.
+
+
+def get_tag_key(tag):
+    return f'cache_tag:{tag}'
+
+
+def get_tag_versions(tags):
+    """
+    Return the current generation of each tag, creating missing counters.
+
+    Returns:
+        dict: Tag name to generation.
+    """
+    tags = list(dict.fromkeys(tags))
+    stored = cache.get_many([get_tag_key(tag) for tag in tags])
+    versions = {}
+    for tag in tags:
+        key = get_tag_key(tag)
+        if key not in stored:
+            # Seeded from the clock so a lost counter never comes back as a generation
+            # that stale entries were stored under.
+            cache.add(key, time.time_ns(), None)
+            stored[key] = cache.get(key)
+        versions[tag] = stored[key]
+    return versions
+
+
+def invalidate_tags(*tags):
+    """
+    Invalidate every entry stored with any of the given tags.
+    """
+    for tag in dict.fromkeys(tags):
+        try:
+            cache.incr(get_tag_key(tag))
+        except ValueError:
+            cache.set(get_tag_key(tag), time.time_ns(), None)
+
+
+def set_tagged(key, value, tags, timeout=None, versions=None):
+    """
+    Store ``value`` under ``key`` together with the current generations of ``tags``.
+
+    ``versions`` are the generations read with :func:`get_tag_versions` before
+    ``value`` was computed. If any of them moved on since, ``value`` may predate the
+    invalidation and is not stored. Tags left out of ``versions`` must be covered by
+    one in it that is invalidated along with them.
+    """
+    current = get_tag_versions([*tags, *(versions or ())])
+    if versions and any(current[tag] != version for tag, version in versions.items()):
+        return
+    cache.set(key, {'tags': {tag: current[tag] for tag in tags}, 'value': value}, timeout)
+
+
+def get_tagged(key, default=None):
+    """
+    Return the value stored with :func:`set_tagged`, or ``default`` if it is missing
+    or any of its tags was invalidated since.
+    """
+    entry = cache.get(key)
+    if not isinstance(entry, dict) or 'tags' not in entry:
+        return default
+    if entry['tags'] and get_tag_versions(entry['tags']) != entry['tags']:
+        return default
+    return entry['value']
@@ -0,0 +1,255 @@
+import logging
+import time
+import uuid
+
+import requests
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from .redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Count a failed call and open the circuit once the threshold is reached within the
+# failure window.
+# KEYS: failure counter, open flag
+# ARGV: failure threshold, failure window, recovery timeout (seconds)
+# Returns the failure count.
+RECORD_FAILURE_SCRIPT = """
+local failures = redis.call('INCR', KEYS[1])
+if failures == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+if failures >= tonumber(ARGV[1]) then
+    redis.call('SET', KEYS[1], failures, 'EX', ARGV[3] * 2)
+    redis.call('SET', KEYS[2], 1, 'EX', ARGV[3])
+end
+return failures
+"""
+
+# Take a slot for a call unless the limit of calls in flight is reached. Slots of calls
+# older than the lease are dropped, so a crashed worker cannot leak them.
+# KEYS: sorted set of calls in flight
+# ARGV: now, lease (seconds), limit, call id
+# Returns 1 if a slot was taken.
+ACQUIRE_SLOT_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1] - ARGV[2])
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[4])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+class ProviderUnavailableError(requests.exceptions.ConnectionError):
+    """
+    Raised instead of calling a provider that is known to be unhealthy or saturated.
+    It is a ``requests`` connection error, so providers handle it like any other.
+    """
+
+
+class CircuitOpenError(ProviderUnavailableError):
+    pass
+
+
+class BulkheadFullError(ProviderUnavailableError):
+    pass
+
+
+def get_client():
+    """
+    Return the Redis client holding breaker state, or None when breakers are disabled.
+    """
+    return redis_client if settings.CIRCUIT_BREAKERS_ENABLED else None
+
+
+class CircuitBreaker:
+    """
+    A circuit breaker whose state lives in Redis, so every worker sees the same one.
+
+    The circuit opens after ``failure_threshold`` failures within ``failure_window``
+    seconds, and calls then fail fast for ``recovery_timeout`` seconds. After that the
+    circuit is half-open: one worker at a time may try a call, and the first success
+    closes it again while a failure opens it for another ``recovery_timeout``.
+
+    If Redis itself is unavailable calls are let through.
+    """
+
+    def __init__(self, name, failure_threshold=5, failure_window=60, recovery_timeout=30, client=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.failure_window = failure_window
+        self.recovery_timeout = recovery_timeout
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client or get_client()
+
+    @property
+    def failures_key(self):
+        return f'circuit:{self.name}:failures'
+
+    @property
+    def open_key(self):
+        return f'circuit:{self.name}:open'
+
+    @property
+    def probe_key(self):
+        return f'circuit:{self.name}:probe'
+
+    def read(self):
+        """
+        Returns:
+            tuple: The circuit state and the recent failure count.
+        """
+        is_open, failures = self.client.mget(self.open_key, self.failures_key)
+        failures = int(failures or 0)
+        if is_open:
+            return OPEN, failures
+        if failures >= self.failure_threshold:
+            return HALF_OPEN, failures
+        return CLOSED, failures
+
+    def get_state(self):
+        client = self.client
+        if client is None:
+            return CLOSED
+        try:
+            return self.read()[0]
+        except RedisError as e:
+            logger.error("Error reading circuit %s: %s", self.name, e)
+            return CLOSED
+
+    def before_call(self):
+        """
+        Check that a call may be made.
+
+        Returns:
+            int: The recent failure count, to pass to ``record_success``.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with another
+                worker already trying a call.
+        """
+        client = self.client
+        if client is None:
+            return 0
+        try:
+            state, failures = self.read()
+            if state == HALF_OPEN and not client.set(self.probe_key, 1, nx=True, ex=self.recovery_timeout):
+                state = OPEN
+        except RedisError as e:
+            logger.error("Error reading circuit %s: %s", self.name, e)
+            return 0
+        if state == OPEN:
+            raise CircuitOpenError(f"{self.name} is unavailable, its circuit is open")
+        return failures
+
+    def cancel_call(self, failures):
+        """
+        Give back the half-open probe taken by ``before_call`` for a call that was not
+        made after all, so another worker can probe right away.
+        """
+        if failures < self.failure_threshold or self.client is None:
+            return
+        try:
+            self.client.delete(self.probe_key)
+        except RedisError as e:
+            logger.error("Error releasing probe of circuit %s: %s", self.name, e)
+
+    def record_success(self, failures):
+        if not failures or self.client is None:
+            return
+        try:
+            self.client.delete(self.failures_key, self.probe_key)
+        except RedisError as e:
+            logger.error("Error closing circuit %s: %s", self.name, e)
+
+    def record_failure(self):
+        client = self.client
+        if client is None:
+            return
+        try:
+            record = client.register_script(RECORD_FAILURE_SCRIPT)
+            failures = int(record(
+                keys=[self.failures_key, self.open_key],
+                args=[self.failure_threshold, self.failure_window, self.recovery_timeout],
+            ))
+            client.delete(self.probe_key)
+        except RedisError as e:
+            logger.error("Error recording failure of circuit %s: %s", self.name, e)
+            return
+        if failures >= self.failure_threshold:
+            logger.warning("Circuit %s is open after %s failures", self.name, failures)
+
+
+class Bulkhead:
+    """
+    Caps the calls in flight to a provider across all workers, so a slow provider
+    cannot tie up every worker. Each call holds a slot for at most ``lease`` seconds.
+
+    If Redis itself is unavailable calls are let through.
+    """
+
+    def __init__(self, name, limit=10, lease=60, client=None):
+        self.name = name
+        self.limit = limit
+        self.lease = lease
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client or get_client()
+
+    @property
+    def key(self):
+        return f'bulkhead:{self.name}'
+
+    def in_flight(self):
+        client = self.client
+        if client is None:
+            return 0
+        try:
+            return client.zcount(self.key, time.time() - self.lease, '+inf')
+        except RedisError as e:
+            logger.error("Error reading bulkhead %s: %s", self.name, e)
+            return 0
+
+    def acquire(self):
+        """
+        Take a slot for a call, to give back with ``release``.
+
+        Returns:
+            str: The call id holding the slot, or None when no slot was taken.
+
+        Raises:
+            BulkheadFullError: If ``limit`` calls are already in flight.
+        """
+        client = self.client
+        if client is None:
+            return None
+        call_id = uuid.uuid4().hex
+        try:
+            acquire = client.register_script(ACQUIRE_SLOT_SCRIPT)
+            acquired = bool(acquire(keys=[self.key], args=[time.time(), self.lease, self.limit, call_id]))
+        except RedisError as e:
+            logger.error("Error acquiring bulkhead %s: %s", self.name, e)
+            return None
+        if not acquired:
+            raise BulkheadFullError(f"{self.name} has {self.limit} calls in flight")
+        return call_id
+
+    def release(self, call_id):
+        if call_id is None:
+            return
+        try:
+            self.client.zrem(self.key, call_id)
+        except RedisError as e:
+            logger.error("Error releasing bulkhead %s: %s", self.name, e)
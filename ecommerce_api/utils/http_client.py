@@ -0,0 +1,289 @@
+import asyncio
+import logging
+import os
+import time
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from prometheus_client import Counter, Histogram
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .circuit_breaker import Bulkhead, BulkheadFullError, CircuitBreaker, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+OUTBOUND_REQUEST_DURATION = Histogram(
+    'outbound_http_request_duration_seconds',
+    'Latency of calls to external providers',
+    ['provider', 'method', 'status'],
+)
+OUTBOUND_REQUEST_REJECTED = Counter(
+    'outbound_http_request_rejected_total',
+    'Calls to external providers failed fast without being sent',
+    ['provider', 'reason'],
+)
+
+
+class HttpClient:
+    """
+    Outbound HTTP client for one external provider (payment gateway, shipping, SMS).
+
+    Calls share a pooled ``requests.Session`` with keep-alive, are bounded by the
+    provider's timeout and retried with exponential backoff. Connection errors are
+    retried for every method since the request never reached the provider; read
+    errors and 502/503/504 responses only for idempotent methods, so a payment request
+    is never sent twice. Each call's latency is logged and recorded in
+    ``OUTBOUND_REQUEST_DURATION``.
+
+    Calls also go through the provider's circuit breaker and bulkhead, which fail fast
+    with a ``ProviderUnavailableError`` while the provider is unhealthy or already has
+    ``max_concurrent_calls`` calls in flight. Provider clients are listed on the
+    provider status endpoint once registered with ``register``.
+    """
+    clients = {}
+
+    def __init__(self, name, base_url, timeout, connect_timeout=3.05, retries=2, backoff_factor=0.3,
+                 pool_maxsize=10, max_concurrent_calls=None):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, timeout)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.pool_maxsize = pool_maxsize
+        self._session = None
+        self._pid = None
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            failure_window=settings.CIRCUIT_BREAKER_FAILURE_WINDOW,
+            recovery_timeout=settings.CIRCUIT_BREAKER_RECOVERY_TIMEOUT,
+        )
+        self.bulkhead = Bulkhead(
+            name,
+            limit=max_concurrent_calls or settings.PROVIDER_MAX_CONCURRENT_CALLS,
+            # the longest a call can take with all its retries
+            lease=int((connect_timeout + timeout) * (retries + 1)) + 1,
+        )
+
+    def register(self):
+        """
+        List this client on the provider status endpoint, under its name.
+        """
+        HttpClient.clients[self.name] = self
+        return self
+
+    @property
+    def session(self):
+        # Pooled connections must not be shared across forked worker processes
+        if self._session is None or self._pid != os.getpid():
+            self._session = self.create_session()
+            self._pid = os.getpid()
+        return self._session
+
+    def create_session(self):
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=self.pool_maxsize)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def request(self, method, path, **kwargs):
+        """
+        Send a request to ``path`` under the provider's base URL.
+
+        Returns:
+            requests.Response: The provider's response.
+
+        Raises:
+            requests.exceptions.RequestException: If the provider could not be reached
+                in time after all retries, or is unavailable (``ProviderUnavailableError``).
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        url = f'{self.base_url}/{path.lstrip("/")}'
+        failures, call_id = self.open_call()
+        failed = None
+        try:
+            response = self.send(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            failed = True
+            raise
+        else:
+            failed = response.status_code >= 500
+        finally:
+            self.close_call(failures, call_id, failed)
+        return response
+
+    def send(self, method, url, **kwargs):
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            response = self.session.request(method, url, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            self.observe(method, url, status, time.perf_counter() - started)
+
+    def observe(self, method, url, status, elapsed):
+        OUTBOUND_REQUEST_DURATION.labels(self.name, method, status).observe(elapsed)
+        logger.info("%s %s %s -> %s in %.1f ms", self.name, method, url, status, elapsed * 1000)
+
+    def open_call(self):
+        """
+        Check the circuit breaker and take a bulkhead slot before a call.
+
+        Returns:
+            tuple: The breaker's failure count and the slot's call id, to pass to
+                ``close_call``.
+
+        Raises:
+            ProviderUnavailableError: If the circuit is open or the bulkhead is full.
+        """
+        try:
+            failures = self.breaker.before_call()
+        except CircuitOpenError:
+            OUTBOUND_REQUEST_REJECTED.labels(self.name, 'circuit_open').inc()
+            raise
+        try:
+            call_id = self.bulkhead.acquire()
+        except BulkheadFullError:
+            self.breaker.cancel_call(failures)
+            OUTBOUND_REQUEST_REJECTED.labels(self.name, 'bulkhead_full').inc()
+            raise
+        return failures, call_id
+
+    def close_call(self, failures, call_id, failed):
+        """
+        Give back the bulkhead slot of a call and record its outcome with the circuit
+        breaker. ``failed`` is None when the call was interrupted on our side, which
+        says nothing about the provider.
+        """
+        self.bulkhead.release(call_id)
+        if failed:
+            self.breaker.record_failure()
+        elif failed is not None:
+            self.breaker.record_success(failures)
+
+    def get_status(self):
+        return {
+            'provider': self.name,
+            'circuit': self.breaker.get_state(),
+            'in_flight': self.bulkhead.in_flight(),
+            'max_concurrent_calls': self.bulkhead.limit,
+        }
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+
+class AsyncHttpClient:
+    """
+    Asynchronous counterpart of an ``HttpClient``, for async views served over ASGI.
+
+    Calls share the provider's timeouts, circuit breaker and bulkhead with the
+    synchronous client. Connection errors are retried; unlike the synchronous client,
+    gateway errors are not.
+
+    Connections are only pooled when ``pooled`` is set, which defaults to
+    ``ASYNC_PROVIDER_VIEWS``: the async views then run on the ASGI server's long-lived
+    event loop, and one ``httpx.AsyncClient`` serves every call. Without it, as under
+    WSGI where ``async_to_sync`` runs each request on a short-lived loop, every call
+    opens its own client and closes it once answered.
+    """
+
+    def __init__(self, client, pooled=None):
+        self.sync_client = client
+        self.name = client.name
+        self.pooled = settings.ASYNC_PROVIDER_VIEWS if pooled is None else pooled
+        self._client = None
+        self._loop = None
+
+    @property
+    def client(self):
+        # An httpx client's connections belong to the event loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self.close_client()
+            self._client = self.create_client()
+            self._loop = loop
+        return self._client
+
+    def close_client(self):
+        """
+        Close the pooled client of a previous event loop, on that loop.
+        """
+        if self._client is not None and not self._loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop)
+        self._client = None
+        self._loop = None
+
+    def create_client(self):
+        connect_timeout, timeout = self.sync_client.timeout
+        transport = httpx.AsyncHTTPTransport(
+            retries=self.sync_client.retries,
+            limits=httpx.Limits(max_connections=self.sync_client.bulkhead.limit),
+        )
+        return httpx.AsyncClient(timeout=httpx.Timeout(timeout, connect=connect_timeout), transport=transport)
+
+    async def request(self, method, path, **kwargs):
+        """
+        Send a request to ``path`` under the provider's base URL.
+
+        Returns:
+            httpx.Response: The provider's response.
+
+        Raises:
+            httpx.HTTPError: If the provider could not be reached in time after all retries.
+            ProviderUnavailableError: If the provider is unavailable.
+        """
+        url = f'{self.sync_client.base_url}/{path.lstrip("/")}'
+        # The breaker and bulkhead are a Redis round-trip each, run off the event loop
+        failures, call_id = await sync_to_async(self.sync_client.open_call, thread_sensitive=False)()
+        failed = None
+        try:
+            response = await self.send(method, url, **kwargs)
+        except httpx.HTTPError:
+            failed = True
+            raise
+        else:
+            failed = response.status_code >= 500
+        finally:
+            await sync_to_async(self.sync_client.close_call, thread_sensitive=False)(failures, call_id, failed)
+        return response
+
+    async def send(self, method, url, **kwargs):
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            if self.pooled:
+                response = await self.client.request(method, url, **kwargs)
+            else:
+                async with self.create_client() as client:
+                    response = await client.request(method, url, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            self.sync_client.observe(method, url, status, time.perf_counter() - started)
+
+    async def get(self, path, **kwargs):
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request('POST', path, **kwargs)
+
+    async def delete(self, path, **kwargs):
+        return await self.request('DELETE', path, **kwargs)
@@ -1,8 +1,108 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 from ecommerce_api.core.api_standard_response import ApiResponse
 
 
+def estimate_count(queryset):
+    """
+    Return the planner's row estimate for a queryset, or None where the database
+    cannot provide one.
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPage(Page):
+    """
+    A page of an ``EstimatedCountPaginator`` that knows from its own rows whether a
+    next page exists.
+    """
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+# Paginator that trusts the planner for large results instead of running COUNT(*).
+# The estimate is only reported: which pages exist and whether there is a next one
+# is decided from the rows actually fetched, and a page reaching the end of the
+# results counts them exactly without asking the planner at all.
+class EstimatedCountPaginator(Paginator):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_is_approximate = False
+
+    @property
+    def approximate_count_threshold(self):
+        # Results estimated above this many rows get an approximate count, None disables it
+        if not settings.PAGINATION_APPROXIMATE_COUNT:
+            return None
+        return settings.PAGINATION_APPROXIMATE_COUNT_THRESHOLD
+
+    @cached_property
+    def estimates_count(self):
+        return self.approximate_count_threshold is not None and isinstance(self.object_list, QuerySet)
+
+    @cached_property
+    def count(self):
+        if self.estimates_count:
+            estimate = estimate_count(self.object_list)
+            if estimate is not None and estimate > self.approximate_count_threshold:
+                self.count_is_approximate = True
+                return estimate
+        return super().count
+
+    def validate_number(self, number):
+        if not self.estimates_count:
+            return super().validate_number(number)
+        # The count is not a bound, page() finds out whether the page exists
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages['invalid_page'])
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.estimates_count:
+            return super().page(number)
+
+        bottom = (number - 1) * self.per_page
+        # One row past the page tells whether another page follows
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and (number > 1 or not self.allow_empty_first_page):
+            raise EmptyPage(self.error_messages['no_results'])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        # Keep the reported totals consistent with the rows found: the count is exact
+        # on the last page and at least what has been seen on any other
+        seen = bottom + len(rows)
+        if not has_next:
+            self.count = seen
+            self.count_is_approximate = False
+        elif self.count <= seen:
+            self.count = seen + 1
+        self.__dict__.pop('num_pages', None)
+        return EstimatedCountPage(rows, number, self, has_next)
+
+
 # Custom pagination class extending DRF's PageNumberPagination
 class CustomPageNumberPagination(PageNumberPagination):
     # Default number of items per page
@@ -13,6 +113,8 @@ class CustomPageNumberPagination(PageNumberPagination):
     max_page_size = 100
     # Query parameter for the page number
     page_query_param = 'page'
+    # Large results get a planner estimate instead of an exact COUNT(*)
+    django_paginator_class = EstimatedCountPaginator
 
     def get_paginated_response(self, data):
         """
@@ -31,9 +133,44 @@ class CustomPageNumberPagination(PageNumberPagination):
                     'next': self.get_next_link(),  # URL for the next page, if available
                     'previous': self.get_previous_link(),  # URL for the previous page, if available
                     'count': self.page.paginator.count,  # Total number of items
+                    'count_is_approximate': self.page.paginator.count_is_approximate,  # Whether count is an estimate
                     'current_page': self.page.number,  # Current page number
                     'total_pages': self.page.paginator.num_pages,  # Total number of pages
                     'page_size': self.get_page_size(self.request)  # Number of items per page
                 }
             }
         )
+
+
+# Keyset pagination: pages are located by an opaque cursor over the ordering instead
+# of OFFSET, and no COUNT(*) is run, so every page costs the same.
+class CustomCursorPagination(CursorPagination):
+    # Default number of items per page
+    page_size = 10
+    # Query parameter to allow clients to set the page size
+    page_size_query_param = 'page_size'
+    # Maximum allowed page size
+    max_page_size = 100
+    # Default ordering, views override it through PaginationMixin.cursor_ordering
+    ordering = '-created'
+
+    def get_paginated_response(self, data):
+        """
+        Generate a paginated response using the standardized API response format.
+
+        Args:
+            data: The paginated data to include in the response.
+
+        Returns:
+            Response: A DRF Response object with pagination metadata and data.
+        """
+        return ApiResponse.success(
+            data=data,  # The paginated data
+            meta={
+                'pagination': {
+                    'next': self.get_next_link(),  # URL for the next page, if available
+                    'previous': self.get_previous_link(),  # URL for the previous page, if available
+                    'page_size': self.get_page_size(self.request)  # Number of items per page
+                }
+            }
+        )
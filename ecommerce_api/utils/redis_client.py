@@ -0,0 +1,9 @@
+import redis
+import redis.asyncio
+from django.conf import settings
+
+# Shared Redis connections for data structures that live outside the Django cache
+# (sorted sets, hashes, Lua scripts). Both clients keep their own connection pool and
+# only connect on first use.
+redis_client = redis.from_url(settings.REDIS_URL)
+async_redis_client = redis.asyncio.from_url(settings.REDIS_URL)
@@ -0,0 +1,298 @@
+import time
+from logging import getLogger
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from redis.exceptions import RedisError
+
+from ecommerce_api.utils.redis_client import redis_client
+from shop.cache import invalidate_products
+from shop.models import Product
+from .models import Order
+
+logger = getLogger(__name__)
+
+# Stock is reserved between checkout and payment. Product.stock in the database stays
+# the physical stock and is only decremented when a payment commits the reservation;
+# Redis holds the reservations themselves:
+#
+# - RESERVED_KEY, a hash of product id to the quantity currently reserved,
+# - one hash per order (see get_reservation_key) with the quantity of each product,
+# - EXPIRING_KEY, a sorted set of order ids scored by when their reservation expires,
+#   which release_expired_reservations uses to give expired reservations back.
+#
+# A product can be reserved up to its stock minus what is already reserved, so checkout
+# never takes a row lock, and the conditional decrement in commit_reservation keeps the
+# database from overselling even if Redis is unavailable.
+RESERVED_KEY = 'inventory:reserved'
+EXPIRING_KEY = 'inventory:reservations'
+RESERVATION_KEY_PREFIX = 'inventory:reservation:'
+
+# Reserve all lines of an order or none of them.
+# KEYS: reserved hash, order reservation hash, expiring sorted set
+# ARGV: order id, expiry timestamp, then product id, quantity and stock per line
+# Returns 1 on success, 0 if the order already holds a reservation, or -n if line n
+# (1-based) does not have enough unreserved stock.
+RESERVE_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return 0
+end
+for i = 3, #ARGV, 3 do
+    local reserved = tonumber(redis.call('HGET', KEYS[1], ARGV[i]) or '0')
+    if reserved + tonumber(ARGV[i + 1]) > tonumber(ARGV[i + 2]) then
+        return -((i - 3) / 3 + 1)
+    end
+end
+for i = 3, #ARGV, 3 do
+    redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+    redis.call('HSET', KEYS[2], ARGV[i], ARGV[i + 1])
+end
+redis.call('ZADD', KEYS[3], ARGV[2], ARGV[1])
+return 1
+"""
+
+# Give an order's reservation back. Releasing twice is a no-op.
+# KEYS: reserved hash, order reservation hash, expiring sorted set
+# ARGV: order id
+# Returns the number of released lines.
+RELEASE_SCRIPT = """
+local lines = redis.call('HGETALL', KEYS[2])
+for i = 1, #lines, 2 do
+    if redis.call('HINCRBY', KEYS[1], lines[i], -tonumber(lines[i + 1])) <= 0 then
+        redis.call('HDEL', KEYS[1], lines[i])
+    end
+end
+redis.call('DEL', KEYS[2])
+redis.call('ZREM', KEYS[3], ARGV[1])
+return #lines / 2
+"""
+
+# Rebuild the reserved quantities from the reservations still held.
+# KEYS: reserved hash, expiring sorted set
+# ARGV: reservation key prefix
+# Returns the number of products with reserved stock.
+RECONCILE_SCRIPT = """
+redis.call('DEL', KEYS[1])
+for _, order_id in ipairs(redis.call('ZRANGE', KEYS[2], 0, -1)) do
+    local lines = redis.call('HGETALL', ARGV[1] .. order_id)
+    for i = 1, #lines, 2 do
+        redis.call('HINCRBY', KEYS[1], lines[i], lines[i + 1])
+    end
+end
+return redis.call('HLEN', KEYS[1])
+"""
+
+
+class InsufficientStockError(Exception):
+    """
+    Raised when some products of an order do not have enough stock.
+    """
+
+    def __init__(self, products):
+        self.products = products
+        super().__init__(f"Insufficient stock for product: {', '.join(product.name for product in products)}")
+
+
+def get_reservation_key(order_id):
+    return f'{RESERVATION_KEY_PREFIX}{order_id}'
+
+
+def get_client():
+    """
+    Return the Redis client holding reservations, or None when they are disabled.
+    """
+    return redis_client if settings.INVENTORY_RESERVATIONS_ENABLED else None
+
+
+def reserve_stock(order_id, lines, client=None):
+    """
+    Reserve stock for the lines of an order until ``INVENTORY_RESERVATION_TTL``
+    seconds from now. Reserving an order that already holds a reservation keeps the
+    existing one.
+
+    Without Redis, the lines are only checked against the current stock, and the
+    conditional decrement in ``commit_reservation`` is what prevents overselling.
+
+    Args:
+        order_id: The order to reserve stock for.
+        lines: ``(product, quantity)`` pairs.
+        client: The Redis client, see ``get_client``.
+
+    Raises:
+        InsufficientStockError: If any product does not have enough unreserved stock.
+    """
+    lines = list(lines)
+    stock = dict(
+        Product.objects.filter(product_id__in=[product.product_id for product, _ in lines])
+        .values_list('product_id', 'stock')
+    )
+    client = client or get_client()
+    if client is not None:
+        args = [str(order_id), time.time() + settings.INVENTORY_RESERVATION_TTL]
+        for product, quantity in lines:
+            args += [str(product.product_id), quantity, stock.get(product.product_id, 0)]
+        try:
+            reserve = client.register_script(RESERVE_SCRIPT)
+            result = int(reserve(keys=[RESERVED_KEY, get_reservation_key(order_id), EXPIRING_KEY], args=args))
+        except RedisError as e:
+            logger.error("Error reserving stock for order %s: %s", order_id, e)
+        else:
+            if result < 0:
+                raise InsufficientStockError([lines[-result - 1][0]])
+            return
+
+    short = [product for product, quantity in lines if stock.get(product.product_id, 0) < quantity]
+    if short:
+        raise InsufficientStockError(short)
+
+
+def release_reservation(order_id, client=None):
+    """
+    Give the stock reserved for an order back.
+
+    Returns:
+        int: The number of released lines.
+    """
+    client = client or get_client()
+    if client is None:
+        return 0
+    try:
+        release = client.register_script(RELEASE_SCRIPT)
+        return int(release(keys=[RESERVED_KEY, get_reservation_key(order_id), EXPIRING_KEY], args=[str(order_id)]))
+    except RedisError as e:
+        logger.error("Error releasing stock reserved for order %s: %s", order_id, e)
+        return 0
+
+
+def has_reservation(order_id, client=None):
+    client = client or get_client()
+    if client is None:
+        return False
+    try:
+        return bool(client.exists(get_reservation_key(order_id)))
+    except RedisError as e:
+        logger.error("Error reading stock reservation of order %s: %s", order_id, e)
+        return False
+
+
+def ensure_reservation(order):
+    """
+    Hold the stock of an order while the user pays, reserving it again if the checkout
+    reservation expired.
+
+    Raises:
+        InsufficientStockError: If any product no longer has enough unreserved stock.
+    """
+    if not has_reservation(order.order_id):
+        lines = [(item.product, item.quantity) for item in order.items.select_related('product')]
+        reserve_stock(order.order_id, lines)
+
+
+def settle_stock(items):
+    """
+    Decrement the stock of several order items with a single conditional UPDATE.
+
+    Every product is decremented by its quantity only where enough stock is left. If
+    any line falls short the whole UPDATE is rolled back, so stock is either settled
+    for all lines or for none.
+
+    Args:
+        items: Order items with their products loaded.
+
+    Returns:
+        list: The items without enough stock, empty when the stock was settled.
+    """
+    quantities = {}
+    for item in items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    if not quantities:
+        return []
+    quantity = Case(
+        *(When(product_id=product_id, then=Value(value)) for product_id, value in quantities.items()),
+        output_field=IntegerField(),
+    )
+
+    with transaction.atomic():
+        settled = Product.objects.filter(
+            product_id__in=quantities, stock__gte=quantity
+        ).update(stock=F('stock') - quantity)
+        if settled != len(quantities):
+            transaction.set_rollback(True)
+    if settled == len(quantities):
+        return []
+
+    # The UPDATE was rolled back, so the stock read here is what it checked against
+    sufficient = set(
+        Product.objects.filter(product_id__in=quantities, stock__gte=quantity)
+        .values_list('product_id', flat=True)
+    )
+    # if the stock changed in between, still report every line rather than none
+    return [item for item in items if item.product_id not in sufficient] or list(items)
+
+
+def commit_reservation(order):
+    """
+    Decrement the stock of a paid order's products and drop its reservation.
+
+    The stock is settled with one conditional UPDATE (see ``settle_stock``), so the
+    database never oversells even when the reservation expired or was never made.
+
+    Raises:
+        InsufficientStockError: If any product no longer has enough stock, in which
+            case no stock is changed and the reservation is kept.
+    """
+    items = list(order.items.select_related('product'))
+    failed = settle_stock(items)
+    if failed:
+        raise InsufficientStockError([item.product for item in failed])
+    # update() sends no signals, so drop the cached stock explicitly
+    product_ids = [item.product_id for item in items]
+    transaction.on_commit(lambda: invalidate_products(*product_ids))
+    # Hold the reservation until the decrement is committed, or a concurrent checkout
+    # could reserve the same stock against the old count
+    transaction.on_commit(lambda: release_reservation(order.order_id))
+
+
+def release_expired_reservations(client=None):
+    """
+    Give back the stock of every reservation past its expiry.
+
+    Returns:
+        int: The number of released reservations.
+    """
+    client = client or get_client()
+    if client is None:
+        return 0
+    released = 0
+    for order_id in client.zrangebyscore(EXPIRING_KEY, '-inf', time.time()):
+        release_reservation(order_id.decode(), client=client)
+        released += 1
+    return released
+
+
+def reconcile_reservations(client=None):
+    """
+    Drop the reservations of orders that are no longer awaiting payment, then rebuild
+    the reserved quantities from the reservations still held, repairing any drift
+    left by failed releases.
+
+    Returns:
+        int: The number of products with reserved stock.
+    """
+    client = client or get_client()
+    if client is None:
+        return 0
+
+    order_ids = [order_id.decode() for order_id in client.zrange(EXPIRING_KEY, 0, -1)]
+    pending = {
+        str(order_id) for order_id in Order.objects.filter(
+            order_id__in=order_ids, payment_status=Order.PaymentStatus.PENDING
+        ).values_list('order_id', flat=True)
+    }
+    for order_id in order_ids:
+        if order_id not in pending:
+            release_reservation(order_id, client=client)
+
+    reconcile = client.register_script(RECONCILE_SCRIPT)
+    return int(reconcile(keys=[RESERVED_KEY, EXPIRING_KEY], args=[RESERVATION_KEY_PREFIX]))
@@ -1,13 +1,14 @@
-from decimal import Decimal
 from django.db import transaction
+from django.utils.functional import cached_property
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
 from account.models import Address
 from cart.cart import Cart
+from cart.pricing import calculate_pricing
 from coupons.models import Coupon
+from orders.inventory import InsufficientStockError, reserve_stock
 from orders.models import Order, OrderItem
-from shop.models import Product
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -65,11 +66,18 @@ class OrderCreateSerializer(serializers.Serializer):
             raise ValidationError('The selected address is invalid.')
         return address
 
+    @cached_property
+    def cart(self):
+        """
+        The request's cart, shared by validation and order creation.
+        """
+        return Cart(self.context['request'])
+
     def validate(self, data):
         """
         Validate coupon against cart details.
         """
-        cart = Cart(self.context['request'])
+        cart = self.cart
         coupon_code = data.get('coupon_code')
 
         if not coupon_code:
@@ -85,7 +93,7 @@ class OrderCreateSerializer(serializers.Serializer):
             raise ValidationError({'coupon_code': 'Coupon is not valid at this time.'})
         if coupon.usage_count >= coupon.max_usage:
             raise ValidationError({'coupon_code': 'This coupon has reached its usage limit.'})
-        if cart.get_total_price() < coupon.min_purchase_amount:
+        if cart.get_pricing(coupon).subtotal < coupon.min_purchase_amount:
             raise ValidationError({
                 'coupon_code': f"A minimum purchase of {coupon.min_purchase_amount} is required to use this coupon."
             })
@@ -97,7 +105,7 @@ class OrderCreateSerializer(serializers.Serializer):
         """
         Create and save the order and its items from the cart.
         """
-        cart = Cart(self.context['request'])
+        cart = self.cart
         if len(cart) == 0:
             raise ValidationError('Your cart is empty.')
 
@@ -112,43 +120,35 @@ class OrderCreateSerializer(serializers.Serializer):
                 user=user,
                 address=address,
                 coupon=coupon,
-                discount_amount=cart.get_discount(coupon) if coupon else 0
             )
 
             if coupon:
                 coupon.increment_usage_count()
 
-            # Create order items and update product stock
-            items_to_create = []
-            products_to_update = []
-
-            for item in cart:
-                product = item['product']
-                if product.stock < item['quantity']:
-                    raise ValidationError(f"Not enough stock for {product.name}.")
-
-                product.stock -= item['quantity']
-                products_to_update.append(product)
-
-                items_to_create.append(
-                    OrderItem(
-                        order=order,
-                        product=product,
-                        quantity=item['quantity']
-                    )
-                )
-
+            # Create order items and reserve their stock until the order is paid
+            items_to_create = [
+                OrderItem(order=order, product=item['product'], quantity=item['quantity'])
+                for item in cart
+            ]
             OrderItem.objects.bulk_create(items_to_create)
-            Product.objects.bulk_update(products_to_update, ['stock'])
-
-            # Set shipping and tax (assuming fixed values for now)
-            order.shipping_cost = Decimal('15.00')
-            order.tax_amount = order.get_total_cost_before_discount() * Decimal('0.09')
 
-            # Calculate final order total
-            order.calculate_total_payable()
+            # Price the order at the current product prices, which its items report
+            pricing = calculate_pricing(
+                ((item.product.price, item.quantity) for item in items_to_create), coupon
+            )
+            order.subtotal = pricing.subtotal
+            order.discount_amount = pricing.discount
+            order.shipping_cost = pricing.shipping
+            order.tax_amount = pricing.tax
+            order.total_payable = pricing.total
             order.save()
 
+            # Reserve last: a reservation is kept in Redis, outside the transaction
+            try:
+                reserve_stock(order.order_id, ((item.product, item.quantity) for item in items_to_create))
+            except InsufficientStockError as e:
+                raise ValidationError(f"Not enough stock for {e.products[0].name}.")
+
             # Clear the cart
             cart.clear()
 
@@ -1,6 +1,7 @@
 from celery import shared_task
 from django.core.mail import send_mail
 
+from .inventory import release_expired_reservations, reconcile_reservations
 from .models import Order
 
 
@@ -21,3 +22,19 @@ def send_order_confirmation_email(order_id):
         subject, message, 'admin@eCommerce.com', [order.user.email]
     )
     return mail_sent
+
+
+@shared_task
+def release_expired_stock_reservations():
+    """
+    Give back the stock reserved by orders left unpaid past the reservation TTL.
+    """
+    return release_expired_reservations()
+
+
+@shared_task
+def reconcile_stock_reservations():
+    """
+    Rebuild the reserved stock quantities from the reservations still held.
+    """
+    return reconcile_reservations()
@@ -0,0 +1,107 @@
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from orders.inventory import (
+    EXPIRING_KEY,
+    InsufficientStockError,
+    RESERVED_KEY,
+    commit_reservation,
+    get_reservation_key,
+    reserve_stock,
+    settle_stock,
+)
+from orders.models import Order, OrderItem
+from shop.models import Category, Product
+
+User = get_user_model()
+
+
+class InventoryReservationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpassword')
+        self.category = Category.objects.create(name='Test Category')
+        self.products = [
+            Product.objects.create(name=f'Product {i}', category=self.category, user=self.user, stock=5, price=10)
+            for i in range(2)
+        ]
+        self.order = Order.objects.create(user=self.user)
+        for product in self.products:
+            OrderItem.objects.create(order=self.order, product=product, quantity=3)
+
+    def test_reserve_without_redis_checks_database_stock(self):
+        reserve_stock(self.order.order_id, [(self.products[0], 5)])
+        with self.assertRaises(InsufficientStockError) as raised:
+            reserve_stock(self.order.order_id, [(self.products[0], 1), (self.products[1], 6)])
+        self.assertEqual(raised.exception.products, [self.products[1]])
+
+    def test_reserve_runs_one_script_for_all_lines(self):
+        client = MagicMock()
+        reserve = client.register_script.return_value
+        reserve.return_value = 1
+
+        reserve_stock(self.order.order_id, [(self.products[0], 2), (self.products[1], 3)], client=client)
+
+        keys = reserve.call_args.kwargs['keys']
+        args = reserve.call_args.kwargs['args']
+        self.assertEqual(keys, [RESERVED_KEY, get_reservation_key(self.order.order_id), EXPIRING_KEY])
+        self.assertEqual(args[2:], [
+            str(self.products[0].product_id), 2, 5,
+            str(self.products[1].product_id), 3, 5,
+        ])
+
+    def test_reserve_reports_the_line_without_enough_stock(self):
+        client = MagicMock()
+        client.register_script.return_value.return_value = -2
+        with self.assertRaises(InsufficientStockError) as raised:
+            reserve_stock(self.order.order_id, [(self.products[0], 2), (self.products[1], 3)], client=client)
+        self.assertEqual(raised.exception.products, [self.products[1]])
+
+    def test_commit_decrements_stock(self):
+        commit_reservation(self.order)
+        for product in self.products:
+            product.refresh_from_db()
+            self.assertEqual(product.stock, 2)
+
+    @patch('orders.inventory.release_reservation')
+    def test_commit_keeps_reservation_until_transaction_commits(self, mock_release):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            commit_reservation(self.order)
+            mock_release.assert_not_called()
+        self.assertTrue(callbacks)
+        mock_release.assert_called_once_with(self.order.order_id)
+
+    def test_commit_changes_nothing_without_enough_stock(self):
+        Product.objects.filter(pk=self.products[1].pk).update(stock=2)
+        with self.assertRaises(InsufficientStockError) as raised:
+            commit_reservation(self.order)
+        self.assertEqual(raised.exception.products, [self.products[1]])
+        self.products[0].refresh_from_db()
+        self.assertEqual(self.products[0].stock, 5)
+
+    def test_settle_uses_one_update_for_all_lines(self):
+        products = [
+            Product.objects.create(name=f'Bulk {i}', category=self.category, user=self.user, stock=10, price=10)
+            for i in range(20)
+        ]
+        order = Order.objects.create(user=self.user)
+        OrderItem.objects.bulk_create(OrderItem(order=order, product=product, quantity=2) for product in products)
+        items = list(order.items.select_related('product'))
+
+        # the UPDATE, wrapped in a savepoint
+        with self.assertNumQueries(3):
+            self.assertEqual(settle_stock(items), [])
+        self.assertEqual(set(Product.objects.filter(name__startswith='Bulk').values_list('stock', flat=True)), {8})
+
+    def test_settle_reports_every_short_line(self):
+        product = Product.objects.create(name='Plenty', category=self.category, user=self.user, stock=5, price=10)
+        OrderItem.objects.create(order=self.order, product=product, quantity=3)
+        Product.objects.filter(pk__in=[product.pk for product in self.products]).update(stock=1)
+        items = list(self.order.items.select_related('product'))
+
+        failed = settle_stock(items)
+
+        self.assertEqual([item.product for item in failed], self.products)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 5)
@@ -1,6 +1,7 @@
 from decimal import Decimal
 from django.utils import timezone
 from datetime import timedelta
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -12,6 +13,7 @@ from account.models import Address
 User = get_user_model()
 
 
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
 class OrderIntegrationTest(APITestCase):
     """
     Integration test for the complete order process.
@@ -42,10 +44,6 @@ class OrderIntegrationTest(APITestCase):
             price=Decimal('100.00'),
             stock=10,
             user=self.user,
-            weight=1.0,
-            length=1.0,
-            width=1.0,
-            height=1.0
         )
 
         # Create a coupon
@@ -74,7 +72,7 @@ class OrderIntegrationTest(APITestCase):
         1. Add a product to the cart.
         2. Apply a valid coupon.
         3. Create an order.
-        4. Verify the order details and stock reduction.
+        4. Verify the order details, and that stock is only reserved until payment.
         """
         # Authenticate the user
         self.client.force_authenticate(user=self.user)
@@ -82,7 +80,6 @@ class OrderIntegrationTest(APITestCase):
         # 1. Add product to cart
         add_to_cart_url = reverse('api-v1:cart-add', kwargs={'product_id': self.product.product_id})
         response = self.client.post(add_to_cart_url, {'quantity': 2, 'override': True}, format='json')
-        print(response.content)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(self.client.session['cart'][str(self.product.product_id)]['quantity'], 2)
 
@@ -94,12 +91,12 @@ class OrderIntegrationTest(APITestCase):
 
         # 3. Create order
         create_order_url = reverse('api-v1:order-list')
-        order_data = {'address_id': self.address.id}
+        order_data = {'address_id': self.address.id, 'coupon_code': self.coupon.code}
         response = self.client.post(create_order_url, order_data, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
         # 4. Verify the order
-        self.assertEqual(response.data['user'], self.user.get_full_name())
+        self.assertEqual(response.data['user'], str(self.user))
         self.assertEqual(response.data['coupon'], self.coupon.code)
 
         # Check subtotal (2 * 100)
@@ -114,9 +111,9 @@ class OrderIntegrationTest(APITestCase):
         expected_total = Decimal('193.00')
         self.assertEqual(Decimal(response.data['total_payable']), expected_total)
 
-        # Verify stock reduction
+        # Stock is reserved, and only decremented once the order is paid
         self.product.refresh_from_db()
-        self.assertEqual(self.product.stock, 8)
+        self.assertEqual(self.product.stock, 10)
 
         # Verify cart is cleared
         self.assertNotIn('cart', self.client.session)
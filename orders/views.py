@@ -3,6 +3,7 @@ from rest_framework import viewsets, status
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
+from ecommerce_api.core.mixins import PaginationMixin
 from .models import Order
 from .permissions import IsAdminOrOwner
 from .serializers import OrderSerializer, OrderCreateSerializer
@@ -34,13 +35,14 @@ from .tasks import send_order_confirmation_email
     partial_update=extend_schema(operation_id="order_partial_update", description="Partially update an order. Admin access required.", tags=["Orders"]),
     destroy=extend_schema(operation_id="order_destroy", description="Delete an order. Admin access required.", tags=["Orders"]),
 )
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(PaginationMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing orders.
     - Users can create, list, and retrieve their own orders.
     - Staff users have full CRUD permissions.
     """
     queryset = Order.objects.prefetch_related('items__product', 'user', 'address', 'coupon')
+    cursor_ordering = '-order_date'
 
     def get_serializer_class(self):
         """
@@ -1,10 +1,21 @@
+import httpx
 import requests
 from abc import ABC, abstractmethod
 from django.conf import settings
 import logging
 
+from ecommerce_api.utils.http_client import AsyncHttpClient, HttpClient
+
 logger = logging.getLogger(__name__)
 
+http_client = HttpClient(
+    'zibal',
+    'https://gateway.zibal.ir/v1',
+    timeout=settings.ZIBAL_HTTP_TIMEOUT,
+    retries=settings.PROVIDER_HTTP_RETRIES,
+).register()
+async_http_client = AsyncHttpClient(http_client)
+
 
 class PaymentGateway(ABC):
     @abstractmethod
@@ -19,19 +30,23 @@ class PaymentGateway(ABC):
 class ZibalGateway(PaymentGateway):
     def __init__(self):
         self.merchant_id = getattr(settings, 'ZIBAL_MERCHANT_ID', None)
-        self.api_url = 'https://gateway.zibal.ir/v1'
+        self.http_client = http_client
+        self.async_http_client = async_http_client
 
-    def create_payment_request(self, amount, order_id, callback_url):
-        headers = {'Content-Type': 'application/json'}
-        data = {
+    def _get_payment_request_data(self, amount, order_id, callback_url):
+        return {
             'merchant': self.merchant_id,
             'amount': amount,
             'orderId': str(order_id),
             'callbackUrl': callback_url,
         }
+
+    def create_payment_request(self, amount, order_id, callback_url):
+        headers = {'Content-Type': 'application/json'}
+        data = self._get_payment_request_data(amount, order_id, callback_url)
         logger.info(f"Creating Zibal payment request for order {order_id}: {data}")
         try:
-            response = requests.post(f'{self.api_url}/request', json=data, headers=headers)
+            response = self.http_client.post('/request', json=data, headers=headers)
             response.raise_for_status()
             logger.info(f"Zibal payment request response for order {order_id}: {response.json()}")
             return response.json()
@@ -39,6 +54,22 @@ class ZibalGateway(PaymentGateway):
             logger.error(f"Error creating Zibal payment request for order {order_id}: {e}")
             return {'error': str(e)}
 
+    async def acreate_payment_request(self, amount, order_id, callback_url):
+        """
+        Async version of ``create_payment_request``, for async views.
+        """
+        headers = {'Content-Type': 'application/json'}
+        data = self._get_payment_request_data(amount, order_id, callback_url)
+        logger.info(f"Creating Zibal payment request for order {order_id}: {data}")
+        try:
+            response = await self.async_http_client.post('/request', json=data, headers=headers)
+            response.raise_for_status()
+            logger.info(f"Zibal payment request response for order {order_id}: {response.json()}")
+            return response.json()
+        except (httpx.HTTPError, requests.exceptions.RequestException) as e:
+            logger.error(f"Error creating Zibal payment request for order {order_id}: {e}")
+            return {'error': str(e)}
+
     def verify_payment(self, payload_or_authority):
         headers = {'Content-Type': 'application/json'}
         data = {
@@ -47,7 +78,7 @@ class ZibalGateway(PaymentGateway):
         }
         logger.info(f"Verifying Zibal payment for trackId {payload_or_authority}: {data}")
         try:
-            response = requests.post(f'{self.api_url}/verify', json=data, headers=headers)
+            response = self.http_client.post('/verify', json=data, headers=headers)
             response.raise_for_status()
             logger.info(f"Zibal payment verification response for trackId {payload_or_authority}: {response.json()}")
             return response.json()
@@ -1,11 +1,30 @@
-from unittest.mock import patch
+import asyncio
+import os
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
+import requests
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
 from django.urls import reverse
+from redis.exceptions import ConnectionError as RedisConnectionError
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
 
+from ecommerce_api.utils.circuit_breaker import (
+    BulkheadFullError,
+    CLOSED,
+    CircuitBreaker,
+    CircuitOpenError,
+    HALF_OPEN,
+    OPEN,
+)
+from ecommerce_api.utils.http_client import AsyncHttpClient, HttpClient
 from orders.models import Order, OrderItem
+from payment.gateways import ZibalGateway
+from payment.views import AsyncPaymentProcessAPIView
 from shop.models import Product, Category
 
 User = get_user_model()
@@ -21,10 +40,6 @@ class PaymentViewsTest(APITestCase):
             user=self.user,
             stock=10,
             price=100,
-            weight=1,
-            length=1,
-            width=1,
-            height=1
         )
         self.order = Order.objects.create(user=self.user, total_payable=100)
         self.order_item = OrderItem.objects.create(order=self.order, product=self.product, quantity=1)
@@ -65,8 +80,10 @@ class PaymentViewsTest(APITestCase):
         self.assertEqual(response.data['message'], 'Failed to create payment request.')
 
     @patch('payment.gateways.ZibalGateway.verify_payment')
+    @patch('shop.tasks.record_order_co_purchases.delay')
     @patch('shipping.tasks.create_postex_shipment_task.delay')
-    def test_successful_payment_verification(self, mock_create_shipment, mock_verify_payment):
+    def test_successful_payment_verification(self, mock_create_shipment, mock_record_co_purchases,
+                                             mock_verify_payment):
         self.order.payment_track_id = '12345'
         self.order.save()
         mock_verify_payment.return_value = {'result': 100, 'refNumber': '54321'}
@@ -79,6 +96,7 @@ class PaymentViewsTest(APITestCase):
         self.product.refresh_from_db()
         self.assertEqual(self.product.stock, 9)
         mock_create_shipment.assert_called_once_with(self.order.order_id)
+        mock_record_co_purchases.assert_called_once_with(self.order.order_id)
 
     def test_invalid_track_id(self):
         url = reverse('payment:verify') + '?trackId=invalid'
@@ -106,5 +124,296 @@ class PaymentViewsTest(APITestCase):
         url = reverse('payment:verify') + '?trackId=12345'
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'], {'products': [str(self.product.product_id)]})
         self.order.refresh_from_db()
         self.assertEqual(self.order.payment_status, Order.PaymentStatus.FAILED)
+
+    @patch('payment.gateways.ZibalGateway.verify_payment')
+    @patch('shop.tasks.record_order_co_purchases.delay')
+    @patch('shipping.tasks.create_postex_shipment_task.delay')
+    def test_repeated_verification_settles_once(self, mock_create_shipment, mock_record_co_purchases,
+                                                mock_verify_payment):
+        self.order.payment_track_id = '12345'
+        self.order.save()
+        mock_verify_payment.return_value = {'result': 100, 'refNumber': '54321'}
+        url = reverse('payment:verify') + '?trackId=12345'
+        for _ in range(3):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_verify_payment.assert_called_once_with('12345')
+        mock_create_shipment.assert_called_once_with(self.order.order_id)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 9)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    @patch('payment.gateways.ZibalGateway.verify_payment')
+    @patch('shop.tasks.record_order_co_purchases.delay')
+    @patch('shipping.tasks.create_postex_shipment_task.delay')
+    def test_repeated_verification_is_answered_from_cache(self, mock_create_shipment, mock_record_co_purchases,
+                                                          mock_verify_payment):
+        self.order.payment_track_id = '12345'
+        self.order.save()
+        mock_verify_payment.return_value = {'result': 100, 'refNumber': '54321'}
+        url = reverse('payment:verify') + '?trackId=12345'
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        mock_verify_payment.assert_called_once_with('12345')
+
+    @patch('payment.views.cache')
+    @patch('payment.gateways.ZibalGateway.verify_payment')
+    def test_concurrent_verification_is_rejected(self, mock_verify_payment, mock_cache):
+        self.order.payment_track_id = '12345'
+        self.order.save()
+        mock_cache.get.return_value = None
+        mock_cache.add.return_value = False
+        response = self.client.get(reverse('payment:verify') + '?trackId=12345')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        mock_verify_payment.assert_not_called()
+
+    @patch('payment.gateways.ZibalGateway.verify_payment')
+    def test_unreachable_gateway_keeps_payment_pending(self, mock_verify_payment):
+        self.order.payment_track_id = '12345'
+        self.order.save()
+        mock_verify_payment.return_value = {'error': 'Connection refused'}
+        response = self.client.get(reverse('payment:verify') + '?trackId=12345')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, Order.PaymentStatus.PENDING)
+
+
+class AsyncPaymentProcessViewTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpassword')
+        self.category = Category.objects.create(name='Test Category')
+        self.product = Product.objects.create(name='Test Product', category=self.category, user=self.user, stock=10, price=100)
+        self.order = Order.objects.create(user=self.user, total_payable=100)
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=1)
+        self.view = AsyncPaymentProcessAPIView.as_view()
+
+    def post(self, user=None):
+        request = APIRequestFactory().post(reverse('payment:process', kwargs={'order_id': self.order.order_id}))
+        force_authenticate(request, user=user or self.user)
+        return self.view(request, order_id=self.order.order_id)
+
+    @patch('payment.gateways.ZibalGateway.acreate_payment_request', new_callable=AsyncMock)
+    async def test_successful_payment_request(self, mock_create_payment_request):
+        mock_create_payment_request.return_value = {'result': 100, 'trackId': '12345'}
+        response = await self.post()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['data'], {'payment_url': 'https://gateway.zibal.ir/start/12345'})
+        await self.order.arefresh_from_db()
+        self.assertEqual(self.order.payment_track_id, '12345')
+        self.assertEqual(mock_create_payment_request.call_args.kwargs['amount'], 1000)
+
+    @patch('payment.gateways.ZibalGateway.acreate_payment_request', new_callable=AsyncMock)
+    async def test_failed_payment_request(self, mock_create_payment_request):
+        mock_create_payment_request.return_value = {'error': 'timed out'}
+        response = await self.post()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['message'], 'Failed to create payment request.')
+
+    async def test_insufficient_stock(self):
+        await Product.objects.filter(pk=self.product.pk).aupdate(stock=0)
+        response = await self.post()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_other_users_order_is_not_found(self):
+        other = await User.objects.acreate(username='other', email='other@example.com')
+        response = await self.post(user=other)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ZibalGatewayTest(SimpleTestCase):
+    def setUp(self):
+        self.gateway = ZibalGateway()
+        self.gateway.http_client = HttpClient('zibal', 'https://gateway.zibal.ir/v1', timeout=10)
+        self.session = self.gateway.http_client._session = MagicMock()
+        self.session.request.return_value.status_code = 200
+        self.gateway.http_client._pid = os.getpid()
+
+    def test_verify_uses_pooled_session_with_timeout(self):
+        self.session.request.return_value.json.return_value = {'result': 100}
+        self.assertEqual(self.gateway.verify_payment('12345'), {'result': 100})
+        args, kwargs = self.session.request.call_args
+        self.assertEqual(args, ('POST', 'https://gateway.zibal.ir/v1/verify'))
+        self.assertEqual(kwargs['timeout'], (3.05, 10))
+
+    def test_timeout_is_reported_as_error(self):
+        self.session.request.side_effect = requests.exceptions.Timeout('timed out')
+        self.assertIn('error', self.gateway.verify_payment('12345'))
+
+
+class HttpClientTest(SimpleTestCase):
+    def test_only_idempotent_calls_are_retried_on_gateway_errors(self):
+        client = HttpClient('test', 'https://example.com', timeout=5, retries=settings.PROVIDER_HTTP_RETRIES)
+        retry = client.session.get_adapter('https://example.com').max_retries
+        self.assertEqual(retry.total, settings.PROVIDER_HTTP_RETRIES)
+        self.assertTrue(retry.is_retry('GET', 503))
+        self.assertFalse(retry.is_retry('POST', 503))
+
+
+class CircuitBreakerTest(SimpleTestCase):
+    def setUp(self):
+        self.redis = MagicMock()
+        self.redis.mget.return_value = [None, None]
+        self.client = HttpClient('test', 'https://example.com', timeout=5)
+        self.client.breaker = CircuitBreaker('test', failure_threshold=3, client=self.redis)
+        self.client.bulkhead._client = self.redis
+        self.client._session = MagicMock()
+        self.client._pid = os.getpid()
+        self.script = self.redis.register_script.return_value
+        self.script.return_value = 1
+
+    def test_open_circuit_fails_fast(self):
+        self.redis.mget.return_value = [b'1', b'3']
+        self.assertEqual(self.client.breaker.get_state(), OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.client.post('/verify')
+        self.client.session.request.assert_not_called()
+
+    def test_open_circuit_is_reported_as_error(self):
+        gateway = ZibalGateway()
+        gateway.http_client = self.client
+        self.redis.mget.return_value = [b'1', b'3']
+        self.assertIn('error', gateway.verify_payment('12345'))
+
+    def test_half_open_circuit_lets_one_call_through(self):
+        self.redis.mget.return_value = [None, b'3']
+        self.assertEqual(self.client.breaker.get_state(), HALF_OPEN)
+        self.redis.set.return_value = None
+        with self.assertRaises(CircuitOpenError):
+            self.client.post('/verify')
+
+        self.redis.set.return_value = True
+        self.client.session.request.return_value.status_code = 200
+        self.client.post('/verify')
+        self.redis.delete.assert_called_with(self.client.breaker.failures_key, self.client.breaker.probe_key)
+
+    def test_errors_and_server_errors_are_recorded_as_failures(self):
+        self.client.session.request.side_effect = requests.exceptions.Timeout('timed out')
+        with self.assertRaises(requests.exceptions.Timeout):
+            self.client.post('/verify')
+        self.client.session.request.side_effect = None
+        self.client.session.request.return_value.status_code = 502
+        self.client.post('/verify')
+
+        failures = [c for c in self.script.call_args_list if c.kwargs['keys'][0] == self.client.breaker.failures_key]
+        self.assertEqual(len(failures), 2)
+        self.assertEqual(failures[0].kwargs['args'], [3, 60, 30])
+        self.redis.delete.assert_called_with(self.client.breaker.probe_key)
+
+    def test_full_bulkhead_fails_fast(self):
+        self.script.return_value = 0
+        with self.assertRaises(BulkheadFullError):
+            self.client.post('/verify')
+        self.client.session.request.assert_not_called()
+
+    def test_slot_is_released_after_the_call(self):
+        self.client.session.request.return_value.status_code = 200
+        self.client.post('/verify')
+        call_id = self.script.call_args.kwargs['args'][3]
+        self.redis.zrem.assert_called_once_with(self.client.bulkhead.key, call_id)
+
+    def test_half_open_probe_is_released_when_bulkhead_is_full(self):
+        self.redis.mget.return_value = [None, b'3']
+        self.redis.set.return_value = True
+        self.script.return_value = 0
+        with self.assertRaises(BulkheadFullError):
+            self.client.post('/verify')
+        self.redis.delete.assert_called_once_with(self.client.breaker.probe_key)
+
+    def test_full_bulkhead_keeps_other_probes_when_closed(self):
+        self.script.return_value = 0
+        with self.assertRaises(BulkheadFullError):
+            self.client.post('/verify')
+        self.redis.delete.assert_not_called()
+
+    def test_calls_go_through_when_redis_is_down(self):
+        self.redis.mget.side_effect = RedisConnectionError()
+        self.script.side_effect = RedisConnectionError()
+        self.client.session.request.return_value.status_code = 200
+        self.assertEqual(self.client.post('/verify').status_code, 200)
+        self.assertEqual(self.client.breaker.get_state(), CLOSED)
+
+
+class AsyncHttpClientTest(SimpleTestCase):
+    def setUp(self):
+        self.sync_client = HttpClient('test', 'https://example.com', timeout=5)
+        self.redis = MagicMock()
+        self.redis.mget.return_value = [None, None]
+        self.redis.register_script.return_value.return_value = 1
+        self.sync_client.breaker._client = self.redis
+        self.sync_client.bulkhead._client = self.redis
+        self.client = AsyncHttpClient(self.sync_client, pooled=True)
+        self.requests = []
+
+    def mock_client(self, status_code):
+        def handler(request):
+            self.requests.append(request)
+            return httpx.Response(status_code, json={'result': 100})
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    def respond(self, status_code):
+        self.client._client = self.mock_client(status_code)
+        self.client._loop = asyncio.get_running_loop()
+
+    async def test_request_goes_through_breaker_and_bulkhead(self):
+        self.respond(200)
+        response = await self.client.post('/verify', json={'trackId': '12345'})
+        self.assertEqual(response.json(), {'result': 100})
+        self.assertEqual(str(self.requests[0].url), 'https://example.com/verify')
+        self.redis.zrem.assert_called_once()
+
+    async def test_server_error_is_recorded_as_failure(self):
+        self.respond(502)
+        await self.client.post('/verify')
+        keys = [c.kwargs['keys'][0] for c in self.redis.register_script.return_value.call_args_list]
+        self.assertIn(self.sync_client.breaker.failures_key, keys)
+
+    async def test_open_circuit_fails_fast(self):
+        self.respond(200)
+        self.redis.mget.return_value = [b'1', b'5']
+        gateway = ZibalGateway()
+        gateway.async_http_client = self.client
+        self.assertIn('error', await gateway.acreate_payment_request(1000, '1', 'https://example.com/callback'))
+        self.assertEqual(self.requests, [])
+
+    async def test_unpooled_client_is_closed_after_each_call(self):
+        self.client.pooled = False
+        clients = []
+
+        def create_client():
+            clients.append(self.mock_client(200))
+            return clients[-1]
+
+        with patch.object(self.client, 'create_client', side_effect=create_client):
+            await self.client.post('/verify')
+            await self.client.post('/verify')
+        self.assertEqual(len(clients), 2)
+        self.assertTrue(all(client.is_closed for client in clients))
+        self.assertIsNone(self.client._client)
+
+    def test_pooled_client_of_a_previous_loop_is_closed_on_that_loop(self):
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever)
+        thread.start()
+        try:
+            previous = self.client._client = self.mock_client(200)
+            self.client._loop = loop
+
+            async def call():
+                await self.client.post('/verify')
+                return self.client._client
+            with patch.object(self.client, 'create_client', return_value=self.mock_client(200)):
+                current = asyncio.run(call())
+
+            self.assertIsNot(current, previous)
+            asyncio.run_coroutine_threadsafe(asyncio.sleep(0.1), loop).result(timeout=5)
+            self.assertTrue(previous.is_closed)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
@@ -1,10 +1,13 @@
+from django.conf import settings
 from django.urls import path
 
-from payment.views import PaymentProcessAPIView, PaymentVerifyAPIView
+from payment.views import AsyncPaymentProcessAPIView, PaymentProcessAPIView, PaymentVerifyAPIView
 
 app_name = 'payment'
 
+process_view = AsyncPaymentProcessAPIView if settings.ASYNC_PROVIDER_VIEWS else PaymentProcessAPIView
+
 urlpatterns = [
-    path('process/<uuid:order_id>/', PaymentProcessAPIView.as_view(), name='process'),
+    path('process/<uuid:order_id>/', process_view.as_view(), name='process'),
     path('verify/', PaymentVerifyAPIView.as_view(), name='verify'),
 ]
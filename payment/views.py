@@ -1,5 +1,10 @@
 from logging import getLogger
 
+from adrf.views import APIView as AsyncAPIView
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from drf_spectacular.utils import extend_schema, OpenApiResponse, extend_schema_view
@@ -9,9 +14,16 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from ecommerce_api.core.api_standard_response import ApiResponse
+from orders.inventory import (
+    InsufficientStockError,
+    commit_reservation,
+    ensure_reservation,
+    release_reservation,
+)
 from orders.models import Order
 from .gateways import ZibalGateway
 from shipping.tasks import create_postex_shipment_task
+from shop.tasks import record_order_co_purchases
 
 logger = getLogger(__name__)
 
@@ -46,13 +58,13 @@ class PaymentProcessAPIView(APIView):
                 status_code=status.HTTP_400_BAD_REQUEST
             )
 
-        # Check stock before creating payment request
-        for item in order.items.all():
-            if item.product.stock < item.quantity:
-                return ApiResponse.error(
-                    message=f"Insufficient stock for product: {item.product.name}",
-                    status_code=status.HTTP_400_BAD_REQUEST
-                )
+        try:
+            ensure_reservation(order)
+        except InsufficientStockError as e:
+            return ApiResponse.error(
+                message=str(e),
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
 
         callback_url = request.build_absolute_uri(reverse("payment:verify"))
 
@@ -66,6 +78,8 @@ class PaymentProcessAPIView(APIView):
         if response.get('result') == 100:
             order.payment_gateway = 'zibal'
             order.payment_track_id = response.get('trackId')
+            # a new payment attempt reopens a failed payment for verification
+            order.payment_status = Order.PaymentStatus.PENDING
             order.save()
             payment_url = f"https://gateway.zibal.ir/start/{response.get('trackId')}"
             return ApiResponse.success(
@@ -79,6 +93,78 @@ class PaymentProcessAPIView(APIView):
             )
 
 
+@extend_schema_view(
+    post=extend_schema(
+        operation_id="payment_process",
+        description="Create a Zibal payment request for an order. Expects an order_id in request data.",
+        tags=["Payments"],
+        responses={
+            201: OpenApiResponse(description="Zibal payment URL created successfully."),
+            400: OpenApiResponse(description="Order ID is missing or invalid request data.")
+        },
+    )
+)
+class AsyncPaymentProcessAPIView(AsyncAPIView):
+    """
+    Async version of ``PaymentProcessAPIView``, served instead of it when
+    ``ASYNC_PROVIDER_VIEWS`` is set. The worker is not held while Zibal answers.
+    """
+    permission_classes = [IsAuthenticated]
+
+    async def post(self, request, *args, **kwargs):
+        order_id = kwargs.get("order_id")
+        if not order_id:
+            return ApiResponse.error(
+                message="Order ID is required.",
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            order = await Order.objects.aget(order_id=order_id, user=request.user)
+        except Order.DoesNotExist:
+            raise Http404
+
+        if order.payment_status == Order.PaymentStatus.SUCCESS:
+            return ApiResponse.error(
+                message="This order has already been paid.",
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            await sync_to_async(ensure_reservation)(order)
+        except InsufficientStockError as e:
+            return ApiResponse.error(
+                message=str(e),
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        callback_url = request.build_absolute_uri(reverse("payment:verify"))
+
+        gateway = ZibalGateway()
+        response = await gateway.acreate_payment_request(
+            amount=int(order.total_payable * 10),  # Convert Toman to Rial for Zibal API
+            order_id=order.order_id,
+            callback_url=callback_url
+        )
+
+        if response.get('result') == 100:
+            order.payment_gateway = 'zibal'
+            order.payment_track_id = response.get('trackId')
+            # a new payment attempt reopens a failed payment for verification
+            order.payment_status = Order.PaymentStatus.PENDING
+            await order.asave()
+            payment_url = f"https://gateway.zibal.ir/start/{response.get('trackId')}"
+            return ApiResponse.success(
+                data={"payment_url": payment_url},
+                status_code=status.HTTP_201_CREATED
+            )
+        else:
+            return ApiResponse.error(
+                message="Failed to create payment request.",
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+
 @extend_schema_view(
     get=extend_schema(
         operation_id="payment_verify",
@@ -91,6 +177,31 @@ class PaymentProcessAPIView(APIView):
     )
 )
 class PaymentVerifyAPIView(APIView):
+    """
+    Zibal calls this once the user leaves the gateway, and may call it again, as may
+    the user by refreshing. Verification therefore runs at most once per trackId:
+
+    - the final response is cached and repeated callbacks are answered from it,
+    - an order no longer awaiting payment is answered from its payment status,
+    - a short lock keeps concurrent callbacks from verifying at the same time,
+    - the order row is locked while it moves out of ``PaymentStatus.PENDING``.
+    """
+    # Zibal result codes of a verified payment: verified now, or already verified
+    VERIFIED_RESULTS = (100, 201)
+    LOCK_TIMEOUT = 30
+    RESULT_TIMEOUT = 60 * 60 * 24
+
+    SUCCESS_MESSAGE = "Payment verified. Shipment creation is in progress."
+    FAILURE_MESSAGE = "Payment verification failed."
+
+    @staticmethod
+    def get_lock_key(track_id):
+        return f'payment_verify_lock:{track_id}'
+
+    @staticmethod
+    def get_result_key(track_id):
+        return f'payment_verify_result:{track_id}'
+
     def get(self, request, *args, **kwargs):
         track_id = request.query_params.get('trackId')
         if not track_id:
@@ -99,6 +210,11 @@ class PaymentVerifyAPIView(APIView):
                 status_code=status.HTTP_400_BAD_REQUEST
             )
 
+        cached = cache.get(self.get_result_key(track_id))
+        if cached is not None:
+            body, status_code = cached
+            return Response(body, status=status_code)
+
         try:
             order = Order.objects.get(payment_track_id=track_id)
         except Order.DoesNotExist:
@@ -107,42 +223,79 @@ class PaymentVerifyAPIView(APIView):
                 status_code=status.HTTP_404_NOT_FOUND
             )
 
-        gateway = ZibalGateway()
-        response = gateway.verify_payment(track_id)
+        if order.payment_status != Order.PaymentStatus.PENDING:
+            return self.cache_result(track_id, self.get_settled_response(order))
 
-        if response.get('result') == 100:
-            # Check stock again before finalizing the order
-            for item in order.items.all():
-                if item.product.stock < item.quantity:
+        if not cache.add(self.get_lock_key(track_id), True, self.LOCK_TIMEOUT):
+            return ApiResponse.error(
+                message="Payment verification is already in progress.",
+                status_code=status.HTTP_409_CONFLICT
+            )
+        try:
+            gateway = ZibalGateway()
+            response = gateway.verify_payment(track_id)
+            if 'error' in response:
+                # The gateway could not be reached; the payment may still verify later
+                return ApiResponse.error(
+                    message="Payment gateway is unavailable. Please try again.",
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+                )
+            return self.cache_result(track_id, self.settle(order, response))
+        finally:
+            cache.delete(self.get_lock_key(track_id))
+
+    def cache_result(self, track_id, response):
+        cache.set(self.get_result_key(track_id), (response.data, response.status_code), self.RESULT_TIMEOUT)
+        return response
+
+    def get_settled_response(self, order):
+        """
+        Answer for an order whose payment was already verified or rejected.
+        """
+        if order.payment_status == Order.PaymentStatus.SUCCESS:
+            return ApiResponse.success(message=self.SUCCESS_MESSAGE, status_code=status.HTTP_200_OK)
+        return ApiResponse.error(message=self.FAILURE_MESSAGE, status_code=status.HTTP_400_BAD_REQUEST)
+
+    def settle(self, order, response):
+        """
+        Move the order out of ``PENDING`` according to the gateway's verification. The
+        row is locked first, and an order another callback already settled is left
+        as it is.
+        """
+        verified = response.get('result') in self.VERIFIED_RESULTS
+        error = None
+        with transaction.atomic():
+            order = Order.objects.select_for_update().get(pk=order.pk)
+            if order.payment_status != Order.PaymentStatus.PENDING:
+                return self.get_settled_response(order)
+
+            if verified:
+                try:
+                    # Settle the reserved stock and mark the order paid together
+                    with transaction.atomic():
+                        commit_reservation(order)
+                        order.payment_status = Order.PaymentStatus.SUCCESS
+                        order.payment_ref_id = response.get('refNumber', '')
+                        order.status = Order.Status.PAID
+                        order.save()
+                except InsufficientStockError as e:
                     # Handle insufficient stock after payment (e.g., refund or notify admin)
-                    order.payment_status = Order.PaymentStatus.FAILED
-                    order.save()
-                    return ApiResponse.error(
-                        message=f"Insufficient stock for product: {item.product.name}. Payment will be refunded.",
-                        status_code=status.HTTP_400_BAD_REQUEST
-                    )
-
-            # Decrement stock
-            for item in order.items.all():
-                item.product.stock -= item.quantity
-                item.product.save()
-
-            order.payment_status = Order.PaymentStatus.SUCCESS
-            order.payment_ref_id = response.get('refNumber')
-            order.status = Order.Status.PAID
-            order.save()
+                    error = e
+            if order.payment_status != Order.PaymentStatus.SUCCESS:
+                order.payment_status = Order.PaymentStatus.FAILED
+                order.save()
 
-            # Create shipment asynchronously
+        if order.payment_status == Order.PaymentStatus.SUCCESS:
+            # Create shipment and update recommendations asynchronously
             create_postex_shipment_task.delay(order.order_id)
+            record_order_co_purchases.delay(order.order_id)
+            return ApiResponse.success(message=self.SUCCESS_MESSAGE, status_code=status.HTTP_200_OK)
 
-            return ApiResponse.success(
-                message="Payment verified. Shipment creation is in progress.",
-                status_code=status.HTTP_200_OK
-            )
-        else:
-            order.payment_status = Order.PaymentStatus.FAILED
-            order.save()
+        release_reservation(order.order_id)
+        if error is not None:
             return ApiResponse.error(
-                message="Payment verification failed.",
-                status_code=status.HTTP_400_BAD_REQUEST
+                message=f"{error}. Payment will be refunded.",
+                status_code=status.HTTP_400_BAD_REQUEST,
+                errors={'products': [str(product.product_id) for product in error.products]}
             )
+        return ApiResponse.error(message=self.FAILURE_MESSAGE, status_code=status.HTTP_400_BAD_REQUEST)
@@ -1,10 +1,22 @@
+import httpx
 import requests
+from asgiref.sync import sync_to_async
 from abc import ABC, abstractmethod
 from django.conf import settings
 import logging
 
+from ecommerce_api.utils.http_client import AsyncHttpClient, HttpClient
+
 logger = logging.getLogger(__name__)
 
+http_client = HttpClient(
+    'postex',
+    'https://api.postex.ir/api',
+    timeout=settings.POSTEX_HTTP_TIMEOUT,
+    retries=settings.PROVIDER_HTTP_RETRIES,
+).register()
+async_http_client = AsyncHttpClient(http_client)
+
 
 class ShippingProvider(ABC):
     @abstractmethod
@@ -23,7 +35,8 @@ class ShippingProvider(ABC):
 class PostexShippingProvider(ShippingProvider):
     def __init__(self):
         self.api_key = getattr(settings, 'POSTEX_API_KEY', None)
-        self.api_url = 'https://api.postex.ir/api'
+        self.http_client = http_client
+        self.async_http_client = async_http_client
 
     def _get_headers(self):
         return {
@@ -56,7 +69,7 @@ class PostexShippingProvider(ShippingProvider):
         }
         logger.info(f"Creating Postex shipment for order {order.order_id}: {data}")
         try:
-            response = requests.post(f'{self.api_url}/v1/parcels/bulk', json=data, headers=self._get_headers())
+            response = self.http_client.post('/v1/parcels/bulk', json=data, headers=self._get_headers())
             response.raise_for_status()
             logger.info(f"Postex shipment response for order {order.order_id}: {response.json()}")
             return response.json()
@@ -68,7 +81,7 @@ class PostexShippingProvider(ShippingProvider):
         logger.info(f"Getting Postex shipment tracking for tracking_code {tracking_code}")
         try:
             # The documentation is a bit ambiguous here, assuming courier is 'postex'
-            response = requests.get(f'{self.api_url}/v1/tracking/events/postex/{tracking_code}', headers=self._get_headers())
+            response = self.http_client.get(f'/v1/tracking/events/postex/{tracking_code}', headers=self._get_headers())
             response.raise_for_status()
             logger.info(f"Postex shipment tracking response for tracking_code {tracking_code}: {response.json()}")
             return response.json()
@@ -76,20 +89,23 @@ class PostexShippingProvider(ShippingProvider):
             logger.error(f"Error getting Postex shipment tracking for tracking_code {tracking_code}: {e}")
             return {'error': str(e)}
 
-    def get_shipping_quote(self, order):
+    def _get_shipping_quote_data(self, order):
         parcels = [{
             "to_city_code": order.address.city_code,
             "total_weight": int(sum(item.product.weight * item.quantity for item in order.items.all())),
             "total_value": int(order.total_payable),
         }]
-        data = {
+        return {
             "collection_type": "pick_up",
             "from_city_code": settings.POSTEX_FROM_CITY_CODE,
             "parcels": parcels,
         }
+
+    def get_shipping_quote(self, order):
+        data = self._get_shipping_quote_data(order)
         logger.info(f"Getting Postex shipping quote for order {order.order_id}: {data}")
         try:
-            response = requests.post(f'{self.api_url}/v1/shipping/quotes', json=data, headers=self._get_headers())
+            response = self.http_client.post('/v1/shipping/quotes', json=data, headers=self._get_headers())
             response.raise_for_status()
             logger.info(f"Postex shipping quote response for order {order.order_id}: {response.json()}")
             return response.json()
@@ -97,10 +113,26 @@ class PostexShippingProvider(ShippingProvider):
             logger.error(f"Error getting Postex shipping quote for order {order.order_id}: {e}")
             return {'error': str(e)}
 
+    async def aget_shipping_quote(self, order):
+        """
+        Async version of ``get_shipping_quote``, for async views.
+        """
+        # the parcels are built from the order's address and items in the database
+        data = await sync_to_async(self._get_shipping_quote_data)(order)
+        logger.info(f"Getting Postex shipping quote for order {order.order_id}: {data}")
+        try:
+            response = await self.async_http_client.post('/v1/shipping/quotes', json=data, headers=self._get_headers())
+            response.raise_for_status()
+            logger.info(f"Postex shipping quote response for order {order.order_id}: {response.json()}")
+            return response.json()
+        except (httpx.HTTPError, requests.exceptions.RequestException) as e:
+            logger.error(f"Error getting Postex shipping quote for order {order.order_id}: {e}")
+            return {'error': str(e)}
+
     def cancel_shipment(self, tracking_code):
         logger.info(f"Canceling Postex shipment for tracking_code {tracking_code}")
         try:
-            response = requests.delete(f'{self.api_url}/v1/parcels/{tracking_code}', headers=self._get_headers())
+            response = self.http_client.delete(f'/v1/parcels/{tracking_code}', headers=self._get_headers())
             response.raise_for_status()
             logger.info(f"Postex shipment cancellation response for tracking_code {tracking_code}: {response.json()}")
             return response.json()
@@ -111,7 +143,7 @@ class PostexShippingProvider(ShippingProvider):
     def get_cities(self):
         logger.info("Getting Postex city list")
         try:
-            response = requests.get(f'{self.api_url}/v1/locality/cities/all', headers=self._get_headers())
+            response = self.http_client.get('/v1/locality/cities/all', headers=self._get_headers())
             response.raise_for_status()
             logger.info("Successfully retrieved Postex city list")
             return response.json()
@@ -1,9 +1,10 @@
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APITestCase
-from unittest.mock import patch, MagicMock
+from rest_framework.test import APIRequestFactory, APITestCase
+from unittest.mock import AsyncMock, patch, MagicMock
 from orders.models import Order
 from account.models import Address, UserAccount as User
+from shipping.views import AsyncCalculateShippingCostAPIView
 
 
 class ShippingAPITests(APITestCase):
@@ -88,3 +89,48 @@ class ShippingAPITests(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(response.data['message'], 'Order address is not set')
+
+
+class AsyncCalculateShippingCostViewTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='test@example.com', username='testuser', password='testpassword')
+        self.address = Address.objects.create(
+            user=self.user,
+            receiver_name='Test Receiver',
+            receiver_phone='1234567890',
+            full_address='123 Test St',
+            city_code='1',
+            postal_code='12345'
+        )
+        self.order = Order.objects.create(user=self.user, address=self.address, total_payable=10000)
+        self.view = AsyncCalculateShippingCostAPIView.as_view()
+
+    def post(self, data):
+        return self.view(APIRequestFactory().post(reverse('shipping:calculate-cost'), data, format='json'))
+
+    @patch('shipping.providers.PostexShippingProvider.aget_shipping_quote', new_callable=AsyncMock)
+    async def test_calculate_shipping_cost_success(self, mock_get_shipping_quote):
+        mock_get_shipping_quote.return_value = {'data': [{'price': 5000}]}
+        response = await self.post({'order_id': str(self.order.order_id)})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data'], {'shipping_cost': 5000})
+        await self.order.arefresh_from_db()
+        self.assertEqual(self.order.shipping_cost, 5000)
+        mock_get_shipping_quote.assert_awaited_once_with(self.order)
+
+    @patch('shipping.providers.PostexShippingProvider.aget_shipping_quote', new_callable=AsyncMock)
+    async def test_calculate_shipping_cost_failure(self, mock_get_shipping_quote):
+        mock_get_shipping_quote.return_value = {'error': 'API Error'}
+        response = await self.post({'order_id': str(self.order.order_id)})
+
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(response.data['message'], 'Failed to get shipping cost')
+
+    async def test_calculate_shipping_cost_no_address(self):
+        self.order.address = None
+        await self.order.asave()
+        response = await self.post({'order_id': str(self.order.order_id)})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['message'], 'Order address is not set')
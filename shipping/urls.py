@@ -1,10 +1,15 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import CalculateShippingCostAPIView, CityListAPIView
+from .views import AsyncCalculateShippingCostAPIView, CalculateShippingCostAPIView, CityListAPIView
 
 app_name = 'shipping'
 
+calculate_cost_view = (
+    AsyncCalculateShippingCostAPIView if settings.ASYNC_PROVIDER_VIEWS else CalculateShippingCostAPIView
+)
+
 urlpatterns = [
-    path('calculate-cost/', CalculateShippingCostAPIView.as_view(), name='calculate-cost'),
+    path('calculate-cost/', calculate_cost_view.as_view(), name='calculate-cost'),
     path('cities/', CityListAPIView.as_view(), name='city-list'),
 ]
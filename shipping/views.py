@@ -1,5 +1,7 @@
+from adrf.views import APIView as AsyncAPIView
 from rest_framework.views import APIView
 from rest_framework import status
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from orders.models import Order
 from .providers import PostexShippingProvider
@@ -40,3 +42,36 @@ class CalculateShippingCostAPIView(APIView):
         order.save()
 
         return ApiResponse.success(data={'shipping_cost': shipping_cost}, status_code=status.HTTP_200_OK)
+
+
+class AsyncCalculateShippingCostAPIView(AsyncAPIView):
+    """
+    Async version of ``CalculateShippingCostAPIView``, served instead of it when
+    ``ASYNC_PROVIDER_VIEWS`` is set. The worker is not held while Postex answers.
+    """
+    async def post(self, request, *args, **kwargs):
+        order_id = request.data.get('order_id')
+        if not order_id:
+            return ApiResponse.error(message='Order ID is required', status_code=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            order = await Order.objects.select_related('address').aget(order_id=order_id)
+        except Order.DoesNotExist:
+            raise Http404
+
+        if not order.address:
+            return ApiResponse.error(message='Order address is not set', status_code=status.HTTP_400_BAD_REQUEST)
+
+        provider = PostexShippingProvider()
+        response = await provider.aget_shipping_quote(order)
+
+        if response.get('error') or not response.get('data'):
+            return ApiResponse.error(message='Failed to get shipping cost', status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        # Assuming the first quote is the desired one
+        shipping_cost = response['data'][0].get('price', 0)
+
+        order.shipping_cost = shipping_cost
+        await order.asave()
+
+        return ApiResponse.success(data={'shipping_cost': shipping_cost}, status_code=status.HTTP_200_OK)
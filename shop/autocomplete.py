@@ -0,0 +1,171 @@
+import re
+
+from ecommerce_api.utils.redis_client import redis_client, async_redis_client
+
+# Separates the indexed term from the product id inside a sorted-set member.
+TERM_SEPARATOR = '\x1f'
+
+# Replace the indexed terms of one product atomically.
+# KEYS: index zset, names hash, per-product terms set
+# ARGV: product id, display name, member...
+INDEX_PRODUCT_SCRIPT = """
+local old = redis.call('SMEMBERS', KEYS[3])
+for i = 1, #old do
+    redis.call('ZREM', KEYS[1], old[i])
+end
+redis.call('DEL', KEYS[3])
+for i = 3, #ARGV do
+    redis.call('ZADD', KEYS[1], 0, ARGV[i])
+    redis.call('SADD', KEYS[3], ARGV[i])
+end
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+return #ARGV - 2
+"""
+
+# Remove a product from the index.
+# KEYS: index zset, names hash, per-product terms set
+# ARGV: product id
+REMOVE_PRODUCT_SCRIPT = """
+local old = redis.call('SMEMBERS', KEYS[3])
+for i = 1, #old do
+    redis.call('ZREM', KEYS[1], old[i])
+end
+redis.call('DEL', KEYS[3])
+redis.call('HDEL', KEYS[2], ARGV[1])
+return #old
+"""
+
+# Prefix lookup and name resolution in a single round-trip.
+# KEYS: index zset, names hash
+# ARGV: range min, range max, members to scan, max results
+SUGGEST_SCRIPT = """
+local members = redis.call('ZRANGEBYLEX', KEYS[1], ARGV[1], ARGV[2], 'LIMIT', 0, tonumber(ARGV[3]))
+local limit = tonumber(ARGV[4])
+local seen = {}
+local ids = {}
+for i = 1, #members do
+    local product_id = string.match(members[i], '\\031(.+)$')
+    if product_id and not seen[product_id] then
+        seen[product_id] = true
+        ids[#ids + 1] = product_id
+        if #ids >= limit then
+            break
+        end
+    end
+end
+if #ids == 0 then
+    return {}
+end
+return redis.call('HMGET', KEYS[2], unpack(ids))
+"""
+
+
+def normalize(text):
+    """
+    Normalize text for prefix matching: case-folded, control characters removed and
+    whitespace collapsed.
+    """
+    text = re.sub(r'[\x00-\x1f\x7f]', ' ', text or '')
+    return ' '.join(text.casefold().split())
+
+
+class AutocompleteIndex:
+    """
+    Shared prefix index for search-as-you-type suggestions, kept in Redis.
+
+    Every product contributes its full name, each word of its name and each of its
+    tags as terms to one lexicographically ordered sorted set (all scores are 0), so
+    a prefix lookup is a single ``ZRANGEBYLEX``. Members have the form
+    ``<term>\\x1f<product_id>``; display names live in a hash keyed by product id.
+    The index is updated incrementally from ``shop.signals`` and can be rebuilt with
+    the ``rebuild_autocomplete`` management command.
+    """
+    index_key = 'shop:autocomplete:index'
+    names_key = 'shop:autocomplete:names'
+    min_word_length = 2
+
+    def __init__(self, client=None, async_client=None):
+        self.client = client or redis_client
+        self.async_client = async_client or async_redis_client
+        self._index_product = self.client.register_script(INDEX_PRODUCT_SCRIPT)
+        self._remove_product = self.client.register_script(REMOVE_PRODUCT_SCRIPT)
+        self._suggest = self.client.register_script(SUGGEST_SCRIPT)
+        self._async_suggest = self.async_client.register_script(SUGGEST_SCRIPT)
+
+    def get_terms_key(self, product_id):
+        return f'shop:autocomplete:terms:{product_id}'
+
+    def get_terms(self, name, tags=()):
+        """
+        Return the normalized terms a product is found by.
+        """
+        terms = set()
+        name = normalize(name)
+        if name:
+            terms.add(name)
+            terms.update(word for word in name.split() if len(word) >= self.min_word_length)
+        terms.update(tag for tag in (normalize(tag) for tag in tags) if tag)
+        return sorted(terms)
+
+    def index_product(self, product, tags=None):
+        """
+        Add a product to the index, replacing any terms indexed for it before.
+        """
+        product_id = str(product.product_id)
+        if tags is None:
+            tags = product.tags.names()
+        members = [f'{term}{TERM_SEPARATOR}{product_id}' for term in self.get_terms(product.name, tags)]
+        return self._index_product(
+            keys=[self.index_key, self.names_key, self.get_terms_key(product_id)],
+            args=[product_id, product.name, *members],
+        )
+
+    def remove_product(self, product_id):
+        """
+        Remove every term indexed for the given product.
+        """
+        product_id = str(product_id)
+        return self._remove_product(
+            keys=[self.index_key, self.names_key, self.get_terms_key(product_id)],
+            args=[product_id],
+        )
+
+    def rebuild(self, products):
+        """
+        Drop the whole index and re-index the given products. Tags are read through
+        ``product.tags.all()`` so that a ``prefetch_related('tags')`` queryset is used.
+
+        Returns:
+            int: The number of indexed products.
+        """
+        self.client.delete(self.index_key, self.names_key)
+        count = 0
+        for product in products:
+            self.index_product(product, tags=[tag.name for tag in product.tags.all()])
+            count += 1
+        return count
+
+    def _suggest_args(self, query, limit):
+        prefix = normalize(query).encode()
+        # Scan a few extra members since a product can match on several terms.
+        return [b'[' + prefix, b'[' + prefix + b'\xff', limit * 4, limit]
+
+    def suggest(self, query, limit=5):
+        """
+        Return up to ``limit`` product names with a term starting with ``query``.
+        """
+        if not normalize(query):
+            return []
+        names = self._suggest(keys=[self.index_key, self.names_key], args=self._suggest_args(query, limit))
+        return [name.decode() for name in names if name is not None]
+
+    async def asuggest(self, query, limit=5):
+        """
+        Async variant of :meth:`suggest` for use inside consumers.
+        """
+        if not normalize(query):
+            return []
+        names = await self._async_suggest(
+            keys=[self.index_key, self.names_key], args=self._suggest_args(query, limit)
+        )
+        return [name.decode() for name in names if name is not None]
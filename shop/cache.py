@@ -0,0 +1,47 @@
+import hashlib
+from urllib.parse import urlencode
+
+from ecommerce_api.utils.cache_tags import invalidate_tags
+
+# Cached shop responses are tagged with what they render and invalidated from
+# shop.signals, so they can be kept for a long time.
+PRODUCT_DETAIL_TIMEOUT = 60 * 60 * 24
+PRODUCT_LIST_TIMEOUT = 60 * 60
+CATEGORY_LIST_TIMEOUT = 60 * 60 * 24
+
+CATEGORY_LIST_CACHE_KEY = 'category_list_custom'
+
+# Anything rendering categories, including the category_detail of products.
+CATEGORY_TAG = 'category'
+# Anything rendering an arbitrary set of products, such as the product list.
+PRODUCTS_TAG = 'products'
+
+
+def get_product_tag(product_id):
+    return f'product:{product_id}'
+
+
+def get_product_detail_cache_key(slug):
+    return f'product_detail_{slug}'
+
+
+def get_product_list_cache_key(request):
+    """
+    Build the product list cache key from the normalized query parameters (filters,
+    ordering, search, page and page size), so the same query in a different
+    parameter order shares one entry.
+    """
+    params = sorted(
+        (key, sorted(value for value in values if value))
+        for key, values in request.query_params.lists()
+    )
+    query = urlencode([(key, values) for key, values in params if values], doseq=True)
+    digest = hashlib.md5(f'{request.get_host()}?{query}'.encode()).hexdigest()
+    return f'product_list:{digest}'
+
+
+def invalidate_products(*product_ids):
+    """
+    Invalidate the cached responses rendering any of the given products.
+    """
+    invalidate_tags(PRODUCTS_TAG, *(get_product_tag(product_id) for product_id in product_ids))
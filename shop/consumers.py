@@ -1,18 +1,21 @@
 import json
-import time
+import logging
 
-from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
-from django.core.cache import cache
+from redis.exceptions import RedisError
 
-from shop.models import Product
-from shop.utils import search_products
+from ecommerce_api.core.throttling import AsyncCooldownThrottle
+from shop.autocomplete import AutocompleteIndex
+
+logger = logging.getLogger(__name__)
 
 
 class SearchConsumer(AsyncWebsocketConsumer):
     """
     WebSocket consumer for handling real-time product search queries.
     """
+    throttle = AsyncCooldownThrottle('ws_search', cooldown=0.5)  # Minimum time (in seconds) between requests.
+    autocomplete = AutocompleteIndex()
 
     def __init__(self, *args, **kwargs):
         super().__init__(args, kwargs)
@@ -29,11 +32,12 @@ class SearchConsumer(AsyncWebsocketConsumer):
     async def disconnect(self, close_code):
         """
         Handles the WebSocket disconnection event.
-        Removes any cached data related to the throttle ID.
+        Removes the throttle state related to the throttle ID.
         """
-        cache.delete(f"search_suggestions_{self.throttle_id}")
-        cache.delete(f"last_query_{self.throttle_id}")
-        cache.delete(f"throttle_ws_{self.throttle_id}")
+        try:
+            await self.throttle.reset(self.throttle_id)
+        except RedisError as e:
+            logger.error("Error resetting search throttle %s: %s", self.throttle_id, e)
 
     async def receive(self, text_data=None, bytes_data=None):
         """
@@ -58,46 +62,30 @@ class SearchConsumer(AsyncWebsocketConsumer):
         # Send the search results back to the client.
         await self.send(text_data=json.dumps({'results': results}))
 
-    @database_sync_to_async
-    def get_search_suggestions(self, query):
+    async def get_search_suggestions(self, query):
         """
-        Fetches search suggestions for the given query.
+        Fetches search suggestions for the given query from the shared autocomplete index.
+        The lookup is a single Redis round-trip and never touches the database.
 
         :param query: The search term provided by the client.
-        :return: A list of up to 5 product names matching the query.
+        :return: A list of up to 5 product names matching the query, empty if the
+                 index is unavailable.
         """
-        key = f"search_suggestions_{self.throttle_id}"
-        past_results = cache.get(key)
-
-        if past_results and query.startswith(cache.get(f"last_query_{self.throttle_id}", "")):
-            # Filter cached results if the new query starts with the previous query
-            filtered_results = [product for product in past_results if query.lower() in product[0].lower()]
-        else:
-            # Fetch results from the database and cache them
-            products = Product.objects.all()
-            filtered_products = search_products(products, query)[:20]
-            filtered_results = list(filtered_products.values_list('name', 'description'))
-            cache.set(key, filtered_results, timeout=1)  # Cache results for 1 second
-            cache.set(f"last_query_{self.throttle_id}", query, timeout=1)  # Cache the last query
-
-        # Return only the titles, limited to 5 results
-        return [product[0] for product in filtered_results[:5]]
+        try:
+            return await self.autocomplete.asuggest(query, limit=5)
+        except RedisError as e:
+            logger.error("Error fetching search suggestions: %s", e)
+            return []
 
     async def is_throttled(self):
         """
         Checks if the client is making requests too frequently.
 
-        :return: True if the client is throttled, False otherwise.
+        :return: True if the client is throttled, False otherwise, including when the
+                 throttle state is unavailable.
         """
-        key = f"throttle_ws_{self.throttle_id}"
-        now = time.time()
-        cooldown = 0.5  # Minimum time (in seconds) between requests.
-
-        # Retrieve the timestamp of the last request from the cache.
-        last_request = cache.get(key)
-        if last_request and now - last_request < cooldown:
-            return True
-
-        # Update the cache with the current timestamp.
-        cache.set(key, now, timeout=5)
-        return False
+        try:
+            return await self.throttle.wait(self.throttle_id) > 0
+        except RedisError as e:
+            logger.error("Error checking search throttle %s: %s", self.throttle_id, e)
+            return False
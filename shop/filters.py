@@ -1,4 +1,3 @@
-from django.contrib.postgres.search import TrigramSimilarity
 from django_filters import FilterSet
 from rest_framework.filters import BaseFilterBackend
 
@@ -37,7 +36,8 @@ class InStockFilterBackend(BaseFilterBackend):
 
 class ProductSearchFilterBackend(BaseFilterBackend):
     """
-    Custom filter to search products by name and description.
+    Custom filter to search products with the ``search`` query parameter.
+    Uses ranked full-text search with a trigram fallback, see ``search_products``.
     """
 
     def filter_queryset(self, request, queryset, view):
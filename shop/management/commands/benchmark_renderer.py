@@ -0,0 +1,66 @@
+import timeit
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from ecommerce_api.core.api_standard_response import ApiResponse
+from ecommerce_api.core.renderers import ApiResponseRenderer
+
+
+def build_products(size):
+    """
+    Build a product list payload shaped like ProductSerializer output.
+    """
+    return [
+        {
+            'product_id': uuid.uuid4(),
+            'name': f'Product {i}',
+            'slug': f'product-{i}-2025-01-01',
+            'description': 'A sample product description. ' * 8,
+            'price': Decimal('19.99') + i,
+            'stock': i,
+            'thumbnail': f'http://localhost/media/products/{i}.jpg',
+            'detail_url': f'/api/v1/products/product-{i}-2025-01-01/',
+            'category_detail': {
+                'name': 'Books',
+                'slug': 'books',
+                'attributes': [{'name': 'Author', 'description': None}],
+            },
+            'tags': ['python', 'django', 'web'],
+            'rating': {'average': 4.5, 'count': 12},
+            'attributes': [{'attribute': {'name': 'Author', 'description': None}, 'value': 'Someone'}],
+            'created': datetime(2025, 1, 1, 12, 30, tzinfo=timezone.utc),
+        }
+        for i in range(size)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Compare the render cost of product list pages with the stdlib and orjson renderers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=100, help='Products per page')
+        parser.add_argument('--number', type=int, default=500, help='Renders per measurement')
+
+    def handle(self, *args, **options):
+        products = build_products(options['page_size'])
+        number = options['number']
+        stdlib_renderer = JSONRenderer()
+        renderer = ApiResponseRenderer()
+        candidates = {
+            # The previous rendering path: wrap through a Response, then encode with the stdlib
+            'before': lambda: stdlib_renderer.render(ApiResponse.success(data=products).data),
+            'after': lambda: renderer.render(products),
+        }
+
+        results = {}
+        for name, render in candidates.items():
+            best = min(timeit.repeat(render, number=number, repeat=5))
+            results[name] = best / number * 1_000_000
+            self.stdout.write(f'{name:<8} {results[name]:>10.1f} µs per {options["page_size"]}-product page')
+
+        speedup = results['before'] / results['after']
+        self.stdout.write(self.style.SUCCESS(f'ApiResponseRenderer is {speedup:.1f}x faster'))
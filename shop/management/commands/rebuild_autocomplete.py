@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from shop.autocomplete import AutocompleteIndex
+from shop.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the Redis autocomplete index from all products'
+
+    def handle(self, *args, **options):
+        products = Product.objects.prefetch_related('tags').iterator(chunk_size=500)
+        count = AutocompleteIndex().rebuild(products)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} products for autocomplete.'))
@@ -0,0 +1,72 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+SEARCH_VECTOR_INDEX = django.contrib.postgres.indexes.GinIndex(
+    fields=['search_vector'], name='shop_product_search_gin'
+)
+NAME_TRIGRAM_INDEX = django.contrib.postgres.indexes.GinIndex(
+    fields=['name'], name='shop_product_name_trgm', opclasses=['gin_trgm_ops']
+)
+
+BACKFILL_SQL = """
+UPDATE shop_product AS p SET search_vector =
+    setweight(to_tsvector(%(config)s, coalesce(p.name, '')), 'A') ||
+    setweight(to_tsvector(%(config)s, coalesce((
+        SELECT string_agg(t.name, ' ')
+        FROM shop_customtaggeditem ti
+        JOIN shop_customtag t ON t.id = ti.tag_id
+        JOIN django_content_type ct ON ct.id = ti.content_type_id
+        WHERE ti.object_id = p.product_id AND ct.app_label = 'shop' AND ct.model = 'product'
+    ), '')), 'A') ||
+    setweight(to_tsvector(%(config)s, coalesce(c.name, '')), 'B') ||
+    setweight(to_tsvector(%(config)s, coalesce(p.description, '')), 'C')
+FROM shop_category AS c
+WHERE c.id = p.category_id
+"""
+
+
+def create_indexes(apps, schema_editor):
+    # GIN indexes only exist on PostgreSQL; the test suite runs on SQLite.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Product = apps.get_model('shop', 'Product')
+    schema_editor.add_index(Product, SEARCH_VECTOR_INDEX)
+    schema_editor.add_index(Product, NAME_TRIGRAM_INDEX)
+    schema_editor.execute(BACKFILL_SQL, params={'config': settings.PRODUCT_SEARCH_CONFIG})
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Product = apps.get_model('shop', 'Product')
+    schema_editor.remove_index(Product, NAME_TRIGRAM_INDEX)
+    schema_editor.remove_index(Product, SEARCH_VECTOR_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('shop', '0009_alter_productattribute_value_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='product', index=SEARCH_VECTOR_INDEX),
+                migrations.AddIndex(model_name='product', index=NAME_TRIGRAM_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(create_indexes, reverse_code=drop_indexes),
+            ],
+        ),
+    ]
@@ -1,6 +1,8 @@
 import uuid
 
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 from django.urls import reverse
@@ -57,6 +59,8 @@ class Product(SluggedModel):
     stock = models.IntegerField(validators=[MinValueValidator(0)])
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
+    # Weighted full-text document maintained by shop.signals, see utils.update_search_vector
+    search_vector = SearchVectorField(null=True, editable=False)
     thumbnail = models.ImageField(
         null=True,
         blank=True,
@@ -83,6 +87,8 @@ class Product(SluggedModel):
             models.Index(fields=['slug']),
             models.Index(fields=['name']),
             models.Index(fields=['category']),
+            GinIndex(fields=['search_vector'], name='shop_product_search_gin'),
+            GinIndex(fields=['name'], name='shop_product_name_trgm', opclasses=['gin_trgm_ops']),
         ]
         ordering = ["name"]
 
@@ -0,0 +1,199 @@
+import logging
+
+from django.db.models import Count, Sum
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from .models import Product, Review
+
+logger = logging.getLogger(__name__)
+
+# Rating aggregates are cached in one Redis hash per product with the fields ``total``
+# and ``count``, computed from the database on a miss. A review change drops the hash
+# and bumps the product's rating version, and a computed aggregate is only stored if
+# the version has not moved since before it was computed. An aggregate read before a
+# review committed can therefore never overwrite a newer one, and no review is counted
+# twice. shop.tasks.reconcile_product_ratings periodically recomputes them all.
+
+# Drop an aggregate after a review change.
+# KEYS: rating hash, rating version
+INVALIDATE_SCRIPT = """
+redis.call('INCR', KEYS[2])
+redis.call('DEL', KEYS[1])
+return 1
+"""
+
+# Store a computed aggregate unless a review changed since it was computed.
+# KEYS: rating hash, rating version
+# ARGV: version read before computing, total, count
+# Returns 1 if the aggregate was stored.
+STORE_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'total', ARGV[2], 'count', ARGV[3])
+return 1
+"""
+
+
+def get_rating_key(product_id):
+    return f'product:{product_id}:rating'
+
+
+def get_version_key(product_id):
+    return f'product:{product_id}:rating:version'
+
+
+def get_client():
+    """
+    Return the Redis connection behind the default cache, or None for cache backends
+    without one, such as the dummy cache used in tests.
+    """
+    try:
+        return get_redis_connection('default')
+    except NotImplementedError:
+        return None
+
+
+def summarize(total, count):
+    return {"average": total / count if count > 0 else 0.0, "count": count}
+
+
+def aggregate_ratings(product_ids):
+    """
+    Compute the rating totals of several products with one grouped query.
+
+    Returns:
+        dict: Product id to ``(total, count)``.
+    """
+    totals = {product_id: (0, 0) for product_id in product_ids}
+    rows = (
+        Review.objects.filter(product_id__in=product_ids)
+        .values('product_id')
+        .annotate(total=Sum('rating'), count=Count('id'))
+        .order_by()
+    )
+    for row in rows:
+        totals[row['product_id']] = (row['total'], row['count'])
+    return totals
+
+
+def get_ratings(product_ids):
+    """
+    Return the rating summary of several products at once.
+
+    All aggregates are read in one pipelined round-trip; missing ones are computed
+    with a single grouped query and stored for the next read.
+
+    Args:
+        product_ids: The ids of the products to rate.
+
+    Returns:
+        dict: Product id to ``{"average": float, "count": int}``.
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    client = get_client()
+    if client is None:
+        return {product_id: summarize(*totals) for product_id, totals in aggregate_ratings(product_ids).items()}
+
+    try:
+        pipe = client.pipeline(transaction=False)
+        for product_id in product_ids:
+            pipe.hmget(get_rating_key(product_id), 'total', 'count')
+            pipe.get(get_version_key(product_id))
+        rows = pipe.execute()
+    except RedisError as e:
+        logger.error("Error reading product ratings: %s", e)
+        return {product_id: summarize(*totals) for product_id, totals in aggregate_ratings(product_ids).items()}
+
+    ratings = {}
+    versions = {}
+    for product_id, (total, count), version in zip(product_ids, rows[::2], rows[1::2]):
+        if total is None or count is None:
+            versions[product_id] = version
+        else:
+            ratings[product_id] = summarize(int(total), int(count))
+
+    if versions:
+        computed = aggregate_ratings(list(versions))
+        store_ratings(client, computed, versions)
+        ratings.update((product_id, summarize(*totals)) for product_id, totals in computed.items())
+
+    return ratings
+
+
+def store_ratings(client, computed, versions):
+    """
+    Store computed aggregates, skipping those of products whose reviews changed since
+    their version was read.
+
+    Args:
+        client: The Redis connection.
+        computed (dict): Product id to ``(total, count)``.
+        versions (dict): Product id to the rating version read before computing.
+    """
+    try:
+        store = client.register_script(STORE_SCRIPT)
+        pipe = client.pipeline(transaction=False)
+        for product_id, (total, count) in computed.items():
+            version = (versions.get(product_id) or b'0').decode()
+            store(keys=[get_rating_key(product_id), get_version_key(product_id)], args=[version, total, count], client=pipe)
+        pipe.execute()
+    except RedisError as e:
+        logger.error("Error storing product ratings: %s", e)
+
+
+def invalidate_rating(product_id):
+    """
+    Drop a product's rating aggregate after one of its reviews changed, so the next
+    read computes it again.
+    """
+    client = get_client()
+    if client is None:
+        return
+    try:
+        client.register_script(INVALIDATE_SCRIPT)(keys=[get_rating_key(product_id), get_version_key(product_id)])
+    except RedisError as e:
+        logger.error("Error invalidating rating of product %s: %s", product_id, e)
+
+
+def remove_rating(product_id):
+    client = get_client()
+    if client is None:
+        return
+    try:
+        client.delete(get_rating_key(product_id), get_version_key(product_id))
+    except RedisError as e:
+        logger.error("Error removing rating of product %s: %s", product_id, e)
+
+
+def reconcile_ratings(batch_size=500):
+    """
+    Recompute every product's rating aggregate from the database, repairing any drift
+    left by failed invalidations.
+
+    Returns:
+        int: The number of reconciled products.
+    """
+    client = get_client()
+    if client is None:
+        return 0
+
+    reconciled = 0
+    product_ids = Product.objects.values_list('product_id', flat=True).order_by()
+    batch = []
+    for product_id in product_ids.iterator(chunk_size=batch_size):
+        batch.append(product_id)
+        if len(batch) == batch_size:
+            reconciled += reconcile_batch(client, batch)
+            batch = []
+    if batch:
+        reconciled += reconcile_batch(client, batch)
+    return reconciled
+
+
+def reconcile_batch(client, product_ids):
+    # versions are read before the aggregates, like on a read miss
+    versions = dict(zip(product_ids, client.mget([get_version_key(product_id) for product_id in product_ids])))
+    store_ratings(client, aggregate_ratings(product_ids), versions)
+    return len(product_ids)
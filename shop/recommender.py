@@ -1,59 +1,141 @@
-import redis
-from django.conf import settings
+import uuid
 
-from .models import Product
+from django.core.cache import cache
+from django.db.models import Q
+
+from ecommerce_api.utils.redis_client import redis_client as r
 
-# connect to redis
-r = redis.from_url(settings.REDIS_URL)
+from .models import Product
 
 
 class Recommender:
+    # seconds a temporary union key may outlive a failed request
+    tmp_key_ttl = 60
+    # precomputed related products are refreshed by shop.tasks.refresh_related_products
+    # once queued as stale, and the whole catalogue a page per run to repair drift
+    related_timeout = 60 * 60 * 24
+    # products whose category, tags or co-purchases changed since the last refresh
+    stale_related_key = 'related_products:stale'
+
     def get_product_key(self, id):
         return f'product:{id}:purchased_with'
 
+    def get_related_cache_key(self, id):
+        return f'product_{id}_related'
+
     def products_bought(self, products):
-        product_ids = [p.id for p in products]
+        """
+        Record that the given products were bought together, and queue their related
+        products for a refresh.
+
+        All pair increments are queued on a non-transactional pipeline and sent to
+        Redis in a single round-trip, however large the basket is.
+        """
+        product_ids = list(dict.fromkeys(str(p.product_id) for p in products))
+        if len(product_ids) < 2:
+            return
+        pipe = r.pipeline(transaction=False)
         for product_id in product_ids:
             for with_id in product_ids:
                 # get the other products bought with each product
                 if product_id != with_id:
                     # increment score for product purchased together
-                    r.zincrby(
+                    pipe.zincrby(
                         self.get_product_key(product_id), 1, with_id
                     )
+        pipe.sadd(self.stale_related_key, *product_ids)
+        pipe.execute()
 
-    def suggest_products_for(self, products, max_results=6):
+    def suggest_product_ids_for(self, products, max_results=6):
+        """
+        Return the ids of the products most often bought together with the given
+        products, best first.
+
+        Only the top ``max_results`` members ever leave Redis. For several products the
+        scores are combined in a collision-safe temporary key inside one MULTI/EXEC
+        round-trip; the key also gets a TTL so it cannot leak if the client dies.
+        """
         product_ids = [str(p.product_id) for p in products]
-        if len(products) == 1:
+        if not product_ids or max_results <= 0:
+            return []
+        if len(product_ids) == 1:
             # only 1 product
             suggestions = r.zrange(
-                self.get_product_key(product_ids[0]), 0, -1, desc=True
-            )[:max_results]
+                self.get_product_key(product_ids[0]), 0, max_results - 1, desc=True
+            )
         else:
-            # generate a temporary key
-            flat_ids = ''.join([str(id) for id in product_ids])
-            tmp_key = f'tmp_{flat_ids}'
-            # multiple products, combine scores of all products
-            # store the resulting sorted set in a temporary key
+            # generate a unique temporary key
+            tmp_key = f'tmp:recommendations:{uuid.uuid4().hex}'
             keys = [self.get_product_key(id) for id in product_ids]
-            r.zunionstore(tmp_key, keys)
+            pipe = r.pipeline(transaction=True)
+            # multiple products, combine scores of all products
+            pipe.zunionstore(tmp_key, keys)
+            pipe.expire(tmp_key, self.tmp_key_ttl)
             # remove ids for the products the recommendation is for
-            r.zrem(tmp_key, *product_ids)
-            # get the product ids by their score, descendant sort
-            suggestions = r.zrange(
-                tmp_key, 0, -1, desc=True
-            )[:max_results]
+            pipe.zrem(tmp_key, *product_ids)
+            # get the top product ids by their score, descendant sort
+            pipe.zrange(tmp_key, 0, max_results - 1, desc=True)
             # remove the temporary key
-            r.delete(tmp_key)
-        suggested_products_ids = [str(id) for id in suggestions]
+            pipe.delete(tmp_key)
+            suggestions = pipe.execute()[3]
+        return [id.decode() for id in suggestions]
+
+    def suggest_products_for(self, products, max_results=6):
+        suggested_products_ids = self.suggest_product_ids_for(products, max_results)
         # get suggested products and sort by order of appearance
-        suggested_products = list(
-            Product.objects.filter(product_id__in=suggested_products_ids)
-        )
-        suggested_products.sort(
-            key=lambda x: suggested_products_ids.index(x.product_id)
-        )
-        return suggested_products
+        products_by_id = {
+            str(product.product_id): product
+            for product in Product.objects.filter(product_id__in=suggested_products_ids)
+        }
+        return [
+            products_by_id[id] for id in suggested_products_ids if id in products_by_id
+        ]
+
+    def compute_related_product_ids(self, product, max_results=10, max_co_purchased=5):
+        """
+        Compute the "related products" of a product: the products most often bought
+        with it first, topped up with products sharing its category or tags.
+        """
+        related_ids = self.suggest_product_ids_for([product], max_results=max_co_purchased)
+        remaining = max_results - len(related_ids)
+        if remaining > 0:
+            similar_ids = (
+                Product.objects.filter(
+                    Q(category_id=product.category_id) |
+                    Q(tags__in=product.tags.all())
+                ).exclude(
+                    product_id__in=[product.product_id, *related_ids]
+                ).values_list('product_id', flat=True).distinct()[:remaining]
+            )
+            related_ids.extend(str(id) for id in similar_ids)
+        return related_ids
+
+    def get_related_product_ids(self, product):
+        """
+        Return the precomputed related product ids, computing and storing them on a miss.
+        """
+        cache_key = self.get_related_cache_key(product.product_id)
+        related_ids = cache.get(cache_key)
+        if related_ids is None:
+            related_ids = self.compute_related_product_ids(product)
+            cache.set(cache_key, related_ids, self.related_timeout)
+        return related_ids
+
+    def invalidate_related_products(self, product_id):
+        cache.delete(self.get_related_cache_key(product_id))
+
+    def mark_related_stale(self, *product_ids):
+        """
+        Queue the related products of the given products for the next refresh.
+        """
+        r.sadd(self.stale_related_key, *(str(id) for id in product_ids))
+
+    def pop_stale_related(self, count):
+        """
+        Remove and return up to ``count`` product ids queued for a refresh.
+        """
+        return [id.decode() for id in r.spop(self.stale_related_key, count)]
+
     #
     # def suggest_for_user(self, user, max_results=100):
     #     """
@@ -1,10 +1,10 @@
 
-from django.core.cache import cache
-from django.db.models import Q
+from django.db import models
 from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
 from .models import Category, Product, Review, Attribute, ProductAttribute
+from .ratings import get_ratings
 from .recommender import Recommender
 
 
@@ -32,6 +32,20 @@ class ProductAttributeSerializer(serializers.ModelSerializer):
         fields = ['attribute', 'value']
 
 
+class ProductListSerializer(serializers.ListSerializer):
+    """
+    List serializer that looks up the ratings of all products in one batch.
+    """
+
+    def to_representation(self, data):
+        products = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        self.child._ratings = get_ratings(product.product_id for product in products)
+        try:
+            return super().to_representation(products)
+        finally:
+            self.child._ratings = None
+
+
 class ProductSerializer(serializers.ModelSerializer):
     category = serializers.SlugRelatedField(
         slug_field='slug',
@@ -63,23 +77,11 @@ class ProductSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(serializers.DictField(child=serializers.FloatField()))
     def get_rating(self, obj):
-        cache_key = f"product_{obj.product_id}_rating"
-        cached_data = cache.get(cache_key)
-        if cached_data is None:
-            reviews = obj.reviews.all()
-            if not reviews:
-                return {"average": 0.0, "count": 0}
-            total_rating = sum(review.rating for review in reviews)
-            count = len(reviews)
-            average_rating = total_rating / count
-            cached_data = {"average": average_rating, "count": count, "total_rating": total_rating}
-            cache.set(cache_key, cached_data, 604800)
-        else:
-            if cached_data["count"] > 0:
-                cached_data["average"] = cached_data["total_rating"] / cached_data["count"]
-            else:
-                cached_data["average"] = 0.0
-        return {"average": cached_data["average"], "count": cached_data["count"]}
+        # ProductListSerializer fetches the ratings of a whole page up front
+        ratings = getattr(self, '_ratings', None)
+        if ratings is None or obj.product_id not in ratings:
+            ratings = get_ratings([obj.product_id])
+        return ratings[obj.product_id]
 
     def to_internal_value(self, data):
         if self.instance is None and 'category' not in data:
@@ -122,6 +124,7 @@ class ProductSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Product
+        list_serializer_class = ProductListSerializer
         fields = [
             'product_id',
             'name',
@@ -158,16 +161,17 @@ class ProductDetailSerializer(ProductSerializer):
         return ReviewSerializer(reviews, many=True, context=self.context).data
 
     def get_recommended_products(self, obj):
-        recommender = Recommender()
-        recommended_products = [product.product_id for product in
-                                recommender.suggest_products_for([obj], max_results=5)]
-        suggested_products = (
-            Product.objects.filter(
-                Q(category=obj.category) |
-                Q(tags__in=obj.tags.all()) |
-                Q(product_id__in=recommended_products)
-            ).exclude(product_id=obj.product_id).distinct()[:10]
-        )
+        related_ids = Recommender().get_related_product_ids(obj)
+        if not related_ids:
+            return []
+        related_products = {
+            str(product.product_id): product
+            for product in Product.objects.filter(product_id__in=related_ids).select_related(
+                'category'
+            ).prefetch_related('category__attributes', 'tags', 'attributes__attribute')
+        }
+        # keep the precomputed order and skip products deleted since it was stored
+        suggested_products = [related_products[id] for id in related_ids if id in related_products]
         return ProductSerializer(suggested_products, many=True, context=self.context).data
 
     class Meta(ProductSerializer.Meta):
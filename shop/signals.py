@@ -1,97 +1,181 @@
-from django.core.cache import cache
-from django.db.models.signals import post_save, post_delete
+import logging
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
+from redis.exceptions import RedisError
 
-from .models import Category
+from ecommerce_api.utils.cache_tags import invalidate_tags
+from .autocomplete import AutocompleteIndex
+from .cache import CATEGORY_TAG, invalidate_products
+from .custom_taggit import CustomTaggedItem
+from .models import Category, Product, ProductAttribute
 from .models import Review
+from .ratings import invalidate_rating, remove_rating
+from .recommender import Recommender
+from .utils import update_search_vector
 
+logger = logging.getLogger(__name__)
 
-@receiver([post_save, post_delete], sender=Category)
-def invalidate_category_cache(sender, instance, created=False, **kwargs):
+
+@receiver(post_save, sender=Product)
+def update_product_search_vector(sender, instance, **kwargs):
+    """
+    Refresh the precomputed search vector after a product is created or updated.
+    """
+    update_search_vector(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(m2m_changed, sender=CustomTaggedItem)
+def update_search_indexes_on_tags_change(sender, instance, action, **kwargs):
+    """
+    Refresh the search vector and the autocomplete terms when tags are added to or
+    removed from a product.
+    """
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, Product):
+        update_search_vector(Product.objects.filter(pk=instance.pk))
+        update_autocomplete_index(sender=Product, instance=instance)
+        invalidate_related_products(sender=Product, instance=instance)
+        invalidate_products(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def update_autocomplete_index(sender, instance, **kwargs):
+    """
+    Re-index a product's name and tags in the search-as-you-type index once the save
+    is committed, so a rolled-back save leaves no suggestion behind.
+    """
+    transaction.on_commit(lambda: index_for_autocomplete(instance))
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_autocomplete_index(sender, instance, **kwargs):
     """
-    Invalidate the cache for the category list when a category is created, updated or deleted.
+    Drop a deleted product from the search-as-you-type index once the delete is committed.
     """
-    import logging
-    logger = logging.getLogger(__name__)
+    product_id = instance.pk
+    transaction.on_commit(lambda: remove_from_autocomplete(product_id))
 
-    action = "created" if kwargs.get('created', False) else "updated" if sender == post_save else "deleted"
-    logger.info(f"Category {instance.name} was {action}, invalidating cache...")
 
-    # Clear the custom category cache key
+def index_for_autocomplete(product):
     try:
-        # Clear the specific cache key used in the views
-        cache.delete('category_list_custom')
-        logger.info("Category cache invalidated successfully")
-
-        # Also clear any cache_page patterns if they exist from other views
-        if hasattr(cache, 'delete_pattern'):
-            cache.delete_pattern('*category_list*')
-            cache.delete_pattern('*views.decorators.cache.cache_page*category_list*')
-            logger.info("Cache patterns also cleared")
-
-    except Exception as e:
-        logger.error(f"Error invalidating cache: {e}")
-        try:
-            # Fallback: Clear the entire cache if specific key deletion fails
-            cache.clear()
-            logger.info("Fallback: Entire cache cleared")
-        except Exception as fallback_e:
-            logger.error(f"Fallback cache clear also failed: {fallback_e}")
+        AutocompleteIndex().index_product(product)
+    except RedisError as e:
+        logger.error("Error indexing product %s for autocomplete: %s", product.pk, e)
+
+
+def remove_from_autocomplete(product_id):
+    try:
+        AutocompleteIndex().remove_product(product_id)
+    except RedisError as e:
+        logger.error("Error removing product %s from autocomplete: %s", product_id, e)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_related_products(sender, instance, **kwargs):
+    """
+    Drop a product's precomputed related products once its category or tags may have
+    changed; they are recomputed on the next read, or by the periodic refresh once the
+    change is committed.
+    """
+    Recommender().invalidate_related_products(instance.pk)
+    product_id = instance.pk
+    transaction.on_commit(lambda: mark_related_products_stale(product_id))
+
+
+def mark_related_products_stale(product_id):
+    try:
+        Recommender().mark_related_stale(product_id)
+    except RedisError as e:
+        logger.error("Error queueing product %s for a related products refresh: %s", product_id, e)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    """
+    Invalidate the cached responses rendering a saved or deleted product.
+    """
+    invalidate_products(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Review)
+@receiver([post_save, post_delete], sender=ProductAttribute)
+def invalidate_product_cache_on_related_change(sender, instance, **kwargs):
+    """
+    Invalidate the cached responses rendering a product whose reviews or attributes changed.
+    """
+    invalidate_products(instance.product_id)
+
+
+@receiver(post_save, sender=Category)
+def update_search_vector_on_category_save(sender, instance, created, **kwargs):
+    """
+    Refresh the search vectors of a category's products, which include the category name.
+    """
+    if not created:
+        update_search_vector(Product.objects.filter(category=instance))
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_cache(sender, instance, **kwargs):
+    """
+    Invalidate every cached response rendering categories when a category is created,
+    updated or deleted. This is a single counter increment, unrelated keys such as
+    sessions and carts are never touched.
+    """
+    invalidate_tags(CATEGORY_TAG)
+
+
+@receiver(m2m_changed, sender=Category.attributes.through)
+def invalidate_category_cache_on_attributes_change(sender, instance, action, **kwargs):
+    """
+    Invalidate cached categories when attributes are added to or removed from one.
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_tags(CATEGORY_TAG)
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_rating(sender, instance, **kwargs):
+    """
+    Keep the stored rating of an edited review, so the product's rating aggregate is
+    only invalidated when the rating changed.
+    """
+    instance._previous_rating = None
+    if not instance._state.adding:
+        instance._previous_rating = Review.objects.filter(pk=instance.pk).values_list('rating', flat=True).first()
+
 
 @receiver(post_save, sender=Review)
 def update_rating_on_review_save(sender, instance, created, **kwargs):
     """
-    Update the cached rating when a new review is created or an existing review is updated.
+    Invalidate the product's rating aggregate once a new or re-rated review is committed.
 
     Args:
         sender: The model class (Review).
         instance: The instance of the review being saved.
         created: Boolean indicating if the review was created (True) or updated (False).
     """
-    product = instance.product
-    cache_key = f"product_{product.product_id}_rating"
-    cached_data = cache.get(cache_key)
-
-    if cached_data is None:
-        # If cache is not initialized, initialize it
-        reviews = product.reviews.all()
-        total_rating = sum(review.rating for review in reviews)
-        count = len(reviews)
-        average_rating = total_rating / count if count > 0 else 0.0
-        cached_data = {"average": average_rating, "count": count, "total_rating": total_rating}
-    else:
-        # Incrementally update the cache
-        if created:
-            cached_data["total_rating"] += instance.rating
-            cached_data["count"] += 1
-        else:
-            # For updates, adjust the total rating
-            old_rating = instance.__class__.objects.get(pk=instance.pk).rating
-            cached_data["total_rating"] += instance.rating - old_rating
-
-        cached_data["average"] = cached_data["total_rating"] / cached_data["count"]
-
-    cache.set(cache_key, cached_data, 604800)  # Cache for 1 week (604800 seconds)
+    if not created and getattr(instance, '_previous_rating', None) in (None, instance.rating):
+        return
+    transaction.on_commit(lambda: invalidate_rating(instance.product_id))
 
 
 @receiver(post_delete, sender=Review)
 def update_rating_on_review_delete(sender, instance, **kwargs):
     """
-    Update the cached rating when a review is deleted.
+    Invalidate the product's rating aggregate once a review deletion is committed.
 
     Args:
         sender: The model class (Review).
         instance: The instance of the review being deleted.
     """
-    product = instance.product
-    cache_key = f"product_{product.product_id}_rating"
-    cached_data = cache.get(cache_key)
-
-    if cached_data is not None:
-        # Decrementally update the cache
-        cached_data["total_rating"] -= instance.rating
-        cached_data["count"] -= 1
-        cached_data["average"] = (
-            cached_data["total_rating"] / cached_data["count"] if cached_data["count"] > 0 else 0.0
-        )
-        cache.set(cache_key, cached_data, 604800)  # Cache for 1 week (604800 seconds)
+    transaction.on_commit(lambda: invalidate_rating(instance.product_id))
+
+
+@receiver(post_delete, sender=Product)
+def remove_rating_on_product_delete(sender, instance, **kwargs):
+    """
+    Drop the rating aggregate of a deleted product.
+    """
+    transaction.on_commit(lambda: remove_rating(instance.pk))
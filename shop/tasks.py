@@ -1,11 +1,16 @@
 from celery import shared_task
 from django.core.cache import cache
+from .ratings import reconcile_ratings
 from .recommender import Recommender
 from .models import Product
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# The last product whose related products were refreshed by the drift repair pass.
+RELATED_REFRESH_CURSOR_KEY = 'related_products:refresh_cursor'
+
+
 @shared_task
 def update_user_recommendations(user_id):
     """
@@ -37,3 +42,54 @@ def update_user_recommendations(user_id):
     except User.DoesNotExist:
         # Handle case where user is not found
         pass
+
+
+@shared_task
+def record_order_co_purchases(order_id):
+    """
+    Feed the products of a paid order into the co-purchase recommender.
+    """
+    products = Product.objects.filter(order_items__order_id=order_id).only('product_id').distinct()
+    Recommender().products_bought(products)
+
+
+@shared_task
+def refresh_related_products(batch_size=500):
+    """
+    Precompute the related products of the products whose category, tags or
+    co-purchases changed since the last run, so product detail pages only read a short
+    list of ids instead of ranking candidates on each request.
+
+    Each run also refreshes the next page of the catalogue, which repairs drift such as
+    similar products moving to another category without recomputing every product.
+    """
+    recommender = Recommender()
+    products = Product.objects.only('product_id', 'category_id').order_by('product_id')
+    while product_ids := recommender.pop_stale_related(batch_size):
+        store_related_products(recommender, products.filter(product_id__in=product_ids))
+
+    cursor = cache.get(RELATED_REFRESH_CURSOR_KEY)
+    if cursor is not None:
+        products = products.filter(product_id__gt=cursor)
+    page = list(products[:batch_size])
+    store_related_products(recommender, page)
+    # start over from the first product once the last page was reached
+    cursor = str(page[-1].product_id) if len(page) == batch_size else None
+    cache.set(RELATED_REFRESH_CURSOR_KEY, cursor, None)
+
+
+def store_related_products(recommender, products):
+    batch = {
+        recommender.get_related_cache_key(product.product_id): recommender.compute_related_product_ids(product)
+        for product in products
+    }
+    if batch:
+        cache.set_many(batch, recommender.related_timeout)
+
+
+@shared_task
+def reconcile_product_ratings():
+    """
+    Recompute the rating aggregates of all products from their reviews.
+    """
+    return reconcile_ratings()
@@ -0,0 +1,82 @@
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, transaction
+from django.test import TestCase
+
+from shop.autocomplete import AutocompleteIndex, normalize
+from shop.models import Category, Product
+
+User = get_user_model()
+
+
+class AutocompleteIndexTest(TestCase):
+    def setUp(self):
+        self.index = AutocompleteIndex(client=MagicMock(), async_client=MagicMock())
+
+    def test_normalize(self):
+        self.assertEqual(normalize('  Python\tCrash  COURSE '), 'python crash course')
+        self.assertEqual(normalize(None), '')
+
+    def test_get_terms_includes_name_words_and_tags(self):
+        terms = self.index.get_terms('Python Crash Course', ['Programming', 'books'])
+        self.assertEqual(
+            terms,
+            ['books', 'course', 'crash', 'programming', 'python', 'python crash course'],
+        )
+
+    def test_get_terms_skips_short_words(self):
+        self.assertNotIn('a', self.index.get_terms('A Book'))
+
+    def test_suggest_args_cover_prefix_range(self):
+        args = self.index._suggest_args('Pro', 5)
+        self.assertEqual(args, [b'[pro', b'[pro\xff', 20, 5])
+
+    def test_blank_query_does_not_hit_redis(self):
+        self.index._suggest = MagicMock()
+        self.assertEqual(self.index.suggest('   '), [])
+        self.index._suggest.assert_not_called()
+
+
+class AutocompleteSignalsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='password')
+        self.category = Category.objects.create(name='Books')
+
+    @patch('shop.recommender.r')
+    @patch('shop.signals.AutocompleteIndex')
+    def test_product_save_and_delete_update_index(self, mock_index, mock_redis):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(
+                name='Python Crash Course', price=10, stock=5, category=self.category, user=self.user
+            )
+            mock_index.return_value.index_product.assert_not_called()
+        mock_index.return_value.index_product.assert_called_with(product)
+
+        product_id = product.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        mock_index.return_value.remove_product.assert_called_with(product_id)
+
+    @patch('shop.signals.AutocompleteIndex')
+    def test_rolled_back_save_is_not_indexed(self, mock_index):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Product.objects.create(
+                        name='Python Crash Course', price=10, stock=5, category=self.category, user=self.user
+                    )
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+        mock_index.return_value.index_product.assert_not_called()
+
+    @patch('shop.recommender.r')
+    @patch('shop.signals.AutocompleteIndex')
+    def test_tag_change_reindexes_product(self, mock_index, mock_redis):
+        product = Product.objects.create(
+            name='Python Crash Course', price=10, stock=5, category=self.category, user=self.user
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            product.tags.add('python')
+        mock_index.return_value.index_product.assert_called_once_with(product)
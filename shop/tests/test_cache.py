@@ -0,0 +1,104 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ecommerce_api.utils.cache_tags import get_tag_versions, get_tagged, invalidate_tags, set_tagged
+from shop.models import Category, Product
+from shop.views import CategoryViewSet
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CacheTagsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_entry_survives_until_one_of_its_tags_is_invalidated(self):
+        set_tagged('key', {'a': 1}, ['category', 'product:1'])
+        invalidate_tags('product:2')
+        self.assertEqual(get_tagged('key'), {'a': 1})
+
+        invalidate_tags('product:1')
+        self.assertIsNone(get_tagged('key'))
+
+    def test_lost_counter_invalidates_entries(self):
+        set_tagged('key', 'value', ['category'])
+        cache.delete('cache_tag:category')
+        self.assertIsNone(get_tagged('key'))
+
+    def test_value_computed_before_an_invalidation_is_not_stored(self):
+        versions = get_tag_versions(['category'])
+        invalidate_tags('category')
+        set_tagged('key', 'stale', ['category'], versions=versions)
+        self.assertIsNone(get_tagged('key'))
+
+        versions = get_tag_versions(['category'])
+        set_tagged('key', 'fresh', ['category'], versions=versions)
+        self.assertEqual(get_tagged('key'), 'fresh')
+
+    def test_invalidation_leaves_other_keys_alone(self):
+        cache.set('session:abc', 'data')
+        invalidate_tags('category')
+        self.assertEqual(cache.get('session:abc'), 'data')
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+@patch('shop.recommender.r')
+class TaggedResponseCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', email='user1@example.com', password='password')
+        self.category = Category.objects.create(name='Books')
+        self.product = Product.objects.create(
+            name='Django', description='A book', price=10, stock=5, category=self.category, user=self.user
+        )
+        self.related = Product.objects.create(
+            name='Flask', description='A book', price=10, stock=5, category=self.category, user=self.user
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_category_update_invalidates_category_list(self, mock_redis):
+        url = reverse('api-v1:category-list')
+        self.client.get(url)
+        self.category.name = 'Novels'
+        self.category.save()
+        response = self.client.get(url)
+        self.assertEqual(response.data['data'][0]['name'], 'Novels')
+
+    def test_category_list_rendered_across_an_update_is_not_cached(self, mock_redis):
+        url = reverse('api-v1:category-list')
+        filter_queryset = CategoryViewSet.filter_queryset
+
+        def rename_after_reading(view, queryset):
+            categories = list(filter_queryset(view, queryset))
+            Category.objects.get(pk=self.category.pk).save()
+            return categories
+
+        with patch.object(CategoryViewSet, 'filter_queryset', autospec=True, side_effect=rename_after_reading):
+            self.client.get(url)
+        # A queryset update sends no signal, so a cached list would still be served
+        Category.objects.filter(pk=self.category.pk).update(name='Novels')
+        response = self.client.get(url)
+        self.assertEqual(response.data['data'][0]['name'], 'Novels')
+
+    def test_recommended_product_change_invalidates_detail(self, mock_redis):
+        mock_redis.zrange.return_value = []
+        url = reverse('api-v1:product-detail', kwargs={'slug': self.product.slug})
+        self.client.get(url)
+        self.related.price = 30
+        self.related.save()
+        response = self.client.get(url)
+        self.assertEqual(response.data['recommended_products'][0]['price'], '30.00')
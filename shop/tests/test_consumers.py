@@ -0,0 +1,78 @@
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from channels.testing import WebsocketCommunicator
+from django.test import SimpleTestCase
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from ecommerce_api.core.throttling import AsyncCooldownThrottle
+from shop.consumers import SearchConsumer
+
+
+class AsyncCooldownThrottleTest(SimpleTestCase):
+    def setUp(self):
+        self.client = MagicMock()
+        self.script = AsyncMock()
+        self.client.register_script.return_value = self.script
+        self.throttle = AsyncCooldownThrottle('test', cooldown=0.5, client=self.client)
+
+    async def test_allowed_call_runs_one_script(self):
+        self.script.return_value = 0
+        self.assertEqual(await self.throttle.wait('abc'), 0)
+        self.script.assert_awaited_once_with(keys=['throttle:test:abc'], args=[500])
+
+    async def test_throttled_call_returns_seconds_to_wait(self):
+        self.script.return_value = 250
+        self.assertEqual(await self.throttle.wait('abc'), 0.25)
+
+
+class SearchConsumerTest(SimpleTestCase):
+    async def connect(self):
+        communicator = WebsocketCommunicator(SearchConsumer.as_asgi(), '/ws/search/')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    @patch.object(SearchConsumer, 'autocomplete')
+    @patch.object(SearchConsumer, 'throttle')
+    async def test_receive_returns_suggestions(self, mock_throttle, mock_autocomplete):
+        mock_throttle.wait = AsyncMock(return_value=0)
+        mock_throttle.reset = AsyncMock()
+        mock_autocomplete.asuggest = AsyncMock(return_value=['Python Crash Course'])
+
+        communicator = await self.connect()
+        await communicator.send_to(text_data=json.dumps({'query': 'pyt'}))
+        response = json.loads(await communicator.receive_from())
+        self.assertEqual(response, {'results': ['Python Crash Course']})
+        mock_autocomplete.asuggest.assert_awaited_once_with('pyt', limit=5)
+
+        await communicator.disconnect()
+        mock_throttle.reset.assert_awaited_once()
+
+    @patch.object(SearchConsumer, 'autocomplete')
+    @patch.object(SearchConsumer, 'throttle')
+    async def test_throttled_message_is_rejected(self, mock_throttle, mock_autocomplete):
+        mock_throttle.wait = AsyncMock(return_value=0.3)
+        mock_throttle.reset = AsyncMock()
+        mock_autocomplete.asuggest = AsyncMock()
+
+        communicator = await self.connect()
+        await communicator.send_to(text_data=json.dumps({'query': 'pyt'}))
+        response = json.loads(await communicator.receive_from())
+        self.assertEqual(response, {'error': 'Too many requests'})
+        mock_autocomplete.asuggest.assert_not_awaited()
+        await communicator.disconnect()
+
+    @patch.object(SearchConsumer, 'autocomplete')
+    @patch.object(SearchConsumer, 'throttle')
+    async def test_redis_errors_keep_the_connection_open(self, mock_throttle, mock_autocomplete):
+        mock_throttle.wait = AsyncMock(side_effect=RedisConnectionError())
+        mock_throttle.reset = AsyncMock(side_effect=RedisConnectionError())
+        mock_autocomplete.asuggest = AsyncMock(side_effect=RedisConnectionError())
+
+        communicator = await self.connect()
+        for _ in range(2):
+            await communicator.send_to(text_data=json.dumps({'query': 'pyt'}))
+            response = json.loads(await communicator.receive_from())
+            self.assertEqual(response, {'results': []})
+        await communicator.disconnect()
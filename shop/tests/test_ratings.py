@@ -0,0 +1,131 @@
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from redis.exceptions import RedisError
+
+from ecommerce_api.utils.redis_client import redis_client
+from shop import ratings
+from shop.models import Category, Product, Review
+from shop.ratings import get_rating_key, get_ratings, get_version_key, reconcile_ratings
+
+User = get_user_model()
+
+
+def redis_available():
+    try:
+        return redis_client.ping()
+    except RedisError:
+        return False
+
+
+class RatingsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='password')
+        self.other_user = User.objects.create_user(username='other', email='other@example.com', password='password')
+        category = Category.objects.create(name='Books')
+        self.product = Product.objects.create(name='Django', price=10, stock=5, category=category, user=self.user)
+        self.unrated = Product.objects.create(name='Flask', price=10, stock=5, category=category, user=self.user)
+        self.review = Review(product=self.product, user=self.user, rating=5)
+        self.review.save(skip_validation=True)
+        Review(product=self.product, user=self.other_user, rating=2).save(skip_validation=True)
+
+    @patch('shop.ratings.get_client')
+    def test_stored_aggregates_are_read_in_one_pipeline(self, mock_get_client):
+        pipe = mock_get_client.return_value.pipeline.return_value
+        pipe.execute.return_value = [[b'9', b'3'], b'1', [b'0', b'0'], None]
+
+        with self.assertNumQueries(0):
+            ratings = get_ratings([self.product.product_id, self.unrated.product_id])
+
+        self.assertEqual(ratings[self.product.product_id], {'average': 3.0, 'count': 3})
+        self.assertEqual(ratings[self.unrated.product_id], {'average': 0.0, 'count': 0})
+        self.assertEqual(pipe.execute.call_count, 1)
+
+    @patch('shop.ratings.get_client')
+    def test_missing_aggregates_are_computed_and_stored_at_the_read_version(self, mock_get_client):
+        client = mock_get_client.return_value
+        client.pipeline.return_value.execute.return_value = [[None, None], b'4']
+
+        ratings = get_ratings([self.product.product_id])
+
+        self.assertEqual(ratings[self.product.product_id], {'average': 3.5, 'count': 2})
+        store = client.register_script.return_value
+        store.assert_called_once_with(
+            keys=[get_rating_key(self.product.product_id), get_version_key(self.product.product_id)],
+            args=['4', 7, 2],
+            client=client.pipeline.return_value,
+        )
+
+    @patch('shop.ratings.get_client')
+    def test_reconcile_recomputes_every_product(self, mock_get_client):
+        client = mock_get_client.return_value
+        client.mget.return_value = [None, None]
+        self.assertEqual(reconcile_ratings(), 2)
+        stored = {call.kwargs['keys'][0]: call.kwargs['args'] for call in client.register_script.return_value.call_args_list}
+        self.assertEqual(stored[get_rating_key(self.product.product_id)], ['0', 7, 2])
+        self.assertEqual(stored[get_rating_key(self.unrated.product_id)], ['0', 0, 0])
+
+    @patch('shop.signals.invalidate_rating')
+    def test_edited_review_invalidates_only_when_rerated(self, mock_invalidate):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.review.comment = 'Edited'
+            self.review.save(skip_validation=True)
+        mock_invalidate.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.review.rating = 3
+            self.review.save(skip_validation=True)
+        mock_invalidate.assert_called_once_with(self.product.product_id)
+
+    @patch('shop.signals.invalidate_rating')
+    def test_deleted_review_invalidates(self, mock_invalidate):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.review.delete()
+        mock_invalidate.assert_called_once_with(self.product.product_id)
+
+
+@skipUnless(redis_available(), 'Redis is not available')
+@patch('shop.ratings.get_client', return_value=redis_client)
+class RatingsConcurrencyTest(TestCase):
+    """
+    Interleave a read miss with a review commit against Redis itself.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='password')
+        self.other_user = User.objects.create_user(username='other', email='other@example.com', password='password')
+        category = Category.objects.create(name='Books')
+        self.product = Product.objects.create(name='Django', price=10, stock=5, category=category, user=self.user)
+        Review(product=self.product, user=self.user, rating=5).save(skip_validation=True)
+        self.keys = [get_rating_key(self.product.product_id), get_version_key(self.product.product_id)]
+        redis_client.delete(*self.keys)
+        self.addCleanup(redis_client.delete, *self.keys)
+
+    def add_review_during_aggregation(self, before):
+        """
+        Make the reader's aggregate query see the database before or after a new review
+        commits, with the commit's invalidation running while the reader is computing.
+        """
+        aggregate_ratings = ratings.aggregate_ratings
+
+        def aggregate(product_ids):
+            if before:
+                totals = aggregate_ratings(product_ids)
+            with self.captureOnCommitCallbacks(execute=True):
+                Review(product=self.product, user=self.other_user, rating=1).save(skip_validation=True)
+            return totals if before else aggregate_ratings(product_ids)
+        return patch('shop.ratings.aggregate_ratings', side_effect=aggregate)
+
+    def test_aggregate_read_before_a_review_commits_is_not_stored(self, mock_get_client):
+        with self.add_review_during_aggregation(before=True):
+            self.assertEqual(get_ratings([self.product.product_id])[self.product.product_id]['count'], 1)
+        self.assertEqual(get_ratings([self.product.product_id])[self.product.product_id], {'average': 3.0, 'count': 2})
+        self.assertEqual(redis_client.hget(self.keys[0], 'count'), b'2')
+
+    def test_review_committed_before_the_aggregate_read_is_counted_once(self, mock_get_client):
+        with self.add_review_during_aggregation(before=False):
+            get_ratings([self.product.product_id])
+        self.assertEqual(get_ratings([self.product.product_id])[self.product.product_id], {'average': 3.0, 'count': 2})
+        self.assertEqual(redis_client.hget(self.keys[0], 'count'), b'2')
@@ -0,0 +1,123 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from shop.models import Category, Product
+from shop.recommender import Recommender
+from shop.tasks import refresh_related_products
+
+User = get_user_model()
+
+
+class ProductsBoughtTest(SimpleTestCase):
+    def setUp(self):
+        self.products = [SimpleNamespace(product_id=f'p{i}') for i in range(3)]
+
+    @patch('shop.recommender.r')
+    def test_all_pairs_sent_in_one_pipeline(self, mock_redis):
+        pipe = mock_redis.pipeline.return_value
+        Recommender().products_bought(self.products)
+
+        mock_redis.pipeline.assert_called_once_with(transaction=False)
+        self.assertEqual(pipe.zincrby.call_count, 6)
+        pipe.zincrby.assert_any_call('product:p0:purchased_with', 1, 'p2')
+        pipe.sadd.assert_called_once_with(Recommender.stale_related_key, 'p0', 'p1', 'p2')
+        pipe.execute.assert_called_once()
+        mock_redis.zincrby.assert_not_called()
+
+    @patch('shop.recommender.r')
+    def test_single_product_is_skipped(self, mock_redis):
+        Recommender().products_bought(self.products[:1])
+        mock_redis.pipeline.assert_not_called()
+
+
+class SuggestProductsTest(SimpleTestCase):
+    @patch('shop.recommender.r')
+    def test_single_product_fetches_only_top_k(self, mock_redis):
+        mock_redis.zrange.return_value = [b'p2', b'p1']
+        ids = Recommender().suggest_product_ids_for([SimpleNamespace(product_id='p0')], max_results=2)
+
+        self.assertEqual(ids, ['p2', 'p1'])
+        mock_redis.zrange.assert_called_once_with('product:p0:purchased_with', 0, 1, desc=True)
+
+    @patch('shop.recommender.r')
+    def test_multiple_products_use_one_transaction(self, mock_redis):
+        pipe = mock_redis.pipeline.return_value
+        pipe.execute.return_value = [3, True, 2, [b'p3'], 1]
+        products = [SimpleNamespace(product_id='p0'), SimpleNamespace(product_id='p1')]
+
+        ids = Recommender().suggest_product_ids_for(products, max_results=4)
+
+        self.assertEqual(ids, ['p3'])
+        mock_redis.pipeline.assert_called_once_with(transaction=True)
+        tmp_key = pipe.zunionstore.call_args.args[0]
+        self.assertTrue(tmp_key.startswith('tmp:recommendations:'))
+        pipe.expire.assert_called_once_with(tmp_key, Recommender.tmp_key_ttl)
+        pipe.zrem.assert_called_once_with(tmp_key, 'p0', 'p1')
+        pipe.zrange.assert_called_once_with(tmp_key, 0, 3, desc=True)
+        pipe.delete.assert_called_once_with(tmp_key)
+
+
+class RelatedProductsTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='testuser', email='test@example.com', password='password')
+        books = Category.objects.create(name='Books')
+        games = Category.objects.create(name='Games')
+        self.product = Product.objects.create(name='Django', price=10, stock=5, category=books, user=user)
+        self.same_category = Product.objects.create(name='Flask', price=10, stock=5, category=books, user=user)
+        self.bought_with = Product.objects.create(name='Chess', price=10, stock=5, category=games, user=user)
+        Product.objects.create(name='Go', price=10, stock=5, category=games, user=user)
+
+    @patch('shop.recommender.r')
+    def test_co_purchased_first_then_same_category(self, mock_redis):
+        mock_redis.zrange.return_value = [str(self.bought_with.product_id).encode()]
+        ids = Recommender().compute_related_product_ids(self.product)
+        self.assertEqual(ids, [str(self.bought_with.product_id), str(self.same_category.product_id)])
+
+    @patch('shop.recommender.cache')
+    @patch('shop.recommender.r')
+    def test_cached_ids_skip_computation(self, mock_redis, mock_cache):
+        mock_cache.get.return_value = ['p1']
+        self.assertEqual(Recommender().get_related_product_ids(self.product), ['p1'])
+        mock_redis.zrange.assert_not_called()
+        mock_cache.set.assert_not_called()
+
+    @patch('shop.tasks.cache')
+    @patch('shop.recommender.r')
+    def test_refresh_stores_stale_products_and_one_page(self, mock_redis, mock_cache):
+        mock_redis.zrange.return_value = []
+        mock_redis.spop.side_effect = [[str(self.product.product_id).encode()], []]
+        mock_cache.get.return_value = None
+        refresh_related_products(batch_size=2)
+
+        stale, page = (call.args[0] for call in mock_cache.set_many.call_args_list)
+        self.assertEqual(stale, {f'product_{self.product.product_id}_related': [str(self.same_category.product_id)]})
+        product_ids = sorted(str(product.product_id) for product in Product.objects.all())
+        self.assertEqual(list(page), [f'product_{id}_related' for id in product_ids[:2]])
+        mock_cache.set.assert_called_once_with('related_products:refresh_cursor', product_ids[1], None)
+
+    @patch('shop.tasks.cache')
+    @patch('shop.recommender.r')
+    def test_refresh_resumes_from_cursor_and_wraps_around(self, mock_redis, mock_cache):
+        mock_redis.zrange.return_value = []
+        mock_redis.spop.return_value = []
+        product_ids = sorted(str(product.product_id) for product in Product.objects.all())
+        mock_cache.get.return_value = product_ids[1]
+        refresh_related_products(batch_size=3)
+
+        page = mock_cache.set_many.call_args.args[0]
+        self.assertEqual(list(page), [f'product_{id}_related' for id in product_ids[2:]])
+        mock_cache.set.assert_called_once_with('related_products:refresh_cursor', None, None)
+
+
+class RelatedProductsInvalidationTest(TestCase):
+    @patch('shop.signals.AutocompleteIndex')
+    @patch('shop.recommender.r')
+    def test_committed_product_change_is_queued_for_refresh(self, mock_redis, mock_index):
+        user = User.objects.create_user(username='testuser', email='test@example.com', password='password')
+        category = Category.objects.create(name='Books')
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(name='Django', price=10, stock=5, category=category, user=user)
+        mock_redis.sadd.assert_called_with(Recommender.stale_related_key, str(product.product_id))
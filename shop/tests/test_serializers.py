@@ -1,9 +1,11 @@
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework.exceptions import ValidationError
 
-from shop.models import Category, Product, Attribute
+from shop.models import Category, Product, Attribute, Review
 from shop.serializers import ProductSerializer
 
 User = get_user_model()
@@ -81,3 +83,31 @@ class ProductSerializerTest(TestCase):
         serializer = ProductSerializer(data=data)
         self.assertFalse(serializer.is_valid())
         self.assertIn('category', serializer.errors)
+
+
+class ProductRatingTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='password')
+        self.other_user = User.objects.create_user(username='other', email='other@example.com', password='password')
+        self.category = Category.objects.create(name='Test Category', slug='test-category')
+        self.products = [
+            Product.objects.create(name=f'Product {i}', description='desc', price=10, stock=10,
+                                   category=self.category, user=self.user)
+            for i in range(3)
+        ]
+        Review(product=self.products[0], user=self.user, rating=5).save(skip_validation=True)
+        Review(product=self.products[0], user=self.other_user, rating=2).save(skip_validation=True)
+
+    def test_ratings_of_a_list_are_computed_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = ProductSerializer(Product.objects.all(), many=True).data
+        review_queries = [q for q in queries if 'shop_review' in q['sql']]
+        self.assertEqual(len(review_queries), 1)
+
+        ratings = {item['name']: item['rating'] for item in data}
+        self.assertEqual(ratings['Product 0'], {'average': 3.5, 'count': 2})
+        self.assertEqual(ratings['Product 1'], {'average': 0.0, 'count': 0})
+
+    def test_single_product_rating(self):
+        data = ProductSerializer(self.products[0]).data
+        self.assertEqual(data['rating'], {'average': 3.5, 'count': 2})
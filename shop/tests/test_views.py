@@ -1,6 +1,8 @@
 
 from unittest.mock import patch
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
@@ -78,6 +80,82 @@ class ProductViewSetTest(APITestCase):
         response = self.client.get(self.list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def create_products(self, count):
+        for i in range(count):
+            Product.objects.create(
+                name=f'Product {i}', description='Another product', price=10, stock=5, category=self.category, user=self.user1
+            )
+
+    @patch('ecommerce_api.utils.pagination.estimate_count', return_value=50000)
+    def test_list_reports_approximate_count_for_large_results(self, mock_estimate):
+        self.create_products(1)
+        response = self.client.get(self.list_url, {'page_size': 1})
+        pagination = response.data['meta']['pagination']
+        self.assertEqual(pagination['count'], 50000)
+        self.assertTrue(pagination['count_is_approximate'])
+        self.assertIsNotNone(pagination['next'])
+
+    @override_settings(PAGINATION_APPROXIMATE_COUNT_THRESHOLD=0)
+    @patch('ecommerce_api.utils.pagination.estimate_count', return_value=1)
+    def test_low_estimate_does_not_hide_later_pages(self, mock_estimate):
+        self.create_products(2)
+        response = self.client.get(self.list_url, {'page_size': 1})
+        self.assertIsNotNone(response.data['meta']['pagination']['next'])
+
+        response = self.client.get(self.list_url, {'page_size': 1, 'page': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']), 1)
+        pagination = response.data['meta']['pagination']
+        self.assertIsNone(pagination['next'])
+        self.assertEqual(pagination['count'], 3)
+        self.assertEqual(pagination['total_pages'], 3)
+        self.assertFalse(pagination['count_is_approximate'])
+
+    @override_settings(PAGINATION_APPROXIMATE_COUNT_THRESHOLD=0)
+    @patch('ecommerce_api.utils.pagination.estimate_count', return_value=50)
+    def test_high_estimate_does_not_link_empty_pages(self, mock_estimate):
+        response = self.client.get(self.list_url, {'page_size': 1})
+        pagination = response.data['meta']['pagination']
+        self.assertIsNone(pagination['next'])
+        self.assertEqual(pagination['count'], 1)
+
+        response = self.client.get(self.list_url, {'page_size': 1, 'page': 2})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @patch('ecommerce_api.utils.pagination.estimate_count', return_value=3)
+    def test_list_counts_small_results_exactly(self, mock_estimate):
+        response = self.client.get(self.list_url)
+        pagination = response.data['meta']['pagination']
+        self.assertEqual(pagination['count'], 1)
+        self.assertFalse(pagination['count_is_approximate'])
+        # the only page already holds every result, so the planner is not asked
+        mock_estimate.assert_not_called()
+
+    @override_settings(PAGINATION_APPROXIMATE_COUNT=False)
+    @patch('ecommerce_api.utils.pagination.estimate_count', return_value=50000)
+    def test_approximate_count_can_be_disabled(self, mock_estimate):
+        self.create_products(1)
+        response = self.client.get(self.list_url, {'page_size': 1})
+        pagination = response.data['meta']['pagination']
+        self.assertEqual(pagination['count'], 2)
+        self.assertFalse(pagination['count_is_approximate'])
+        mock_estimate.assert_not_called()
+
+    def test_list_products_with_cursor_pagination(self):
+        for name in ('Second Product', 'Third Product'):
+            Product.objects.create(
+                name=name, description='Another product', price=10, stock=5, category=self.category, user=self.user1
+            )
+        response = self.client.get(self.list_url, {'pagination': 'cursor', 'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        pagination = response.data['meta']['pagination']
+        self.assertNotIn('count', pagination)
+        self.assertEqual(len(response.data['data']), 2)
+
+        response = self.client.get(pagination['next'])
+        self.assertEqual(len(response.data['data']), 1)
+        self.assertIsNone(response.data['meta']['pagination']['next'])
+
     @patch('shop.recommender.Recommender.suggest_products_for')
     def test_retrieve_product(self, mock_suggest):
         mock_suggest.return_value = []
@@ -120,6 +198,84 @@ class ProductViewSetTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
 
 
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+@patch('shop.recommender.r')
+class ProductDetailCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', email='user1@example.com', password='password')
+        self.category = Category.objects.create(name='Test Category')
+        self.product = Product.objects.create(
+            name='Test Product', description='A test product', price=10, stock=5, category=self.category, user=self.user
+        )
+        self.detail_url = reverse('api-v1:product-detail', kwargs={'slug': self.product.slug})
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_detail_is_served_from_cache(self, mock_redis):
+        mock_redis.zrange.return_value = []
+        self.client.get(self.detail_url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.detail_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_product_update_invalidates_detail(self, mock_redis):
+        mock_redis.zrange.return_value = []
+        self.client.get(self.detail_url)
+        self.product.price = 25
+        self.product.save()
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.data['price'], '25.00')
+
+    def test_attribute_change_invalidates_detail(self, mock_redis):
+        mock_redis.zrange.return_value = []
+        self.client.get(self.detail_url)
+        attribute = Attribute.objects.create(name='Color')
+        ProductAttribute.objects.create(product=self.product, attribute=attribute, value='Blue')
+        response = self.client.get(self.detail_url)
+        self.assertEqual(len(response.data['attributes']), 1)
+
+    def test_renamed_product_old_slug_is_dropped(self, mock_redis):
+        mock_redis.zrange.return_value = []
+        self.client.get(self.detail_url)
+        self.product.name = 'Renamed Product'
+        self.product.save()
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ProductListCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', email='user1@example.com', password='password')
+        self.category = Category.objects.create(name='Test Category')
+        self.product = Product.objects.create(
+            name='Test Product', description='A test product', price=10, stock=5, category=self.category, user=self.user
+        )
+        self.list_url = reverse('api-v1:product-list')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_same_query_in_any_order_is_served_from_cache(self):
+        self.client.get(self.list_url, {'ordering': 'price', 'page_size': 5})
+        with self.assertNumQueries(0):
+            response = self.client.get(self.list_url, {'page_size': 5, 'ordering': 'price'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_product_write_bumps_catalog_version(self):
+        self.client.get(self.list_url)
+        Product.objects.create(
+            name='Other Product', description='Another product', price=5, stock=1, category=self.category, user=self.user
+        )
+        response = self.client.get(self.list_url)
+        self.assertEqual(len(response.data['data']), 2)
+
+
 class ReviewViewSetTest(APITestCase):
     def setUp(self):
         self.client = APIClient()
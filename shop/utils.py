@@ -1,8 +1,12 @@
 from django.conf import settings
-from django.db.models import Q
+from django.db.models import F, Q, Value, OuterRef, Subquery, TextField
+from django.db.models.functions import Coalesce
 
-if settings.DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
-    from django.contrib.postgres.search import TrigramSimilarity
+IS_POSTGRES = settings.DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql'
+
+if IS_POSTGRES:
+    from django.contrib.postgres.aggregates import StringAgg
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
 
 from ecommerce_api.utils.file_handling import upload_to_unique
 
@@ -17,20 +21,65 @@ def product_upload_to_unique(instance, filename):
     return upload_to_unique(instance, filename, directory="products/")
 
 
+def update_search_vector(queryset):
+    """
+    Recompute the weighted ``search_vector`` column for every product in the queryset
+    with a single UPDATE statement.
+
+    Name and tags are weighted A, the category name B and the description C, so that
+    ``SearchRank`` prefers title and tag hits over matches buried in the description.
+    Does nothing on databases other than PostgreSQL.
+    """
+    if not IS_POSTGRES:
+        return 0
+
+    from django.contrib.contenttypes.models import ContentType
+    from .custom_taggit import CustomTaggedItem
+    from .models import Category
+
+    config = settings.PRODUCT_SEARCH_CONFIG
+    tag_names = Subquery(
+        CustomTaggedItem.objects.filter(
+            content_type=ContentType.objects.get_for_model(queryset.model),
+            object_id=OuterRef('pk'),
+        ).values('object_id').annotate(
+            names=StringAgg('tag__name', delimiter=' ')
+        ).values('names')[:1]
+    )
+    category_name = Subquery(Category.objects.filter(pk=OuterRef('category_id')).values('name')[:1])
+
+    return queryset.update(
+        search_vector=(
+            SearchVector('name', weight='A', config=config)
+            + SearchVector(Coalesce(tag_names, Value(''), output_field=TextField()), weight='A', config=config)
+            + SearchVector(Coalesce(category_name, Value(''), output_field=TextField()), weight='B', config=config)
+            + SearchVector('description', weight='C', config=config)
+        )
+    )
+
+
 def search_products(queryset, search_term):
     """
-    Centralized search function to filter products by name and description similarity.
+    Centralized search function to filter products by a free-text search term.
+
+    On PostgreSQL the term is matched against the precomputed ``search_vector`` column
+    (GIN indexed) and ranked with ``SearchRank``. Products whose name is only trigram
+    similar to the term (typos, partial words) are kept as a fallback and ordered after
+    the full-text hits by similarity; the ``%`` operator is served by the trigram index.
+    Other databases fall back to a plain ``icontains`` filter.
     """
-    if search_term:
-        if settings.DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
-            return queryset.annotate(
-                name_similarity=TrigramSimilarity('name', search_term),
-                description_similarity=TrigramSimilarity('description', search_term),
-            ).filter(
-                name_similarity__gt=0.1
-            ).order_by('-name_similarity')
-        else:
-            return queryset.filter(
-                Q(name__icontains=search_term) | Q(description__icontains=search_term)
-            )
-    return queryset
+    if not search_term:
+        return queryset
+
+    if IS_POSTGRES:
+        query = SearchQuery(search_term, search_type='websearch', config=settings.PRODUCT_SEARCH_CONFIG)
+        return queryset.filter(
+            Q(search_vector=query) | Q(name__trigram_similar=search_term)
+        ).annotate(
+            rank=SearchRank(F('search_vector'), query),
+            name_similarity=TrigramSimilarity('name', search_term),
+        ).order_by('-rank', '-name_similarity')
+
+    return queryset.filter(
+        Q(name__icontains=search_term) | Q(description__icontains=search_term)
+    )
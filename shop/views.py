@@ -1,8 +1,6 @@
 from logging import getLogger
 
 from django.shortcuts import get_object_or_404
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 from django.views.decorators.vary import vary_on_headers
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import (
@@ -23,7 +21,19 @@ from taggit.models import Tag
 from cart.cart import Cart
 from ecommerce_api.core.mixins import PaginationMixin
 from ecommerce_api.core.permissions import IsOwnerOrStaff
+from ecommerce_api.utils.cache_tags import get_tag_versions, get_tagged, set_tagged
 from shop.filters import ProductFilter, InStockFilterBackend, ProductSearchFilterBackend
+from .cache import (
+    CATEGORY_LIST_CACHE_KEY,
+    CATEGORY_LIST_TIMEOUT,
+    CATEGORY_TAG,
+    PRODUCT_DETAIL_TIMEOUT,
+    PRODUCT_LIST_TIMEOUT,
+    PRODUCTS_TAG,
+    get_product_detail_cache_key,
+    get_product_list_cache_key,
+    get_product_tag,
+)
 from .models import Product, Category
 from .models import Review
 from .recommender import Recommender
@@ -154,7 +164,7 @@ class ReviewViewSet(viewsets.ModelViewSet):
 @extend_schema_view(
     list=extend_schema(
         operation_id=r"product\_list",
-        description=r"List all products with filtering, ordering, and search capabilities. Cached for 5 minutes.",
+        description=r"List all products with filtering, ordering, and search capabilities. Cached until the catalog changes.",
         tags=[r"Products"],
         parameters=[
             OpenApiParameter(
@@ -169,6 +179,12 @@ class ReviewViewSet(viewsets.ModelViewSet):
                 required=False,
                 type=str
             ),
+            OpenApiParameter(
+                name=r"pagination",
+                description=r"Set to 'cursor' for keyset pagination; follow the returned next/previous links",
+                required=False,
+                type=str
+            ),
         ],
         examples=[
             OpenApiExample(
@@ -192,7 +208,7 @@ class ReviewViewSet(viewsets.ModelViewSet):
     ),
     retrieve=extend_schema(
         operation_id=r"product\_retrieve",
-        description=r"Retrieve a single product by slug. Cached for 1 hour.",
+        description=r"Retrieve a single product by slug. Cached for 24 hours.",
         tags=[r"Products"],
         responses={
             200: OpenApiResponse(description=r"Product details retrieved successfully."),
@@ -280,6 +296,7 @@ class ProductViewSet(PaginationMixin, viewsets.ModelViewSet):
         ProductSearchFilterBackend,
     ]
     ordering_fields = [r'name', r'price', r'stock', r'created']
+    cursor_ordering = r'-created'
     lookup_field = r'slug'
 
     def get_permissions(self):
@@ -300,11 +317,37 @@ class ProductViewSet(PaginationMixin, viewsets.ModelViewSet):
             logger.error("Error creating product for user id: %s: %s", self.request.user.id, e, exc_info=True)
             raise
 
-    @method_decorator(cache_page(60 * 60, key_prefix=r'user_product_detail'))
+    def list(self, request, *args, **kwargs):
+        # Keyed by the normalized query; any product or category write invalidates it.
+        cache_key = get_product_list_cache_key(request)
+        cached_data = get_tagged(cache_key)
+        if cached_data is not None:
+            return Response(cached_data)
+        tags = [PRODUCTS_TAG, CATEGORY_TAG]
+        versions = get_tag_versions(tags)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            set_tagged(cache_key, response.data, tags, PRODUCT_LIST_TIMEOUT, versions=versions)
+        return response
+
     def retrieve(self, request, *args, **kwargs):
         try:
             logger.info("Retrieving product detail for slug: %s", kwargs.get(r'slug'))
-            return super().retrieve(request, *args, **kwargs)
+            # Tagged with the product, its recommended products and categories, so it
+            # is invalidated from shop.signals when any of them change. The products
+            # are only known once it is rendered; any of them changing in the meantime
+            # also moves the products tag, which is read beforehand.
+            cache_key = get_product_detail_cache_key(kwargs.get(r'slug'))
+            cached_data = get_tagged(cache_key)
+            if cached_data is not None:
+                return Response(cached_data)
+            versions = get_tag_versions([CATEGORY_TAG, PRODUCTS_TAG])
+            response = super().retrieve(request, *args, **kwargs)
+            product_ids = [response.data['product_id']]
+            product_ids += [product['product_id'] for product in response.data['recommended_products']]
+            tags = [CATEGORY_TAG, *(get_product_tag(product_id) for product_id in product_ids)]
+            set_tagged(cache_key, response.data, tags, PRODUCT_DETAIL_TIMEOUT, versions=versions)
+            return response
         except Exception as e:
             logger.error("Error retrieving product: %s", e, exc_info=True)
             raise
@@ -417,31 +460,20 @@ class CategoryViewSet(PaginationMixin, viewsets.ModelViewSet):
             self.permission_classes = [permissions.IsAdminUser]
         return super().get_permissions()
 
-    # Remove the cache_page decorator and implement custom caching
     def list(self, request, *args, **kwargs):
-        from django.core.cache import cache
         try:
             logger.info("Listing categories")
-
-            # Create a custom cache key that we can easily invalidate
-            cache_key = 'category_list_custom'
-
-            # Check if we have cached data
-            cached_data = cache.get(cache_key)
-
-            if cached_data is None:
-                # If no cached data, get the response and cache it
-                response = super().list(request, *args, **kwargs)
-
-                # Cache the response data for 24 hours
-                cache.set(cache_key, response.data, 60 * 60 * 24)
-
-                return response
-            else:
-                # Return cached data
-                from rest_framework.response import Response
+            # Invalidated from shop.signals through the category tag.
+            cached_data = get_tagged(CATEGORY_LIST_CACHE_KEY)
+            if cached_data is not None:
                 return Response(cached_data)
 
+            versions = get_tag_versions([CATEGORY_TAG])
+            response = super().list(request, *args, **kwargs)
+            set_tagged(
+                CATEGORY_LIST_CACHE_KEY, response.data, [CATEGORY_TAG], CATEGORY_LIST_TIMEOUT, versions=versions
+            )
+            return response
         except Exception as e:
             logger.error("Error listing categories: %s", e, exc_info=True)
             raise
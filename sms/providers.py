@@ -3,8 +3,17 @@ from abc import ABC, abstractmethod
 from django.conf import settings
 import logging
 
+from ecommerce_api.utils.http_client import HttpClient
+
 logger = logging.getLogger(__name__)
 
+http_client = HttpClient(
+    'sms_ir',
+    'https://api.sms.ir/v1',
+    timeout=settings.SMS_IR_HTTP_TIMEOUT,
+    retries=settings.PROVIDER_HTTP_RETRIES,
+).register()
+
 
 class SmsProvider(ABC):
     @abstractmethod
@@ -20,7 +29,7 @@ class SmsIrProvider(SmsProvider):
     def __init__(self):
         self.api_key = getattr(settings, 'SMS_IR_API_KEY', None)
         self.line_number = getattr(settings, 'SMS_IR_LINE_NUMBER', None)
-        self.api_url = 'https://api.sms.ir/v1'
+        self.http_client = http_client
 
     def _get_headers(self):
         return {
@@ -40,7 +49,7 @@ class SmsIrProvider(SmsProvider):
         }
         logger.info(f"Sending OTP to {phone} via sms.ir: {data}")
         try:
-            response = requests.post(f'{self.api_url}/send/verify', json=data, headers=headers)
+            response = self.http_client.post('/send/verify', json=data, headers=headers)
             response.raise_for_status()
             logger.info(f"sms.ir OTP response for {phone}: {response.json()}")
             return response.json()
@@ -56,7 +65,7 @@ class SmsIrProvider(SmsProvider):
         }
         logger.info(f"Sending text message to {phone} via sms.ir: {data}")
         try:
-            response = requests.post(f'{self.api_url}/send/bulk', json=data, headers=self._get_headers())
+            response = self.http_client.post('/send/bulk', json=data, headers=self._get_headers())
             response.raise_for_status()
             logger.info(f"sms.ir text message response for {phone}: {response.json()}")
             return response.json()
@@ -8,6 +8,7 @@ from django.utils import timezone
 from datetime import timedelta
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
+from cart.storage import merge_anonymous_cart
 from ecommerce_api.core.api_standard_response import ApiResponse
 
 User = get_user_model()
@@ -57,6 +58,9 @@ class VerifyOTP(APIView):
             user.set_unusable_password()
             user.save()
 
+        # carry over the cart filled before logging in
+        merge_anonymous_cart(request, user.pk)
+
         refresh = RefreshToken.for_user(user)
         data = {
             'refresh': str(refresh),